@@ -1,15 +1,14 @@
+import datetime
+import importlib
+import io
 import json
 import os
 import sys
 import re
 import subprocess
+import uuid
 
-from System.Collections.Specialized import StringCollection
-from System.Text import Encoding
-from System.IO import Path, File, StreamWriter
 from Deadline.Scripting import ClientUtils, RepositoryUtils, FrameUtils, PathUtils, SystemUtils
-from DeadlineUI.Controls.Scripting.DeadlineScriptDialog import DeadlineScriptDialog
-from ThinkboxUI.Controls.Scripting import ComboControl, CheckBoxControl
 
 ########################################################################
 ## Globals
@@ -17,6 +16,64 @@ from ThinkboxUI.Controls.Scripting import ComboControl, CheckBoxControl
 scriptDialog = None
 dlSubmission = True
 settings = []
+executablesIndex = None
+
+# the priority added to the preview job of a progressive submission
+PREVIEW_PRIORITY_BOOST = 10
+
+# the default values of the dialog controls, keyed by the controls names, shared by the dialog and the
+# scripted submissions. The priority, executable and version defaults depend on the repository.
+DEFAULT_SETTINGS = {
+    "NameBox": "Untitled",
+    "CommentBox": "",
+    "DepartmentBox": "",
+    "BatchNameBox": "",
+    "PoolBox": "none",
+    "SecondaryPoolBox": "",
+    "GroupBox": "none",
+    "TaskTimeoutBox": 0,
+    "AutoTimeoutBox": False,
+    "ConcurrentTasksBox": 1,
+    "LimitConcurrentTasksBox": True,
+    "MachineLimitBox": 0,
+    "IsBlacklistBox": False,
+    "MachineListBox": "",
+    "LimitGroupBox": "",
+    "DependencyBox": "",
+    "OnJobCompleteBox": "Nothing",
+    "SubmitSuspendedBox": False,
+    "usdFileBox": "",
+    "OutputFileBox": "",
+    "RenderSettingBox": "",
+    "FramesBox": "",
+    "ChunkSizeBox": 1,
+    "SubmitUSDFileBox": False,
+    "AutoChunkSizeBox": False,
+    "VerboseBox": "0",
+    "ThreadsBox": 0,
+    "MaxLoadOverheadRange": 10,
+    "AutoChunkTimeoutRange": 60,
+    "RendererBox": "Karma XPU",
+    "ProgressiveCB": False,
+    "PreviewStepRange": 10,
+    "PreviewScaleRange": 25,
+    "TileCB": False,
+    "XTileRange": 1,
+    "YTileRange": 1,
+    "DeleteTilesCB": False,
+    "TileBatchCB": False,
+    "OverrideSizeCB": False,
+    "WidthSizeRange": 1920,
+    "HeightSizeRange": 1080,
+    "ScaleSizeRange": 100,
+    "overrideCameraCB": False,
+    "CameraBox": "/cameras/camera1",
+    "timelimitCB": False,
+    "timelimitBox": "-1",
+    "PersistentRendererCB": False,
+    "ScanDependenciesCB": False,
+    "BundleDependenciesCB": False,
+}
 
 ########################################################################
 ## Main Function Called By Deadline
@@ -26,6 +83,25 @@ def __main__(*args):
     global dlSubmission
     global settings
 
+    if len(args) > 0:
+        # scripted submission, the settings are submitted without building the dialog
+        dlSubmission = False
+        data = LoadSettingsArgument(args[0])
+
+        # a list of job settings is submitted as a batch, the jobs of a `{"shared": {}, "jobs": []}`
+        # batch only hold the settings differing from the shared ones
+        if isinstance(data, list):
+            SubmitBatch(data)
+        elif "jobs" in data:
+            SubmitBatch([dict(data.get("shared", {}), **job) for job in data["jobs"]])
+        else:
+            SubmitSettings(data)
+        return
+
+    # the dialog modules are only loaded with the dialog, the scripted submissions do not need them
+    from DeadlineUI.Controls.Scripting.DeadlineScriptDialog import DeadlineScriptDialog
+
+    defaults = GetDefaultSettings()
     scriptDialog = DeadlineScriptDialog()
     scriptDialog.SetTitle("Submit USD Job To Deadline")
     scriptDialog.SetIcon(scriptDialog.GetIcon('USD'))
@@ -39,18 +115,18 @@ def __main__(*args):
     scriptDialog.AddControlToGrid("Separator1","SeparatorControl","Job Description", 0, 0, colSpan=2)
 
     scriptDialog.AddControlToGrid("NameLabel","LabelControl","Job Name", 1, 0,"The name of your job. This is optional, and if left blank, it will default to 'Untitled'.", False)
-    scriptDialog.AddControlToGrid("NameBox","TextControl","Untitled", 1, 1)
+    scriptDialog.AddControlToGrid("NameBox","TextControl",defaults["NameBox"], 1, 1)
     settings.append("NameBox")
 
     scriptDialog.AddControlToGrid("CommentLabel","LabelControl","Comment", 2, 0,"A simple description of your job. This is optional and can be left blank.", False)
-    scriptDialog.AddControlToGrid("CommentBox","TextControl","", 2, 1)
+    scriptDialog.AddControlToGrid("CommentBox","TextControl",defaults["CommentBox"], 2, 1)
 
     scriptDialog.AddControlToGrid("DepartmentLabel","LabelControl","Department", 3, 0,"The department you belong to. This is optional and can be left blank.", False)
-    scriptDialog.AddControlToGrid("DepartmentBox","TextControl","", 3, 1)
+    scriptDialog.AddControlToGrid("DepartmentBox","TextControl",defaults["DepartmentBox"], 3, 1)
     settings.append("DepartmentBox")
 
     scriptDialog.AddControlToGrid("BatchNameLabel","LabelControl","Batch Name", 4, 0,"The batch name to group set of jobs. This is optional and can be left blank.", False)
-    scriptDialog.AddControlToGrid("BatchNameBox","TextControl","", 4, 1)
+    scriptDialog.AddControlToGrid("BatchNameBox","TextControl",defaults["BatchNameBox"], 4, 1)
     scriptDialog.EndGrid()
 
     # Job Options
@@ -58,48 +134,48 @@ def __main__(*args):
     scriptDialog.AddControlToGrid("Separator2","SeparatorControl","Job Options", 0, 0, colSpan=3)
 
     scriptDialog.AddControlToGrid("PoolLabel","LabelControl","Pool", 1, 0,"The pool that your job will be submitted to.", False)
-    scriptDialog.AddControlToGrid("PoolBox","PoolComboControl","none", 1, 1)
+    scriptDialog.AddControlToGrid("PoolBox","PoolComboControl",defaults["PoolBox"], 1, 1)
     settings.append("PoolBox")
 
     scriptDialog.AddControlToGrid("SecondaryPoolLabel","LabelControl","Secondary Pool", 2, 0,"The secondary pool lets you specify a Pool to use if the primary Pool does not have any available Workers.", False)
-    scriptDialog.AddControlToGrid("SecondaryPoolBox","SecondaryPoolComboControl","", 2, 1)
+    scriptDialog.AddControlToGrid("SecondaryPoolBox","SecondaryPoolComboControl",defaults["SecondaryPoolBox"], 2, 1)
     settings.append("SecondaryPoolBox")
 
     scriptDialog.AddControlToGrid("GroupLabel","LabelControl","Group", 3, 0,"The group that your job will be submitted to.", False)
-    scriptDialog.AddControlToGrid("GroupBox","GroupComboControl","none", 3, 1)
+    scriptDialog.AddControlToGrid("GroupBox","GroupComboControl",defaults["GroupBox"], 3, 1)
     settings.append("GroupBox")
 
     scriptDialog.AddControlToGrid("PriorityLabel","LabelControl","Priority", 4, 0,"A job can have a numeric priority ranging from 0 to 100, where 0 is the lowest priority and 100 is the highest priority.", False)
-    scriptDialog.AddRangeControlToGrid("PriorityBox","RangeControl", RepositoryUtils.GetMaximumPriority() / 2, 0, RepositoryUtils.GetMaximumPriority(), 0, 1, 4, 1)
+    scriptDialog.AddRangeControlToGrid("PriorityBox","RangeControl", defaults["PriorityBox"], 0, RepositoryUtils.GetMaximumPriority(), 0, 1, 4, 1)
     settings.append("PriorityBox")
 
     scriptDialog.AddControlToGrid("TaskTimeoutLabel","LabelControl","Task Timeout", 5, 0,"The number of minutes a Worker has to render a task for this job before it requeues it. Specify 0 for no limit.", False)
-    scriptDialog.AddRangeControlToGrid("TaskTimeoutBox","RangeControl", 0, 0, 1000000, 0, 1, 5, 1)
-    scriptDialog.AddSelectionControlToGrid("AutoTimeoutBox","CheckBoxControl", False,"Enable Auto Task Timeout", 5, 2,"If the Auto Task Timeout is properly configured in the Repository Options, then enabling this will allow a task timeout to be automatically calculated based on the render times of previous frames for the job.")
+    scriptDialog.AddRangeControlToGrid("TaskTimeoutBox","RangeControl", defaults["TaskTimeoutBox"], 0, 1000000, 0, 1, 5, 1)
+    scriptDialog.AddSelectionControlToGrid("AutoTimeoutBox","CheckBoxControl", defaults["AutoTimeoutBox"],"Enable Auto Task Timeout", 5, 2,"If the Auto Task Timeout is properly configured in the Repository Options, then enabling this will allow a task timeout to be automatically calculated based on the render times of previous frames for the job.")
 
     scriptDialog.AddControlToGrid("ConcurrentTasksLabel","LabelControl","Concurrent Tasks", 6, 0,"The number of tasks that can render concurrently on a single Worker. This is useful if the rendering application only uses one thread to render and your Workers have multiple CPUs.", False)
-    scriptDialog.AddRangeControlToGrid("ConcurrentTasksBox","RangeControl", 1, 1, 16, 0, 1, 6, 1)
-    scriptDialog.AddSelectionControlToGrid("LimitConcurrentTasksBox","CheckBoxControl", True,"Limit Tasks To Worker's Task Limit", 6, 2,"If you limit the tasks to a Worker's task limit, then by default, the Worker won't dequeue more tasks then it has CPUs. This task limit can be overridden for individual Workers by an administrator.")
+    scriptDialog.AddRangeControlToGrid("ConcurrentTasksBox","RangeControl", defaults["ConcurrentTasksBox"], 1, 16, 0, 1, 6, 1)
+    scriptDialog.AddSelectionControlToGrid("LimitConcurrentTasksBox","CheckBoxControl", defaults["LimitConcurrentTasksBox"],"Limit Tasks To Worker's Task Limit", 6, 2,"If you limit the tasks to a Worker's task limit, then by default, the Worker won't dequeue more tasks then it has CPUs. This task limit can be overridden for individual Workers by an administrator.")
 
     scriptDialog.AddControlToGrid("MachineLimitLabel","LabelControl","Machine Limit", 7, 0,"Use the Machine Limit to specify the maximum number of machines that can render your job at one time. Specify 0 for no limit.", False)
-    scriptDialog.AddRangeControlToGrid("MachineLimitBox","RangeControl", 0, 0, 1000000, 0, 1, 7, 1)
-    scriptDialog.AddSelectionControlToGrid("IsBlacklistBox","CheckBoxControl", False,"Machine List Is A Deny List", 7, 2,"You can force the job to render on specific machines by using an allow list, or you can avoid specific machines by using a deny list.")
+    scriptDialog.AddRangeControlToGrid("MachineLimitBox","RangeControl", defaults["MachineLimitBox"], 0, 1000000, 0, 1, 7, 1)
+    scriptDialog.AddSelectionControlToGrid("IsBlacklistBox","CheckBoxControl", defaults["IsBlacklistBox"],"Machine List Is A Deny List", 7, 2,"You can force the job to render on specific machines by using an allow list, or you can avoid specific machines by using a deny list.")
     settings.append("IsBlacklistBox")
 
     scriptDialog.AddControlToGrid("MachineListLabel","LabelControl","Machine List", 8, 0,"The list of machines on the deny list or allow list.", False)
-    scriptDialog.AddControlToGrid("MachineListBox","MachineListControl","", 8, 1, colSpan=2)
+    scriptDialog.AddControlToGrid("MachineListBox","MachineListControl",defaults["MachineListBox"], 8, 1, colSpan=2)
     settings.append("MachineListBox")
 
     scriptDialog.AddControlToGrid("LimitGroupLabel","LabelControl","Limits", 9, 0,"The Limits that your job requires.", False)
-    scriptDialog.AddControlToGrid("LimitGroupBox","LimitGroupControl","", 9, 1, colSpan=2)
+    scriptDialog.AddControlToGrid("LimitGroupBox","LimitGroupControl",defaults["LimitGroupBox"], 9, 1, colSpan=2)
     settings.append("LimitGroupBox")
 
     scriptDialog.AddControlToGrid("DependencyLabel","LabelControl","Dependencies", 10, 0,"Specify existing jobs that this job will be dependent on. This job will not start until the specified dependencies finish rendering.", False)
-    scriptDialog.AddControlToGrid("DependencyBox","DependencyControl","", 10, 1, colSpan=2)
+    scriptDialog.AddControlToGrid("DependencyBox","DependencyControl",defaults["DependencyBox"], 10, 1, colSpan=2)
 
     scriptDialog.AddControlToGrid("OnJobCompleteLabel","LabelControl","On Job Complete", 11, 0,"If desired, you can automatically archive or delete the job when it completes.", False)
-    scriptDialog.AddControlToGrid("OnJobCompleteBox","OnJobCompleteControl","Nothing", 11, 1)
-    scriptDialog.AddSelectionControlToGrid("SubmitSuspendedBox","CheckBoxControl", False,"Submit Job As Suspended", 11, 2,"If enabled, the job will submit in the suspended state. This is useful if you don't want the job to start rendering right away. Just resume it from the Monitor when you want it to render.")
+    scriptDialog.AddControlToGrid("OnJobCompleteBox","OnJobCompleteControl",defaults["OnJobCompleteBox"], 11, 1)
+    scriptDialog.AddSelectionControlToGrid("SubmitSuspendedBox","CheckBoxControl", defaults["SubmitSuspendedBox"],"Submit Job As Suspended", 11, 2,"If enabled, the job will submit in the suspended state. This is useful if you don't want the job to start rendering right away. Just resume it from the Monitor when you want it to render.")
     scriptDialog.EndGrid()
 
     # USD
@@ -107,7 +183,7 @@ def __main__(*args):
     scriptDialog.AddControlToGrid("Separator3","SeparatorControl","USD Options", 0, 0, colSpan=5)
 
     scriptDialog.AddControlToGrid("USDLabel","LabelControl","USD File", 1, 0,"The USD stage file to render.", False)
-    scriptDialog.AddSelectionControlToGrid("usdFileBox","FileBrowserControl","","USD Files (*.usd *.usda *.usdc);;All Files (*)", 1, 1, colSpan=4)
+    scriptDialog.AddSelectionControlToGrid("usdFileBox","FileBrowserControl",defaults["usdFileBox"],"USD Files (*.usd *.usda *.usdc);;All Files (*)", 1, 1, colSpan=4)
     usdButton = scriptDialog.AddControlToGrid("UsdButton", "ButtonControl", "", 0, 4, "Open usdview")
     usdButton.setIcon(scriptDialog.windowIcon())
     usdButton.setFlat(True)
@@ -115,49 +191,71 @@ def __main__(*args):
     settings.append("usdFileBox")
 
     scriptDialog.AddControlToGrid("OutputLabel","LabelControl","Output Render", 3, 0,"The path that the render will be. use `$F`, `<F>`, or `%04d`", False)
-    scriptDialog.AddSelectionControlToGrid("OutputFileBox","FileBrowserControl","","", 3, 1, colSpan=4)
+    scriptDialog.AddSelectionControlToGrid("OutputFileBox","FileBrowserControl",defaults["OutputFileBox"],"", 3, 1, colSpan=4)
     settings.append("OutputFileBox")
 
     scriptDialog.AddControlToGrid("RenderSettingLabel","LabelControl","Render Setting", 4, 0,"The prim path of render setting to render with.\nIf empty it will take the default `/Render/rendersettings`", False)
-    scriptDialog.AddControlToGrid("RenderSettingBox","TextControl","", 4, 1, colSpan=4)
+    scriptDialog.AddControlToGrid("RenderSettingBox","TextControl",defaults["RenderSettingBox"], 4, 1, colSpan=4)
     settings.append("RenderSettingBox")
 
     scriptDialog.AddControlToGrid("FramesLabel","LabelControl","Frame List", 5, 0,"The list of frames to render.", False)
-    scriptDialog.AddControlToGrid("FramesBox","TextControl","", 5, 1, colSpan=4)
+    scriptDialog.AddControlToGrid("FramesBox","TextControl",defaults["FramesBox"], 5, 1, colSpan=4)
     settings.append("FramesBox")
 
     scriptDialog.AddControlToGrid("ChunkSizeLabel","LabelControl","Frames Per Task", 6, 0,"This is the number of frames that will be rendered at a time for each job task.", False)
-    scriptDialog.AddRangeControlToGrid("ChunkSizeBox","RangeControl", 1, 1, 1000000, 0, 1, 6, 1)
+    scriptDialog.AddRangeControlToGrid("ChunkSizeBox","RangeControl", defaults["ChunkSizeBox"], 1, 1000000, 0, 1, 6, 1)
     settings.append("ChunkSizeBox")
 
-    scriptDialog.AddSelectionControlToGrid("SubmitUSDFileBox","CheckBoxControl", False, "Submit USD files", 6, 2,"If this option is enabled, the USD files will be submitted with the job, and then copied locally to the Worker machine during rendering.")
+    scriptDialog.AddSelectionControlToGrid("SubmitUSDFileBox","CheckBoxControl", defaults["SubmitUSDFileBox"], "Submit USD files", 6, 2,"If this option is enabled, the USD files will be submitted with the job, and then copied locally to the Worker machine during rendering.")
     settings.append("SubmitUSDFileBox")
 
+    scriptDialog.AddSelectionControlToGrid("AutoChunkSizeBox","CheckBoxControl", defaults["AutoChunkSizeBox"], "Auto Frames Per Task", 6, 3,"If this option is enabled, a calibration job renders the first task, measures the stage load and frame times, then sets the frames per task of the job before releasing it.")
+    settings.append("AutoChunkSizeBox")
+
     verbose = [str(x) for x in range(10)]
     scriptDialog.AddControlToGrid("verboseLabel","LabelControl","Verbose Level", 7, 0,"The verbosity level", False)
-    scriptDialog.AddComboControlToGrid("VerboseBox","ComboControl", verbose[0], verbose, 7, 1)
+    scriptDialog.AddComboControlToGrid("VerboseBox","ComboControl", defaults["VerboseBox"], verbose, 7, 1)
     settings.append("VerboseBox")
 
     scriptDialog.AddControlToGrid("ThreadsLabel","LabelControl","Threads", 7, 2,"The number of rendering threads (0 to use the value specified in the Clarisse configuration file).", False)
-    scriptDialog.AddRangeControlToGrid("ThreadsBox","RangeControl", 0, 0, 256, 0, 1, 7, 3)
+    scriptDialog.AddRangeControlToGrid("ThreadsBox","RangeControl", defaults["ThreadsBox"], 0, 256, 0, 1, 7, 3)
     settings.append("ThreadsBox")
 
     executables = GetExecutables()
     scriptDialog.AddControlToGrid("ExecutableLabel","LabelControl","Executable", 8, 0,"The excutable to Render using.", False)
-    ExecutableBox = scriptDialog.AddComboControlToGrid("ExecutableBox","ComboControl", executables[0], executables, 8, 1)
+    ExecutableBox = scriptDialog.AddComboControlToGrid("ExecutableBox","ComboControl", defaults["ExecutableBox"], executables, 8, 1)
     settings.append("ExecutableBox")
 
     versions = GetExecutableVersions(ExecutableBox.currentText())
     scriptDialog.AddControlToGrid("VersionLabel","LabelControl","Version", 8, 2,"The version of USD render to render with.", False)
-    versionBox = scriptDialog.AddComboControlToGrid("VersionBox","ComboControl", versions[-1], versions, 8, 3)
+    versionBox = scriptDialog.AddComboControlToGrid("VersionBox","ComboControl", defaults["VersionBox"], versions, 8, 3)
     settings.append("VersionBox")
 
+    refreshButton = scriptDialog.AddControlToGrid("RefreshExecutablesButton","ButtonControl","Refresh", 8, 4, "Reload the executables and versions from the plugin configuration.", expand=False)
+    refreshButton.ValueModified.connect(OnRefreshExecutables)
+
+    scriptDialog.AddControlToGrid("MaxLoadOverheadLabel","LabelControl","Max Load Overhead %", 9, 0,"With Auto Frames Per Task, the maximum percentage of a task time spent loading the stage.", False)
+    scriptDialog.AddRangeControlToGrid("MaxLoadOverheadRange","RangeControl", defaults["MaxLoadOverheadRange"], 1, 100, 0, 1, 9, 1)
+    settings.append("MaxLoadOverheadRange")
+
+    scriptDialog.AddControlToGrid("AutoChunkTimeoutLabel","LabelControl","Calibration Timeout (min)", 9, 2,"With Auto Frames Per Task, the job starts with the submitted frames per task if the calibration has not released it after this many minutes.", False)
+    scriptDialog.AddRangeControlToGrid("AutoChunkTimeoutRange","RangeControl", defaults["AutoChunkTimeoutRange"], 1, 10000, 0, 1, 9, 3)
+    settings.append("AutoChunkTimeoutRange")
+    OnAutoChunkSizeChanged(False)
+
     scriptDialog.AddControlToGrid("RendererLabel","LabelControl","Renderer", 10, 0,"The renderer to Render with.", False)
 
     renderers = ("Karma CPU","Karma XPU")
-    RendererBox = scriptDialog.AddComboControlToGrid("RendererBox","ComboControl", renderers[-1], renderers, 10, 1)
+    RendererBox = scriptDialog.AddComboControlToGrid("RendererBox","ComboControl", defaults["RendererBox"], renderers, 10, 1)
     settings.append("RendererBox")
 
+    scriptDialog.AddSelectionControlToGrid("ProgressiveCB","CheckBoxControl", defaults["ProgressiveCB"],"Progressive Preview", 11, 0,"If this option is enabled, a higher priority preview job renders every Nth frame at a reduced resolution scale in a `preview` directory next to the output, and the full quality job depends on it.", colSpan=1)
+    scriptDialog.AddRangeControlToGrid("PreviewStepRange","RangeControl", defaults["PreviewStepRange"], 1, 1000000, 0, 1, 11, 1)
+    scriptDialog.AddControlToGrid("PreviewScaleLabel","LabelControl","Preview Scale %", 11, 2,"The resolution scale of the preview job.", False)
+    scriptDialog.AddRangeControlToGrid("PreviewScaleRange","RangeControl", defaults["PreviewScaleRange"], 1, 100, 0, 1, 11, 3)
+    settings.extend(["ProgressiveCB","PreviewStepRange","PreviewScaleRange"])
+    OnProgressiveChanged(False)
+
     # Tab 2
     scriptDialog.EndGrid()
     scriptDialog.EndTabPage()
@@ -166,11 +264,12 @@ def __main__(*args):
     scriptDialog.AddTabPage("Advanced Options")
     scriptDialog.AddGrid()
     scriptDialog.AddControlToGrid("Separator1","SeparatorControl","Titling", 0, 0, colSpan=4)
-    TileCB = scriptDialog.AddSelectionControlToGrid("TileCB","CheckBoxControl", False,"Number of tiles", 1, 0,"Enable render tiling.", colSpan=1)
-    scriptDialog.AddRangeControlToGrid("XTileRange","RangeControl", 1, 0, 1000000, 0, 0, 1, 1, colSpan=1)
-    scriptDialog.AddRangeControlToGrid("YTileRange","RangeControl", 1, 0, 1000000, 0, 0, 1, 2, colSpan=1)
-    scriptDialog.AddSelectionControlToGrid("DeleteTilesCB","CheckBoxControl", False,"Delete tiles after combine", 2, 0,"Delete tiles images after combine.", colSpan=1)
-    settings.extend(["XTileRange","YTileRange","DeleteTilesCB"])
+    TileCB = scriptDialog.AddSelectionControlToGrid("TileCB","CheckBoxControl", defaults["TileCB"],"Number of tiles", 1, 0,"Enable render tiling.", colSpan=1)
+    scriptDialog.AddRangeControlToGrid("XTileRange","RangeControl", defaults["XTileRange"], 0, 1000000, 0, 0, 1, 1, colSpan=1)
+    scriptDialog.AddRangeControlToGrid("YTileRange","RangeControl", defaults["YTileRange"], 0, 1000000, 0, 0, 1, 2, colSpan=1)
+    scriptDialog.AddSelectionControlToGrid("DeleteTilesCB","CheckBoxControl", defaults["DeleteTilesCB"],"Delete tiles after combine", 2, 0,"Delete tiles images after combine.", colSpan=1)
+    scriptDialog.AddSelectionControlToGrid("TileBatchCB","CheckBoxControl", defaults["TileBatchCB"],"Render all tiles of a frame per task", 2, 1,"Render all the tiles of the task frames in one process, so the stage is loaded once per frame instead of once per tile. The frames per task apply to whole frames.", colSpan=2)
+    settings.extend(["XTileRange","YTileRange","DeleteTilesCB","TileBatchCB"])
     scriptDialog.EndGrid()
 
     OnTileCBChanged(False)
@@ -179,27 +278,39 @@ def __main__(*args):
     # res
     scriptDialog.AddGrid()
     scriptDialog.AddControlToGrid("Separator2","SeparatorControl","Render Overrides", 0, 0, colSpan=4)
-    OverrideSizeCB = scriptDialog.AddSelectionControlToGrid("OverrideSizeCB","CheckBoxControl", False,"Override Resolution", 1, 0,"Enable this option to override the Width and Height (respectively) of the rendered images.", colSpan=1)
-    scriptDialog.AddRangeControlToGrid("WidthSizeRange","RangeControl", 1920, 0, 1000000, 0, 0, 1, 1)
-    scriptDialog.AddRangeControlToGrid("HeightSizeRange","RangeControl", 1080, 0, 1000000, 0, 0, 1, 2)
+    OverrideSizeCB = scriptDialog.AddSelectionControlToGrid("OverrideSizeCB","CheckBoxControl", defaults["OverrideSizeCB"],"Override Resolution", 1, 0,"Enable this option to override the Width and Height (respectively) of the rendered images.", colSpan=1)
+    scriptDialog.AddRangeControlToGrid("WidthSizeRange","RangeControl", defaults["WidthSizeRange"], 0, 1000000, 0, 0, 1, 1)
+    scriptDialog.AddRangeControlToGrid("HeightSizeRange","RangeControl", defaults["HeightSizeRange"], 0, 1000000, 0, 0, 1, 2)
 
     scriptDialog.AddControlToGrid("ScaleSizeLabel","LabelControl","Resoluation Scale", 2, 0,"Scale teh output image by teh given percentage", False)
-    scriptDialog.AddRangeControlToGrid("ScaleSizeRange","RangeControl", 100, 0, 1000000, 0, 0, 2, 1)
+    scriptDialog.AddRangeControlToGrid("ScaleSizeRange","RangeControl", defaults["ScaleSizeRange"], 0, 1000000, 0, 0, 2, 1)
     settings.extend(["WidthSizeRange","HeightSizeRange","ScaleSizeRange"])
     OnOverrideSizeChanged(False)
 
     # camera
-    overrideCameraCB = scriptDialog.AddSelectionControlToGrid("overrideCameraCB","CheckBoxControl", False,"Override Camera", 3, 0,"Enable this option to override the camera of the render settings.", colSpan=1)
-    scriptDialog.AddControlToGrid("CameraBox","TextControl","/cameras/camera1", 3, 1, colSpan=4)
+    overrideCameraCB = scriptDialog.AddSelectionControlToGrid("overrideCameraCB","CheckBoxControl", defaults["overrideCameraCB"],"Override Camera", 3, 0,"Enable this option to override the camera of the render settings.", colSpan=1)
+    scriptDialog.AddControlToGrid("CameraBox","TextControl",defaults["CameraBox"], 3, 1, colSpan=4)
     settings.append("CameraBox")
     OnOverrideCameraChanged(False)
 
     # timelimit
-    timelimitCB = scriptDialog.AddSelectionControlToGrid("timelimitCB","CheckBoxControl", False,"Time Limit", 4, 0,"Enable this option will cancel the render if it takes more than ‹sec› seconds. The default -1 is no time limit", colSpan=1)
-    scriptDialog.AddControlToGrid("timelimitBox","TextControl","-1", 4, 1, colSpan=4)
+    timelimitCB = scriptDialog.AddSelectionControlToGrid("timelimitCB","CheckBoxControl", defaults["timelimitCB"],"Time Limit", 4, 0,"Enable this option will cancel the render if it takes more than ‹sec› seconds. The default -1 is no time limit", colSpan=1)
+    scriptDialog.AddControlToGrid("timelimitBox","TextControl",defaults["timelimitBox"], 4, 1, colSpan=4)
     settings.append("timelimitBox")
     OnTimelimitCBChanged(False)
 
+    # persistent renderer
+    scriptDialog.AddSelectionControlToGrid("PersistentRendererCB","CheckBoxControl", defaults["PersistentRendererCB"],"Persistent Renderer", 5, 0,"Enable this option to keep the renderer alive on the worker between the tasks, so the stage is loaded once. It needs a renderer with a `server` configuration in `renderer.json`.", colSpan=1)
+    settings.append("PersistentRendererCB")
+
+    # dependencies
+    scriptDialog.AddSelectionControlToGrid("ScanDependenciesCB","CheckBoxControl", defaults["ScanDependenciesCB"],"Check USD Dependencies", 6, 0,"Enable this option to scan the sublayers, references, payloads, clips and assets of the USD file before submitting, and to stop on the missing dependencies. The scan runs with the hython of the selected executable when USD is not available to Deadline.", colSpan=1)
+    settings.append("ScanDependenciesCB")
+
+    scriptDialog.AddSelectionControlToGrid("BundleDependenciesCB","CheckBoxControl", defaults["BundleDependenciesCB"],"Bundle USD Dependencies", 6, 1,"With Submit USD files, publish the USD file and all its dependencies in the bundle store, and render from the store instead of the shared storage. The files already in the store are not uploaded again.", colSpan=1)
+    settings.append("BundleDependenciesCB")
+    OnSubmitUSDFileChanged(False)
+
     scriptDialog.EndGrid()
 
     scriptDialog.EndTabPage()
@@ -222,38 +333,85 @@ def __main__(*args):
     Callbacks()
 
     dlSubmission = True
-    if len(args) > 0:
-        dlSubmission = False
-        data = json.loads(args[0])
-
-        for key, value in data.items():
-            scriptDialog.SetValue(key, value)
-
-        SubmitButtonPressed()
-        return
-
     scriptDialog.MakeTopMost()
     scriptDialog.ShowDialog(dlSubmission)
 
 
 
-def CheckSubmissionParams():
-    global scriptDialog
-    global dlSubmission
+class DialogValues(object):
+    """
+    Reads the dialog controls values by control name, like a headless settings dictionary.
+    """
+    def __getitem__(self, key):
+        return scriptDialog.GetValue(key)
+
 
+def GetDefaultSettings():
+    """
+    The default values of the dialog controls, keyed by the controls names. The dialog is built
+    with these values, and the scripted submissions start from them instead of the dialog sticky
+    settings.
+    :return: the default settings dictionary
+    """
+    executables = GetExecutables()
+    executable = executables[0] if executables else ""
+    versions = GetExecutableVersions(executable)
+
+    defaults = dict(DEFAULT_SETTINGS)
+    defaults["PriorityBox"] = RepositoryUtils.GetMaximumPriority() // 2
+    defaults["ExecutableBox"] = executable
+    defaults["VersionBox"] = versions[-1] if versions else ""
+    return defaults
+
+
+def GetSettings(jobSettings):
+    """
+    Fills a scripted job settings with the default values of the missing controls.
+    :param jobSettings: The job settings dictionary, keyed by the dialog controls names
+    :return: the complete settings dictionary and the list of errors for the unknown settings
+    """
+    values = GetDefaultSettings()
+    errors = ["Unknown setting `{}`".format(key) for key in sorted(set(jobSettings) - set(values))]
+
+    if "ExecutableBox" in jobSettings and "VersionBox" not in jobSettings:
+        versions = GetExecutableVersions(jobSettings["ExecutableBox"])
+        values["VersionBox"] = versions[-1] if versions else ""
+
+    values.update(jobSettings)
+    return values, errors
+
+
+def GetSubmissionErrors(values, batch=False):
+    """
+    Validates the submission settings, from the dialog or a scripted submission.
+    :param values: The settings, keyed by the dialog controls names
+    :param batch: True if the job is submitted in a batch, which submits one job per settings
+    :return: the list of errors
+    """
     errors = []
 
+    if batch and not values["TileCB"]:
+        # these options submit several jobs depending on each other
+        if values["ProgressiveCB"]:
+            errors.append("Progressive Preview is not supported in a batch, submit the job alone")
+        if values["AutoChunkSizeBox"]:
+            errors.append("Auto Frames Per Task is not supported in a batch, submit the job alone")
+
     # Check if a valid frame range has been specified.
-    frames = scriptDialog.GetValue("FramesBox")
+    frames = values["FramesBox"]
     if(not FrameUtils.FrameRangeValid(frames)):
         errors.append("Frame range `{}` is not valid".format(frames))
+    else:
+        unevenFrames = GetUnevenTaskFrames(values)
+        if unevenFrames:
+            errors.append("With {} frames per task, the task frames `{}` are not evenly spaced, use 1 frame per task or an evenly stepped frame list".format(values["ChunkSizeBox"], FrameUtils.ToFrameString(unevenFrames)))
 
     # Check if USD files exist.
-    usdFile = scriptDialog.GetValue("usdFileBox")
-    outputPath = scriptDialog.GetValue("OutputFileBox")
+    usdFile = values["usdFileBox"]
+    outputPath = values["OutputFileBox"]
 
     USDExtension = usdFile.rsplit('.', 1)[-1]
-    if(not File.Exists(usdFile)):
+    if(not os.path.isfile(usdFile)):
         errors.append("The USD file `{}` does not exist".format(usdFile))
 
     if USDExtension.lower() not in ('usd', 'usda', 'usdc'):
@@ -262,10 +420,30 @@ def CheckSubmissionParams():
     if not outputPath:
         errors.append("Cannot leave the output path empty")
 
-    if len(errors) > 0 and dlSubmission:
+    return errors
+
+
+def CheckSubmissionParams():
+    global scriptDialog
+    global dlSubmission
+
+    errors = GetSubmissionErrors(DialogValues())
+    usdFile = scriptDialog.GetValue("usdFileBox")
+
+    if len(errors) > 0:
         scriptDialog.ShowMessageBox("Could not submit USD job\n\n{}".format('\n\n'.join(errors)) ,"Error")
         return False
 
+    errors, localPaths = CheckDependencies(DialogValues())
+    if len(errors) > 0:
+        scriptDialog.ShowMessageBox("Could not submit USD job\n\n{}".format('\n\n'.join(errors[:20])) ,"Error")
+        return False
+
+    if localPaths and not IsBundled(DialogValues()):
+        result = scriptDialog.ShowMessageBox("The USD file has {} local dependencies:\n\n{}\n\nAre you sure you want to continue?".format(len(localPaths), '\n'.join(localPaths[:20])),"Warning", ("Yes","No"))
+        if(result=="No"):
+            return False
+
     if scriptDialog.GetValue("SubmitUSDFileBox"):
         dlSubmission = False
 
@@ -277,8 +455,117 @@ def CheckSubmissionParams():
     return True
 
 
+def RunUsdScript(values, name, arguments):
+    """
+    Runs a USD plugin script which needs USD, in process when USD is available to Deadline, else
+    with the hython of the selected executable.
+    :param values: The settings, keyed by the dialog controls names
+    :param name: The script module name, in the plugin directory
+    :param arguments: The script arguments, without the output
+    :return: the json output of the script, None if the script failed
+    """
+    scriptPath = RepositoryUtils.GetRepositoryFilePath("plugins/USD/%s.py"% name, True)
+    outputPath = os.path.join(ClientUtils.GetDeadlineTempPath(),"%s_%s.json"% (name, uuid.uuid4().hex))
+
+    scriptDirectory = os.path.dirname(scriptPath)
+    if scriptDirectory not in sys.path:
+        sys.path.append(scriptDirectory)
+    module = importlib.import_module(name)
+
+    if module.Sdf is not None:
+        try:
+            module.main(arguments + ["--output", outputPath])
+        except Exception as e:
+            print("The `{}` script failed: {}".format(name, e))
+            return None
+    else:
+        executablePath = GetExecutablesIndex().get(values["ExecutableBox"], {}).get(values["VersionBox"], "")
+        huskPath = extract_husk_path(executablePath)
+        if not huskPath:
+            print("Cannot run the `{}` script, no hython found for `{}` `{}`".format(name, values["ExecutableBox"], values["VersionBox"]))
+            return None
+
+        command = [MapAndCleanPath(os.path.join(os.path.dirname(huskPath), "hython")), scriptPath]
+        command += arguments + ["--output", outputPath]
+
+        creationflags=0
+        if os.name == 'nt':
+            creationflags=0x08000000
+
+        proc = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True, creationflags=creationflags)
+        if proc.returncode != 0 or not os.path.isfile(outputPath):
+            print("The `{}` script failed:\n{}".format(name, proc.stdout))
+            return None
+
+    with open(outputPath, "r") as f:
+        output = json.load(f)
+
+    output["file"] = outputPath
+    return output
+
+
+def GetDependencyManifest(values):
+    """
+    Scans the dependencies of the USD file with the `usd_dependencies.py` plugin script.
+    :param values: The settings, keyed by the dialog controls names
+    :return: the manifest dictionary, None if the scan could not run
+    """
+    manifest = RunUsdScript(values, "usd_dependencies", [values["usdFileBox"]])
+    if manifest is not None:
+        print("Scanned {} USD dependencies, {:.1f} MB, manifest `{}`".format(len(manifest["assets"]), manifest["size"] / 1024.0 ** 2, manifest["file"]))
+    return manifest
+
+
+def GetBundleStore():
+    """
+    The bundle store directory, the `BundleStore` plugin configuration or the `usd_bundles`
+    directory of the repository.
+    """
+    store = RepositoryUtils.GetPluginConfig("USD").GetConfigEntryWithDefault("BundleStore", "").strip()
+    if not store:
+        store = RepositoryUtils.GetRepositoryPath("usd_bundles", False)
+    return store
+
+
+def BundleDependencies(values):
+    """
+    Publishes the USD file and its dependencies in the bundle store with the `usd_bundle.py` plugin
+    script. The files already in the store are not uploaded again.
+    :param values: The settings, keyed by the dialog controls names
+    :return: the bundle result, with the `usdFile` to render from the store, None if it failed
+    """
+    bundle = RunUsdScript(values, "usd_bundle", [values["usdFileBox"], "--store", GetBundleStore()])
+    if bundle is not None:
+        print("Bundled `{}`: uploaded {} files, {:.1f} MB, skipped {} files already in the store, {:.1f} MB".format(
+            bundle["root"], bundle["uploaded"], bundle["uploadedSize"] / 1024.0 ** 2, bundle["skipped"], bundle["skippedSize"] / 1024.0 ** 2))
+    return bundle
+
+
+def CheckDependencies(values):
+    """
+    Scans the dependencies of the USD file when `ScanDependenciesCB` is enabled.
+    :param values: The settings, keyed by the dialog controls names
+    :return: the errors for the missing and unreadable dependencies, and the local dependencies paths
+    """
+    if not values["ScanDependenciesCB"]:
+        return [], []
+
+    manifest = GetDependencyManifest(values)
+    if manifest is None:
+        return [], []
+
+    errors = ["The dependency `{}` of `{}` does not exist".format(missing["path"], missing["layer"]) for missing in manifest["missing"]]
+    errors += ["The layer `{}` cannot be read: {}".format(error["path"], error["error"]) for error in manifest["errors"]]
+
+    localPaths = [asset["path"] for asset in manifest["assets"] if asset["type"] != "root" and PathUtils.IsPathLocal(asset["path"])]
+    if localPaths:
+        print("The USD file `{}` has local dependencies: {}".format(values["usdFileBox"], " ".join(localPaths)))
+
+    return errors, localPaths
+
+
 def GetSettingsFilename():
-    return Path.Combine(ClientUtils.GetUsersSettingsDirectory(),"USD.ini")
+    return os.path.join(ClientUtils.GetUsersSettingsDirectory(),"USD.ini")
 
 
 def SubmitButtonPressed(*args):
@@ -289,157 +576,460 @@ def SubmitButtonPressed(*args):
     if not CheckSubmissionParams():
         return
 
-    frames = scriptDialog.GetValue("FramesBox")
-
-    # Create job info file.
-    jobInfoFilename = Path.Combine(ClientUtils.GetDeadlineTempPath(),"usd_job_info.job")
-    writer = StreamWriter(jobInfoFilename, False, Encoding.Unicode)
-    writer.WriteLine("Plugin=USD")
-    writer.WriteLine("Name=%s"% scriptDialog.GetValue("NameBox"))
-    writer.WriteLine("BatchName=%s"% scriptDialog.GetValue("BatchNameBox"))
-    writer.WriteLine("Comment=%s"% scriptDialog.GetValue("CommentBox"))
-    writer.WriteLine("Department=%s"% scriptDialog.GetValue("DepartmentBox"))
-    writer.WriteLine("OutputDirectory0=%s"% os.path.dirname(scriptDialog.GetValue("OutputFileBox")))
-    writer.WriteLine("Pool=%s"% scriptDialog.GetValue("PoolBox"))
-    writer.WriteLine("SecondaryPool=%s"% scriptDialog.GetValue("SecondaryPoolBox"))
-    writer.WriteLine("Group=%s"% scriptDialog.GetValue("GroupBox"))
-    writer.WriteLine("Priority=%s"% scriptDialog.GetValue("PriorityBox"))
-    writer.WriteLine("TaskTimeoutMinutes=%s"% scriptDialog.GetValue("TaskTimeoutBox"))
-    writer.WriteLine("EnableAutoTimeout=%s"% scriptDialog.GetValue("AutoTimeoutBox"))
-    writer.WriteLine("ConcurrentTasks=%s"% scriptDialog.GetValue("ConcurrentTasksBox"))
-    writer.WriteLine("LimitConcurrentTasksToNumberOfCpus=%s"% scriptDialog.GetValue("LimitConcurrentTasksBox"))
-
-    writer.WriteLine("MachineLimit=%s"% scriptDialog.GetValue("MachineLimitBox"))
-    if(bool(scriptDialog.GetValue("IsBlacklistBox"))):
-        writer.WriteLine("Blacklist=%s"% scriptDialog.GetValue("MachineListBox"))
+    results = SubmitValues(DialogValues())
+
+    if dlSubmission:
+        scriptDialog.ShowMessageBox(results,"Submission Results")
+
+    print(results)
+
+
+def SubmitValues(values):
+    """
+    Submits a validated job.
+    :param values: The settings, keyed by the dialog controls names
+    :return: the deadlinecommand output
+    """
+    bundle = None
+    if IsBundled(values):
+        bundle = BundleDependencies(values)
+        if bundle is None:
+            return "Could not submit USD job `{}`: the USD file cannot be bundled".format(values["NameBox"])
+
+    frames = GetFrames(values)
+    jobInfo = GetJobInfo(values, frames)
+    pluginInfo = GetPluginInfo(values, frames, bundle)
+
+    if values["ProgressiveCB"] and not values["TileCB"]:
+        return SubmitProgressiveJobs(values, jobInfo, pluginInfo)
+    return SubmitMainJob(values, jobInfo, pluginInfo)
+
+
+def SubmitMainJob(values, jobInfo, pluginInfo):
+    if values["AutoChunkSizeBox"] and not values["TileCB"]:
+        return SubmitAutoChunkJobs(values, jobInfo, pluginInfo)
+    return SubmitJob(values, jobInfo, pluginInfo)
+
+
+def LoadSettingsArgument(argument):
+    """
+    Loads the scripted submission settings, given as json or as the path of a json file, for the
+    batches too long for a command line.
+    """
+    if argument.lstrip().startswith(("{", "[")):
+        return json.loads(argument)
+
+    with open(argument, "r") as f:
+        return json.load(f)
+
+
+def SubmitSettings(jobSettings):
+    """
+    Submits a job from its settings, keyed by the dialog controls names, without the dialog.
+    The missing settings take the dialog controls default values.
+    :param jobSettings: The job settings dictionary
+    :return: the deadlinecommand output, None if the settings are not valid
+    """
+    values, errors = GetSettings(jobSettings)
+    errors += GetSubmissionErrors(values)
+    if not errors:
+        errors += CheckDependencies(values)[0]
+    if errors:
+        print("Could not submit USD job `{}`: {}".format(values["NameBox"], " ".join(errors)))
+        return None
+
+    results = SubmitValues(values)
+    print(results)
+    return results
+
+
+def SubmitBatch(jobsSettings):
+    """
+    Submits a list of job settings, keyed by the dialog controls names like the single job json,
+    with one deadlinecommand call and without the dialog. The missing settings take the dialog
+    controls default values. The jobs using the Auto Frames Per Task or Progressive Preview options are
+    not submitted, they need to be submitted alone.
+    :param jobsSettings: The list of job settings dictionaries
+    :return: the list of job ids, in the settings order, None for the jobs not submitted
+    """
+    arguments = ["-SubmitMultipleJobs"]
+
+    submitted = []
+    for index, jobSettings in enumerate(jobsSettings):
+        values, errors = GetSettings(jobSettings)
+        errors += GetSubmissionErrors(values, batch=True)
+        if not errors:
+            errors += CheckDependencies(values)[0]
+        if errors:
+            print("Could not submit USD job `{}`: {}".format(values["NameBox"], " ".join(errors)))
+            continue
+
+        bundle = None
+        if IsBundled(values):
+            bundle = BundleDependencies(values)
+            if bundle is None:
+                print("Could not submit USD job `{}`: the USD file cannot be bundled".format(values["NameBox"]))
+                continue
+
+        frames = GetFrames(values)
+        arguments.append("-job")
+        arguments += WriteJobFiles(GetJobInfo(values, frames), GetPluginInfo(values, frames, bundle))
+        arguments += GetAuxiliaryFiles(values)
+        submitted.append(index)
+
+    jobIds = [None] * len(jobsSettings)
+    if not submitted:
+        print(json.dumps(jobIds))
+        return jobIds
+
+    results = ExecuteDeadlineCommand(arguments)
+    print(results)
+
+    submittedIds = GetJobIds(results)
+    if len(submittedIds) != len(submitted):
+        print("Submitted {} jobs, but got {} job ids".format(len(submitted), len(submittedIds)))
+
+    for index, jobId in zip(submitted, submittedIds):
+        jobIds[index] = jobId
+
+    print(json.dumps(jobIds))
+    return jobIds
+
+
+def GetFrameList(values):
+    """
+    The sorted unique frames of the frame list, like `1-100x2,150,200-210`.
+    """
+    return sorted(set(FrameUtils.Parse(values["FramesBox"])))
+
+
+def GetFrameStep(frames):
+    """
+    Returns the step of evenly spaced frames, rendered by the plugin with one frame range.
+    :param frames: The sorted list of frames
+    :return: the step, 1 for a single frame, None if the frames are not evenly spaced
+    """
+    if len(frames) < 2:
+        return 1
+
+    step = frames[1] - frames[0]
+    if any(b - a != step for a, b in zip(frames, frames[1:])):
+        return None
+    return step
+
+
+def GetUnevenTaskFrames(values):
+    """
+    Returns the frames of the first task which cannot be rendered as one frame range, the tasks
+    rendering several frames need evenly spaced frames.
+    :param values: The settings, keyed by the dialog controls names
+    :return: the task frames, None if all the tasks are evenly spaced
+    """
+    chunkSize = int(values["ChunkSizeBox"])
+    if values["TileCB"] and not values["TileBatchCB"]:
+        # every task renders one tile of one frame
+        return None
+
+    frameList = GetFrameList(values)
+    for start in range(0, len(frameList), chunkSize):
+        if GetFrameStep(frameList[start:start + chunkSize]) is None:
+            return frameList[start:start + chunkSize]
+    return None
+
+
+def GetFrames(values):
+    frames = values["FramesBox"]
+
+    if values["TileCB"]:
+        # the tasks are numbered from 0, the task `t` renders the tile `t % tiles` of the frame at the
+        # position `t // tiles` of the tile frame list
+        tileCount = int(values["XTileRange"]) * int(values["YTileRange"])
+        frames = "0-{}".format(len(GetFrameList(values)) * tileCount - 1)
+
+    return frames
+
+
+def GetJobInfo(values, frames):
+    jobInfo = {
+        "Plugin": "USD",
+        "Name": values["NameBox"],
+        "BatchName": values["BatchNameBox"],
+        "Comment": values["CommentBox"],
+        "Department": values["DepartmentBox"],
+        "OutputDirectory0": os.path.dirname(values["OutputFileBox"]),
+        "Pool": values["PoolBox"],
+        "SecondaryPool": values["SecondaryPoolBox"],
+        "Group": values["GroupBox"],
+        "Priority": values["PriorityBox"],
+        "TaskTimeoutMinutes": values["TaskTimeoutBox"],
+        "EnableAutoTimeout": values["AutoTimeoutBox"],
+        "ConcurrentTasks": values["ConcurrentTasksBox"],
+        "LimitConcurrentTasksToNumberOfCpus": values["LimitConcurrentTasksBox"],
+        "MachineLimit": values["MachineLimitBox"],
+    }
+
+    if(bool(values["IsBlacklistBox"])):
+        jobInfo["Blacklist"] = values["MachineListBox"]
     else:
-        writer.WriteLine("Whitelist=%s"% scriptDialog.GetValue("MachineListBox"))
+        jobInfo["Whitelist"] = values["MachineListBox"]
+
+    jobInfo["LimitGroups"] = values["LimitGroupBox"]
+    jobInfo["JobDependencies"] = values["DependencyBox"]
+    jobInfo["OnJobComplete"] = values["OnJobCompleteBox"]
+
+    if(bool(values["SubmitSuspendedBox"])):
+        jobInfo["InitialStatus"] = "Suspended"
+
+    jobInfo["ChunkSize"] = int(values["ChunkSizeBox"])
+    if values["TileCB"] and values["TileBatchCB"]:
+        # every task covers the tiles of whole frames
+        jobInfo["ChunkSize"] *= int(values["XTileRange"]) * int(values["YTileRange"])
+    elif values["TileCB"]:
+        # every task renders one tile
+        jobInfo["ChunkSize"] = 1
+    jobInfo["Frames"] = frames
+
+    return jobInfo
+
+
+def GetPluginInfo(values, frames, bundle=None):
+    pluginInfo = {}
+
+    if bundle:
+        pluginInfo["usdFile"] = bundle["usdFile"]
+    elif not bool(values["SubmitUSDFileBox"]):
+        pluginInfo["usdFile"] = values["usdFileBox"]
+    pluginInfo["OutputFile"] = values["OutputFileBox"]
+    pluginInfo["Threads"] = values["ThreadsBox"]
+    pluginInfo["Verbose"] = values["VerboseBox"]
+    pluginInfo["Version"] = values["VersionBox"]
+    pluginInfo["Renderer"] = values["RendererBox"]
+    pluginInfo["Executable"] = values["ExecutableBox"]
+
+    renderSettings = values["RenderSettingBox"]
+    if not renderSettings:
+        renderSettings ="/Render/rendersettings"
+    pluginInfo["RenderSetting"] = renderSettings
 
-    writer.WriteLine("LimitGroups=%s"% scriptDialog.GetValue("LimitGroupBox"))
-    writer.WriteLine("JobDependencies=%s"% scriptDialog.GetValue("DependencyBox"))
-    writer.WriteLine("OnJobComplete=%s"% scriptDialog.GetValue("OnJobCompleteBox"))
+    if values["TileCB"]:
+        pluginInfo["TileOverrideEnable"] = values["TileCB"]
+        pluginInfo["XTile"] = values["XTileRange"]
+        pluginInfo["YTile"] = values["YTileRange"]
+        pluginInfo["DeleteTiles"] = values["DeleteTilesCB"]
+        pluginInfo["TileBatchEnable"] = values["TileBatchCB"]
+        pluginInfo["TileFrameList"] = FrameUtils.ToFrameString(GetFrameList(values))
 
-    if(bool(scriptDialog.GetValue("SubmitSuspendedBox"))):
-        writer.WriteLine("InitialStatus=Suspended")
+    if values["OverrideSizeCB"]:
+        pluginInfo["OverrideSizesEnable"] = values["OverrideSizeCB"]
+        pluginInfo["WidthSize"] = values["WidthSizeRange"]
+        pluginInfo["HeightSize"] = values["HeightSizeRange"]
+        pluginInfo["ScaleSize"] = values["ScaleSizeRange"]
 
-    writer.WriteLine("ChunkSize=%s"% scriptDialog.GetValue("ChunkSizeBox"))
+    if values["overrideCameraCB"]:
+        pluginInfo["CameraOverrideEnable"] = values["overrideCameraCB"]
+        pluginInfo["Camera"] = values["CameraBox"]
 
-    if scriptDialog.GetValue("TileCB"):
-        x_tile = scriptDialog.GetValue("XTileRange")
-        y_tile = scriptDialog.GetValue("YTileRange")
-        groups = re.findall(r"(\d+)", frames)
+    if values["timelimitCB"]:
+        pluginInfo["TimelimitEnable"] = values["timelimitCB"]
+        pluginInfo["Timelimit"] = values["timelimitBox"]
 
-        if len(groups) == 1:
-            end_frame = start_frame = int(groups[0])
-        else:
-            start_frame = int(groups[0])
-            end_frame = int(groups[1])
-        frame_count = end_frame - start_frame + 1
+    if values["PersistentRendererCB"]:
+        pluginInfo["PersistentRenderer"] = values["PersistentRendererCB"]
 
-        frames ="{}-{}".format(start_frame, str(start_frame + (frame_count * x_tile * y_tile) - 1))
+    pluginInfo["ChunkSize"] = values["ChunkSizeBox"]
 
-    writer.WriteLine("Frames=%s"% frames)
+    return pluginInfo
 
-    writer.Close()
 
-    # Create plugin info file.
-    pluginInfoFilename = Path.Combine(ClientUtils.GetDeadlineTempPath(),"usd_plugin_info.job")
-    writer = StreamWriter(pluginInfoFilename, False, Encoding.Unicode)
+def WriteInfoFile(filename, info):
+    # utf-16 with a byte order mark, like the .NET unicode encoding
+    with io.open(filename, "w", encoding="utf-16") as f:
+        for key, value in info.items():
+            f.write("%s=%s\n"% (key, value))
 
-    if not bool(scriptDialog.GetValue("SubmitUSDFileBox")):
-        writer.WriteLine("usdFile=%s"% scriptDialog.GetValue("usdFileBox"))
-    writer.WriteLine("OutputFile=%s"% scriptDialog.GetValue("OutputFileBox"))
-    writer.WriteLine("Threads=%s"% scriptDialog.GetValue("ThreadsBox"))
-    writer.WriteLine("Verbose=%s"% scriptDialog.GetValue("VerboseBox"))
-    writer.WriteLine("Version=%s"% scriptDialog.GetValue("VersionBox"))
-    writer.WriteLine("Renderer=%s"% scriptDialog.GetValue("RendererBox"))
-    writer.WriteLine("Executable=%s"% scriptDialog.GetValue("ExecutableBox"))
 
-    renderSettings = scriptDialog.GetValue("RenderSettingBox")
-    if not renderSettings:
-        renderSettings ="/Render/rendersettings"
-    writer.WriteLine("RenderSetting=%s"% renderSettings)
+def WriteJobFiles(jobInfo, pluginInfo, name="usd"):
+    # uniquely named, so concurrent submissions do not overwrite each other files
+    suffix = uuid.uuid4().hex
 
-    if scriptDialog.GetValue("TileCB"):
-        writer.WriteLine("TileOverrideEnable=%s"% scriptDialog.GetValue("TileCB"))
-        writer.WriteLine("XTile=%s"% scriptDialog.GetValue("XTileRange"))
-        writer.WriteLine("YTile=%s"% scriptDialog.GetValue("YTileRange"))
-        writer.WriteLine("DeleteTiles=%s"% scriptDialog.GetValue("DeleteTilesCB"))
-        writer.WriteLine("Frames=%s"% frames)
+    jobInfoFilename = os.path.join(ClientUtils.GetDeadlineTempPath(),"%s_job_info_%s.job"% (name, suffix))
+    WriteInfoFile(jobInfoFilename, jobInfo)
 
-    if scriptDialog.GetValue("OverrideSizeCB"):
-        writer.WriteLine("OverrideSizesEnable=%s"% scriptDialog.GetValue("OverrideSizeCB"))
-        writer.WriteLine("WidthSize=%s"% scriptDialog.GetValue("WidthSizeRange"))
-        writer.WriteLine("HeightSize=%s"% scriptDialog.GetValue("HeightSizeRange"))
-        writer.WriteLine("ScaleSize=%s"% scriptDialog.GetValue("ScaleSizeRange"))
+    pluginInfoFilename = os.path.join(ClientUtils.GetDeadlineTempPath(),"%s_plugin_info_%s.job"% (name, suffix))
+    WriteInfoFile(pluginInfoFilename, pluginInfo)
 
+    return jobInfoFilename, pluginInfoFilename
 
-    if scriptDialog.GetValue("overrideCameraCB"):
-        writer.WriteLine("CameraOverrideEnable=%s"% scriptDialog.GetValue("overrideCameraCB"))
-        writer.WriteLine("Camera=%s"% scriptDialog.GetValue("CameraBox"))
 
-    if scriptDialog.GetValue("timelimitCB"):
-        writer.WriteLine("TimelimitEnable=%s"% scriptDialog.GetValue("timelimitCB"))
-        writer.WriteLine("Timelimit=%s"% scriptDialog.GetValue("timelimitBox"))
+def IsBundled(values):
+    return bool(values["SubmitUSDFileBox"]) and bool(values["BundleDependenciesCB"])
 
-    writer.WriteLine("ChunkSize=%s"% scriptDialog.GetValue("ChunkSizeBox"))
 
-    writer.Close()
+def GetAuxiliaryFiles(values):
+    if bool(values["SubmitUSDFileBox"]) and not IsBundled(values):
+        return [values["usdFileBox"]]
+    return []
 
-    # Setup the command line arguments.
-    arguments = StringCollection()
 
-    arguments.Add(jobInfoFilename)
-    arguments.Add(pluginInfoFilename)
+def ExecuteDeadlineCommand(arguments):
+    """
+    Runs deadlinecommand with the .NET string collection it expects.
+    :param arguments: The list of the deadlinecommand arguments
+    :return: the deadlinecommand output
+    """
+    from System.Collections.Specialized import StringCollection
 
-    if bool(scriptDialog.GetValue("SubmitUSDFileBox")):
-        arguments.Add(scriptDialog.GetValue("usdFileBox"))
+    collection = StringCollection()
+    for argument in arguments:
+        collection.Add(argument)
+    return ClientUtils.ExecuteCommandAndGetOutput(collection)
 
-    # Now submit the job.
-    results = ClientUtils.ExecuteCommandAndGetOutput(arguments)
-    if dlSubmission:
-        scriptDialog.ShowMessageBox(results,"Submission Results")
 
-    print(results)
+def SubmitJob(values, jobInfo, pluginInfo, name="usd"):
+    # Setup the command line arguments.
+    arguments = list(WriteJobFiles(jobInfo, pluginInfo, name))
+    arguments += GetAuxiliaryFiles(values)
 
+    # Now submit the job.
+    return ExecuteDeadlineCommand(arguments)
+
+
+def GetJobIds(results):
+    return re.findall(r"JobID=(\S+)", results)
+
+
+def GetJobId(results):
+    jobIds = GetJobIds(results)
+    if jobIds:
+        return jobIds[0]
+    return None
+
+
+def SubmitProgressiveJobs(values, jobInfo, pluginInfo):
+    """
+    Submits a preview job rendering every Nth frame at a reduced resolution scale, with a higher
+    priority, then the full quality job of all the frames depending on it. The preview renders in a
+    `preview` directory next to the output, so the full quality frames do not overwrite it.
+    """
+    frameList = list(FrameUtils.Parse(jobInfo["Frames"]))
+    step = max(1, int(values["PreviewStepRange"]))
+    outputFile = pluginInfo["OutputFile"]
+    previewOutputFile = os.path.join(os.path.dirname(outputFile), "preview", os.path.basename(outputFile))
+
+    previewJobInfo = dict(jobInfo)
+    previewJobInfo["Name"] = "%s (preview)"% jobInfo["Name"]
+    previewJobInfo["Frames"] = FrameUtils.ToFrameString(frameList[::step])
+    previewJobInfo["Priority"] = min(RepositoryUtils.GetMaximumPriority(), int(jobInfo["Priority"]) + PREVIEW_PRIORITY_BOOST)
+    previewJobInfo["OutputDirectory0"] = os.path.dirname(previewOutputFile)
+    # the preview frames are not contiguous, every task renders one frame
+    previewJobInfo["ChunkSize"] = 1
+
+    previewPluginInfo = dict(pluginInfo)
+    previewPluginInfo["OutputFile"] = previewOutputFile
+    previewPluginInfo["ScaleSize"] = int(pluginInfo.get("ScaleSize", 100)) * int(values["PreviewScaleRange"]) // 100
+    previewPluginInfo["ChunkSize"] = 1
+
+    results = SubmitJob(values, previewJobInfo, previewPluginInfo, "usd_preview")
+
+    jobId = GetJobId(results)
+    if not jobId:
+        return results
+
+    fullJobInfo = dict(jobInfo)
+    fullJobInfo["JobDependencies"] = ",".join(x for x in (jobInfo.get("JobDependencies"), jobId) if x)
+
+    return results + "\n" + SubmitMainJob(values, fullJobInfo, pluginInfo)
+
+
+def SubmitAutoChunkJobs(values, jobInfo, pluginInfo):
+    """
+    Submits the job pending with a calibration job rendering its first task. The calibration task
+    measures the stage load and frame times, then sets the frames per task of the job and releases it.
+    The job is scheduled to start after the calibration timeout, so it renders with the submitted
+    frames per task when the calibration never finishes.
+    """
+    chunkSize = int(jobInfo["ChunkSize"])
+    frameList = list(FrameUtils.Parse(jobInfo["Frames"]))
+    if len(frameList) <= chunkSize:
+        return SubmitJob(values, jobInfo, pluginInfo)
+
+    mainJobInfo = dict(jobInfo)
+    mainJobInfo["Frames"] = FrameUtils.ToFrameString(frameList[chunkSize:])
+    if not values["SubmitSuspendedBox"]:
+        startTime = datetime.datetime.now() + datetime.timedelta(minutes=int(values["AutoChunkTimeoutRange"]))
+        mainJobInfo["ScheduledType"] = "Once"
+        mainJobInfo["ScheduledStartDateTime"] = startTime.strftime("%d/%m/%Y %H:%M")
+    results = SubmitJob(values, mainJobInfo, pluginInfo)
+
+    jobId = GetJobId(results)
+    if not jobId:
+        return results
+
+    calibrationJobInfo = dict(jobInfo)
+    calibrationJobInfo["Name"] = "%s (calibration)"% jobInfo["Name"]
+    calibrationJobInfo["Frames"] = FrameUtils.ToFrameString(frameList[:chunkSize])
+
+    calibrationPluginInfo = dict(pluginInfo)
+    calibrationPluginInfo["AutoChunkJobId"] = jobId
+    calibrationPluginInfo["AutoChunkResume"] = not bool(values["SubmitSuspendedBox"])
+    calibrationPluginInfo["MaxLoadOverhead"] = values["MaxLoadOverheadRange"] / 100.0
+
+    return results + "\n" + SubmitJob(values, calibrationJobInfo, calibrationPluginInfo, "usd_calibration")
+
+
+def GetExecutablesIndex(refresh=False):
+    """
+    Parses the USD plugin configuration once per dialog session.
+    :param refresh: Reload the plugin configuration
+    :return: a dictionary of the executables versions, each version with its executable paths
+    """
+    global executablesIndex
+
+    if executablesIndex is None or refresh:
+        plugin_config = RepositoryUtils.GetPluginConfig("USD")
+        executablesIndex = {}
+        for item in plugin_config.GetConfigKeys():
+            item = str(item)
+            if"_renderExecutable_"in item:
+                executable, version = item.split("_renderExecutable_", 1)
+                executablesIndex.setdefault(executable, {})[version] = plugin_config.GetConfigEntry(item)
+
+    return executablesIndex
 
-def GetExecutableVersions(excutable):
-    plugin_config = RepositoryUtils.GetPluginConfig("USD")
-    configKeys = plugin_config.GetConfigKeys()
-    versionsList = []
-    for item in configKeys:
-        if excutable in str(item) and"_renderExecutable_"in str(item):
-            versionsList.append(item.rsplit("_", 1)[-1])
 
-    return versionsList
+def GetExecutableVersions(excutable):
+    return list(GetExecutablesIndex().get(excutable, {}))
 
 
 def GetExecutables():
-    plugin_config = RepositoryUtils.GetPluginConfig("USD")
-    configKeys = plugin_config.GetConfigKeys()
-    executables = set()
-    for item in configKeys:
-        if"_renderExecutable_"in str(item):
-            executables.add(item.split("_", 1)[0])
-
-    return list(executables)
+    return list(GetExecutablesIndex())
 
 
 def Callbacks(*args):
+    from ThinkboxUI.Controls.Scripting import ComboControl, CheckBoxControl
+
     executableBox = scriptDialog.findChild(ComboControl.ComboControl,"ExecutableBox")
     tileBox = scriptDialog.findChild(CheckBoxControl.CheckBoxControl,"TileCB")
     resoultionBox = scriptDialog.findChild(CheckBoxControl.CheckBoxControl,"OverrideSizeCB")
     overrideCameraBox = scriptDialog.findChild(CheckBoxControl.CheckBoxControl,"overrideCameraCB")
     timelimitCB = scriptDialog.findChild(CheckBoxControl.CheckBoxControl,"timelimitCB")
+    autoChunkSizeBox = scriptDialog.findChild(CheckBoxControl.CheckBoxControl,"AutoChunkSizeBox")
+    submitUSDFileBox = scriptDialog.findChild(CheckBoxControl.CheckBoxControl,"SubmitUSDFileBox")
+    progressiveBox = scriptDialog.findChild(CheckBoxControl.CheckBoxControl,"ProgressiveCB")
 
     tileBox.stateChanged.connect(OnTileCBChanged)
     resoultionBox.stateChanged.connect(OnOverrideSizeChanged)
     overrideCameraBox.stateChanged.connect(OnOverrideCameraChanged)
     timelimitCB.stateChanged.connect(OnTimelimitCBChanged)
+    autoChunkSizeBox.stateChanged.connect(OnAutoChunkSizeChanged)
+    submitUSDFileBox.stateChanged.connect(OnSubmitUSDFileChanged)
+    progressiveBox.stateChanged.connect(OnProgressiveChanged)
 
     executableBox.currentTextChanged.connect(OnExecutableChanged)
 
 def OnExecutableChanged(name):
+    from ThinkboxUI.Controls.Scripting import ComboControl
+
     versionBox = scriptDialog.findChild(ComboControl.ComboControl,"VersionBox")
     versionBox.clear()
     items = GetExecutableVersions(name)
@@ -447,10 +1037,32 @@ def OnExecutableChanged(name):
     versionBox.setCurrentIndex(len(items) - 1)
 
 
+def OnRefreshExecutables(*args):
+    from ThinkboxUI.Controls.Scripting import ComboControl
+
+    GetExecutablesIndex(refresh=True)
+
+    executableBox = scriptDialog.findChild(ComboControl.ComboControl,"ExecutableBox")
+    executable = executableBox.currentText()
+    version = scriptDialog.GetValue("VersionBox")
+
+    executableBox.blockSignals(True)
+    executableBox.clear()
+    executableBox.addItems(GetExecutables())
+    executableBox.blockSignals(False)
+    if executable in GetExecutables():
+        executableBox.setCurrentText(executable)
+
+    OnExecutableChanged(executableBox.currentText())
+    if version in GetExecutableVersions(executableBox.currentText()):
+        scriptDialog.SetValue("VersionBox", version)
+
+
 def OnTileCBChanged(state):
     scriptDialog.SetEnabled("XTileRange", state)
     scriptDialog.SetEnabled("YTileRange", state)
     scriptDialog.SetEnabled("DeleteTilesCB", state)
+    scriptDialog.SetEnabled("TileBatchCB", state)
 
 
 def OnOverrideSizeChanged(state):
@@ -466,6 +1078,20 @@ def OnOverrideCameraChanged(state):
 def OnTimelimitCBChanged(state):
     scriptDialog.SetEnabled("timelimitBox", state)
 
+def OnProgressiveChanged(state):
+    scriptDialog.SetEnabled("PreviewStepRange", state)
+    scriptDialog.SetEnabled("PreviewScaleLabel", state)
+    scriptDialog.SetEnabled("PreviewScaleRange", state)
+
+def OnAutoChunkSizeChanged(state):
+    scriptDialog.SetEnabled("MaxLoadOverheadLabel", state)
+    scriptDialog.SetEnabled("MaxLoadOverheadRange", state)
+    scriptDialog.SetEnabled("AutoChunkTimeoutLabel", state)
+    scriptDialog.SetEnabled("AutoChunkTimeoutRange", state)
+
+def OnSubmitUSDFileChanged(state):
+    scriptDialog.SetEnabled("BundleDependenciesCB", state)
+
 def OpenUsdview():
     executable = scriptDialog.GetValue("ExecutableBox")
     version = scriptDialog.GetValue("VersionBox")
@@ -474,9 +1100,7 @@ def OpenUsdview():
     if not os.path.exists(usd_file):
         scriptDialog.ShowMessageBox("Please enter a valid usd file first, then launch usdview.")
 
-    key = "{}_renderExecutable_{}".format(executable, version)
-    plugin_config = RepositoryUtils.GetPluginConfig("USD")
-    executable_path = plugin_config.GetConfigEntry(key)
+    executable_path = GetExecutablesIndex().get(executable, {}).get(version, "")
 
     husk_path = extract_husk_path(executable_path)
     bin_dir = os.path.dirname(husk_path)
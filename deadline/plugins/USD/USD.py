@@ -1,21 +1,32 @@
 #!/usr/bin/env python
+import bisect
+import math
 import platform
 import subprocess
 import re
 import json
 import os
+import importlib.util
+import string
+import time
 
 try:
     from pipes import quote
 except ImportError:
     from shlex import quote
 
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
 from Deadline.Plugins import DeadlinePlugin
-from Deadline.Scripting import FileUtils, RepositoryUtils, SystemUtils
+from Deadline.Scripting import FileUtils, FrameUtils, RepositoryUtils, SystemUtils
 from System.IO import Path
 
 combine_images_path = RepositoryUtils.GetRepositoryFilePath("plugins/USD/combine_images.py", True)
 renderer_path = RepositoryUtils.GetRepositoryFilePath("plugins/USD/renderer.json", True)
+persistent_render_path = RepositoryUtils.GetRepositoryFilePath("plugins/USD/persistent_render.py", True)
 
 
 def GetDeadlinePlugin():
@@ -26,9 +37,212 @@ def CleanupDeadlinePlugin(deadlinePlugin):
     deadlinePlugin.Cleanup()
 
 
+# parsed renderer settings, shared by all the tasks rendered by this worker process
+_rendererCache = {"mtime": None, "settings": {}, "compiled": {}}
+
+
 def GetRendererSettings():
-    with open(renderer_path, "r") as f:
-        return json.load(f)
+    """
+    Returns the renderer settings, parsed once and reloaded only when the file changes.
+    """
+    mtime = os.path.getmtime(renderer_path)
+    if _rendererCache["mtime"] != mtime:
+        with open(renderer_path, "r") as f:
+            _rendererCache["settings"] = json.load(f)
+        _rendererCache["compiled"] = {}
+        _rendererCache["mtime"] = mtime
+
+    return _rendererCache["settings"]
+
+
+def CompileRendererArgs(args):
+    """
+    Compiles the argument templates of a renderer into their placeholders and an
+    index of the arguments using each placeholder.
+    :param args: The list of argument templates from the renderer settings
+    :return: a tuple of `(templates, index)`, where templates is a list of `(template, placeholders)`
+    """
+    formatter = string.Formatter()
+    templates = []
+    index = {}
+    for position, template in enumerate(args):
+        placeholders = frozenset(
+            field for option in template for _, field, _, _ in formatter.parse(option) if field)
+        templates.append((template, placeholders))
+        for placeholder in placeholders:
+            index.setdefault(placeholder, []).append(position)
+
+    return templates, index
+
+
+def GetCompiledRendererArgs(executable, section="args"):
+    """
+    Returns the compiled argument templates of a section of the executable settings, see `CompileRendererArgs`.
+    """
+    settings = GetRendererSettings()
+    compiled = _rendererCache["compiled"]
+    if (executable, section) not in compiled:
+        compiled[(executable, section)] = CompileRendererArgs(settings.get(executable, {}).get(section, []))
+
+    return compiled[(executable, section)]
+
+
+# parsed frame lists, shared by all the tasks rendered by this worker process
+_frameListCache = {}
+
+
+def GetFrameList(frames):
+    """
+    Parses a frame list once, the frames of the tasks are then looked up by position.
+    :param frames: The frame list, like `1-100x2,150,200-210`
+    :return: the sorted list of the unique frames
+    """
+    if frames not in _frameListCache:
+        if len(_frameListCache) > 16:
+            _frameListCache.clear()
+        _frameListCache[frames] = sorted(set(FrameUtils.Parse(frames)))
+
+    return _frameListCache[frames]
+
+
+def GetFrameStep(frames):
+    """
+    Returns the step of evenly spaced frames, rendered with one frame range.
+    :param frames: The sorted list of frames
+    :return: the step, 1 for a single frame, None if the frames are not evenly spaced
+    """
+    if len(frames) < 2:
+        return 1
+
+    step = frames[1] - frames[0]
+    if any(b - a != step for a, b in zip(frames, frames[1:])):
+        return None
+    return step
+
+
+MEMORY_UNITS = {"": 1, "B": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def ParseMemory(value, unit=""):
+    """
+    Converts a memory size printed by a renderer to bytes.
+    :param value: The size value
+    :param unit: The size unit, like `KB`, `MiB` or `G`, bytes if empty
+    :return: the size in bytes
+    """
+    return int(float(value) * MEMORY_UNITS.get((unit or "").strip().upper()[:1], 1))
+
+
+def PlanChunkSize(stageLoadTime, frameTime, maxLoadOverhead=0.1, maxChunkSize=0):
+    """
+    Plans the frames per task keeping the stage load under a fraction of the task time.
+    :param stageLoadTime: The seconds spent loading the stage once per task
+    :param frameTime: The seconds spent rendering one frame
+    :param maxLoadOverhead: The maximum fraction of the task time spent loading the stage
+    :param maxChunkSize: The maximum frames per task, 0 for no limit
+    :return: the number of frames per task
+    """
+    if frameTime <= 0 or maxLoadOverhead <= 0:
+        chunkSize = maxChunkSize
+    elif maxLoadOverhead >= 1:
+        chunkSize = 1
+    else:
+        # load / (load + chunk * frame) <= overhead
+        chunkSize = math.ceil(stageLoadTime * (1 - maxLoadOverhead) / (maxLoadOverhead * frameTime))
+
+    if maxChunkSize > 0:
+        chunkSize = min(chunkSize, maxChunkSize)
+
+    return max(1, int(chunkSize))
+
+
+def GetEvenChunkSize(frames, chunkSize):
+    """
+    Reduces the frames per task until every task renders evenly spaced frames, as one frame range.
+    :param frames: The sorted list of the job frames
+    :param chunkSize: The planned number of frames per task
+    :return: the largest number of frames per task, up to `chunkSize`, with evenly spaced tasks
+    """
+    for size in range(max(1, chunkSize), 1, -1):
+        if all(GetFrameStep(frames[start:start + size]) is not None for start in range(0, len(frames), size)):
+            return size
+    return 1
+
+
+# the statuses of a job waiting for its calibration, pending until its scheduled start, or submitted suspended
+AUTO_CHUNK_STATUSES = ("Pending", "Suspended")
+
+
+def ReleaseJob(job):
+    """
+    Starts a job waiting for its calibration, a pending job is released and a suspended job is resumed.
+    :param job: The job to start
+    """
+    if job.JobStatus == "Pending":
+        RepositoryUtils.ReleasePendingJob(job)
+    else:
+        RepositoryUtils.ResumeJob(job)
+
+
+def GetChildProcesses(pid):
+    """
+    Lists the processes started by a process, and the processes they started
+    :param pid: The id of the parent process
+    :return: the list of the descendant process ids
+    """
+    if psutil is not None:
+        try:
+            return [child.pid for child in psutil.Process(pid).children(recursive=True)]
+        except psutil.Error:
+            return []
+
+    if not os.path.isdir("/proc"):
+        return []
+
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open("/proc/{}/stat".format(entry)) as f:
+                # the parent id follows the state, after the parenthesized command name
+                parent = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (IOError, OSError, ValueError, IndexError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+
+    descendants = []
+    pending = [pid]
+    while pending:
+        for child in children.get(pending.pop(), []):
+            descendants.append(child)
+            pending.append(child)
+    return descendants
+
+
+def GetProcessPeakMemory(pid):
+    """
+    Reads the peak resident memory of a process over its lifetime
+    :param pid: The id of the process
+    :return: the memory in bytes, or 0 if the process cannot be read
+    """
+    try:
+        with open("/proc/{}/status".format(pid)) as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (IOError, OSError, ValueError):
+        pass
+
+    if psutil is not None:
+        try:
+            memory = psutil.Process(pid).memory_info()
+        except psutil.Error:
+            return 0
+        # windows keeps the peak working set, elsewhere the current size is the best sample
+        return getattr(memory, "peak_wset", memory.rss)
+
+    return 0
 
 
 class USDPlugin(DeadlinePlugin):
@@ -38,6 +252,9 @@ class USDPlugin(DeadlinePlugin):
         self.InitializeProcessCallback += self.InitializeProcess
         self.RenderExecutableCallback += self.RenderExecutable
         self.RenderArgumentCallback += self.RenderArgument
+        self.PreRenderTasksCallback += self.PreRenderTasks
+        self.PostRenderTasksCallback += self.PostRenderTasks
+        self.CheckExitCodeCallback += self.CheckExitCode
 
     def Cleanup(self):
         for stdoutHandler in self.StdoutHandlers:
@@ -46,6 +263,9 @@ class USDPlugin(DeadlinePlugin):
         del self.InitializeProcessCallback
         del self.RenderExecutableCallback
         del self.RenderArgumentCallback
+        del self.PreRenderTasksCallback
+        del self.PostRenderTasksCallback
+        del self.CheckExitCodeCallback
 
     def InitializeProcess(self):
         self.SingleFramesOnly = False
@@ -61,15 +281,185 @@ class USDPlugin(DeadlinePlugin):
         handlers = {
             "progress": self.HandleStdoutProgress,
             "done": self.HandleRenderFinish,
-            "error": self.HandleStdoutError
+            "error": self.HandleStdoutError,
+            "loaded": self.HandleStageLoaded,
+            "memory": self.HandleStdoutMemory
         }
 
+        self._persistent = self.GetBooleanPluginInfoEntryWithDefault("PersistentRenderer", False)
+        if self._persistent and "server" not in self._rendererSettings:
+            self.LogWarning('"{}" has no persistent server configuration, rendering a new process '
+                            'per task'.format(self._executable))
+            self._persistent = False
+
         rendererStout = self._rendererSettings.get("logs", {})
         for handler in handlers:
             for handler_pattern in rendererStout.get(handler, []):
                 self.AddStdoutHandlerCallback(handler_pattern).HandleCallback += handlers.get(
                     handler)
 
+    def PreRenderTasks(self):
+        self._taskTimings = {"start": time.time(), "loaded": None, "loadSource": None, "frames": [],
+                             "peakMemory": 0, "processMemory": {}, "sampled": 0}
+
+    def PostRenderTasks(self):
+        self._taskTimings["exit"] = time.time()
+
+        jobId = self.GetPluginInfoEntryWithDefault("AutoChunkJobId", "")
+        if jobId:
+            self.ApplyAutoChunkSize(jobId)
+
+        if self._batchedTiles:
+            self.CombineBatchedTiles()
+
+        if self.GetBooleanPluginInfoEntryWithDefault("WriteMetrics", True):
+            self.WriteTaskMetrics()
+
+    def GetTaskMetrics(self):
+        """
+        Summarizes the task timings measured from the renderer logs, in seconds.
+        The stage load runs until the `loaded` log (or the first progress), the render until the last
+        frame done, and the combine covers the post render script and the tiles combined by the plugin.
+        The peak memory is the one reported by the renderer, or sampled from the render process started
+        by this task on its progress. The `loadSource` and `peakMemorySource` tell which was measured.
+        :return: a dictionary of the task metrics
+        """
+        timings = self._taskTimings
+        end = time.time()
+        loaded = timings["loaded"] or timings["exit"]
+        rendered = timings["frames"][-1] if timings["frames"] else timings["exit"]
+
+        # the renderer reported peak, or the largest peak sampled from the processes of this task
+        peakMemory = timings["peakMemory"] or max(timings["processMemory"].values() or [0])
+        if timings["peakMemory"]:
+            peakMemorySource = "log"
+        else:
+            peakMemorySource = "process" if peakMemory else None
+
+        frames = timings["frames"]
+        return {
+            "job": self.GetJob().JobId,
+            "task": self.GetCurrentTaskId(),
+            "worker": self.GetSlaveName(),
+            "executable": self._executable,
+            "frames": [self.GetStartFrame(), self.GetEndFrame()],
+            "start": timings["start"],
+            "load": loaded - timings["start"],
+            # `log` if measured, `progress` if approximated by the first progress, `exit` if unknown
+            "loadSource": timings["loadSource"] or "exit",
+            "render": rendered - loaded,
+            "combine": end - rendered,
+            "total": end - timings["start"],
+            "frameTimes": [b - a for a, b in zip([loaded] + frames, frames)],
+            "peakMemory": peakMemory,
+            "peakMemorySource": peakMemorySource,
+        }
+
+    def WriteTaskMetrics(self):
+        """
+        Writes the task metrics as json in a `.usd_metrics` directory next to the output.
+        """
+        metrics = self.GetTaskMetrics()
+        metricsDirectory = os.path.join(self._outputDirectory, ".usd_metrics")
+        metricsPath = os.path.join(metricsDirectory, "{}_task{}.json".format(metrics["job"], metrics["task"]))
+
+        try:
+            if not os.path.isdir(metricsDirectory):
+                os.makedirs(metricsDirectory)
+            with open(metricsPath, "w") as f:
+                json.dump(metrics, f, indent=2)
+        except (IOError, OSError) as e:
+            self.LogWarning("Cannot write the task metrics to {}: {}".format(metricsPath, e))
+            return
+
+        self.LogInfo("Task metrics: load {load:.1f}s, render {render:.1f}s, combine {combine:.1f}s, "
+                     "peak memory {peakMemory} bytes".format(**metrics))
+
+    def CombineBatchedTiles(self):
+        """
+        Registers every tile rendered by this task, the frames are assembled once all their tiles are done
+        """
+        spec = importlib.util.spec_from_file_location("combine_images", combine_images_path)
+        combine_images = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(combine_images)
+
+        if not os.getenv("OIIO"):
+            combine_images.OIIO = os.path.join(os.path.dirname(self._renderExecutable), "hoiiotool")
+
+        tile_count = self.GetIntegerPluginInfoEntryWithDefault("XTile", 0) * self.GetIntegerPluginInfoEntryWithDefault("YTile", 0)
+        delete_tiles = self.GetBooleanPluginInfoEntryWithDefault("DeleteTiles", False)
+        for tile_path, output_path_resolved in self._batchedTiles:
+            tile_path = self.MapAndCleanPath(tile_path)
+            output_path_resolved = self.MapAndCleanPath(output_path_resolved)
+            if not os.path.isfile(tile_path):
+                self.FailRender('The tile "{}" was not rendered'.format(tile_path))
+            try:
+                combine_images.add_tile(tile_path, output_path_resolved, tile_count, delete=delete_tiles)
+            except RuntimeError as e:
+                self.FailRender(str(e))
+
+    def ApplyAutoChunkSize(self, jobId):
+        """
+        Sets the frames per task of a pending job from the timings measured by this task, then releases it.
+        The stage load time is taken until the first progress report, and the frame time from the frames
+        finished after it. The frames per task is reduced until every task renders evenly spaced frames.
+        :param jobId: The id of the job to update
+        """
+        job = RepositoryUtils.GetJob(jobId, True)
+        if job is None or job.JobStatus not in AUTO_CHUNK_STATUSES:
+            # an earlier attempt of the calibration failed, or the calibration timeout released the job, its
+            # tasks may be rendering
+            self.LogWarning("Job {} was released, it keeps its frames per task".format(jobId))
+            return
+
+        timings = self._taskTimings
+        if timings["loaded"] and timings["frames"]:
+            frames = GetFrameList(job.JobFrames)
+            stageLoadTime = timings["loaded"] - timings["start"]
+            frameTime = (timings["frames"][-1] - timings["loaded"]) / len(timings["frames"])
+            plannedChunkSize = PlanChunkSize(
+                stageLoadTime,
+                frameTime,
+                maxLoadOverhead=float(self.GetPluginInfoEntryWithDefault("MaxLoadOverhead", "0.1")),
+                maxChunkSize=len(frames)
+            )
+            chunkSize = GetEvenChunkSize(frames, plannedChunkSize)
+            if chunkSize != plannedChunkSize:
+                self.LogInfo("Reduced the frames per task from {} to {} so the tasks render evenly spaced "
+                             "frames".format(plannedChunkSize, chunkSize))
+            self.LogInfo("Stage load {:.1f}s, frame {:.1f}s: setting job {} frames per task to {}".format(
+                stageLoadTime, frameTime, jobId, chunkSize))
+            RepositoryUtils.SetJobFrameRange(job, job.JobFrames, chunkSize)
+        else:
+            self.LogWarning("No frame timings were measured, job {} keeps its frames per task".format(jobId))
+
+        if self.GetBooleanPluginInfoEntryWithDefault("AutoChunkResume", True):
+            ReleaseJob(job)
+
+    def ReleaseAutoChunkJob(self, reason):
+        """
+        Releases the pending job of a failed calibration task with its submitted frames per task, without
+        waiting for the calibration timeout
+        :param reason: The failure, logged with the warning
+        """
+        jobId = self.GetPluginInfoEntryWithDefault("AutoChunkJobId", "")
+        if not jobId or not self.GetBooleanPluginInfoEntryWithDefault("AutoChunkResume", True):
+            return
+
+        job = RepositoryUtils.GetJob(jobId, True)
+        if job is None or job.JobStatus not in AUTO_CHUNK_STATUSES:
+            return
+
+        self.LogWarning("The calibration failed ({}), releasing job {} with its submitted frames per "
+                        "task".format(reason, jobId))
+        ReleaseJob(job)
+
+    def CheckExitCode(self, exitCode):
+        if exitCode != 0:
+            message = "The renderer exited with the code {}".format(exitCode)
+            self.ReleaseAutoChunkJob(message)
+            self.FailRender(message)
+
     def RenderExecutable(self):
         version = self.GetPluginInfoEntryWithDefault("Version", "")
 
@@ -83,6 +473,16 @@ class USDPlugin(DeadlinePlugin):
                             'can be configured from the Plugin Configuration in the Deadline '
                             'Monitor.'.format(executable=executable, executableList=executableList))
 
+        self._renderExecutable = executable
+        if self._persistent:
+            # the task runs the persistent renderer client, which starts the render executable
+            pythonList = self.GetConfigEntryWithDefault("PythonExecutable", "")
+            executable = FileUtils.SearchFileList(pythonList)
+            if not executable:
+                self.FailRender('The python executable was not found in the semicolon separated list '
+                                '"{}". It is required by the persistent renderer and can be configured '
+                                'from the Plugin Configuration in the Deadline Monitor.'.format(pythonList))
+
         return executable
 
     def RenderArgument(self):
@@ -90,16 +490,16 @@ class USDPlugin(DeadlinePlugin):
         Build up the render arguments we pass to the render executable
         :return: a string of render arguments
         """
-        self.cmds = []
+        self.argValues = {}
+        self._batchedTiles = []
         usdFile = self.GetPluginInfoEntryWithDefault("usdFile", self.GetDataFilename()).strip().replace("\\", "/")
 
         frame = self.GetStartFrame()
         outputFile = self.GetPluginInfoEntry("OutputFile")
+        self._outputDirectory = os.path.dirname(self.MapAndCleanPath(self.substitute_frame_numbers(outputFile, frame)))
         self.formateCommandlineArgs(
             usdFile=self.MapAndCleanPath(usdFile),
             renderer=self._renderer,
-            frameIncement=1,
-            chunkSize=self.GetIntegerPluginInfoEntryWithDefault("ChunkSize", 1),
             renderSettings=self.GetPluginInfoEntryWithDefault("RenderSetting",
                                                               "/Render/rendersettings")
         )
@@ -141,41 +541,72 @@ class USDPlugin(DeadlinePlugin):
 
             delete_tiles = self.GetBooleanPluginInfoEntryWithDefault("DeleteTiles", False)
             tile_count = int(x_tile) * int(y_tile)
-            start_frame = int(re.findall(r"(\d+)", self.GetPluginInfoEntry("Frames"))[0])
             current_frame = self.GetStartFrame()
+            task_count = self.GetEndFrame() - current_frame + 1
 
-            frame = ((current_frame - start_frame) // tile_count) + start_frame
-            index = (current_frame - frame) % tile_count
-
-            output_path_resolved = self.substitute_frame_numbers(outputFile, frame)
-            items = output_path_resolved.rsplit('.', 1)
-            items.insert(1, self.substitute_frame_numbers("_tile%02d", index))
-            items.insert(2, '.')
-            tile_path = ''.join(items)
-            outputFile = tile_path
-
-            # post script
-            post_script = '{} --add {} {}'.format(
-                self.MapAndCleanPath(combine_images_path),
-                self.MapAndCleanPath(tile_path),
-                self.MapAndCleanPath(output_path_resolved)
-            )
-            if delete_tiles:
-                post_script += ' --delete'
+            # the task `t` renders the tile `t % tile_count` of the frame at the position `t // tile_count`
+            tile_frame_list = self.GetPluginInfoEntryWithDefault("TileFrameList", "")
+            if tile_frame_list:
+                task_offset = 0
+                get_frame = GetFrameList(tile_frame_list).__getitem__
+            else:
+                # jobs submitted before the tile frame list render a contiguous range from its first frame
+                task_offset = int(re.findall(r"(\d+)", self.GetPluginInfoEntry("Frames"))[0])
+                get_frame = lambda position: task_offset + position
+
+            position, index = divmod(current_frame - task_offset, tile_count)
+            frame = get_frame(position)
 
             self.formateCommandlineArgs(
                 tileX=str(x_tile),
-                tileY=str(y_tile),
-                tileIndex=str(index),
-                postRenderScript=post_script
-
+                tileY=str(y_tile)
             )
 
+            # a task covering whole frames renders all their tiles in one invocation
+            if (self.GetBooleanPluginInfoEntryWithDefault("TileBatchEnable", False)
+                    and index == 0
+                    and task_count % tile_count == 0):
+                batch_frames = [get_frame(x) for x in range(position, position + task_count // tile_count)]
+                self.setFrameRange(batch_frames)
+                for batch_frame in batch_frames:
+                    for batch_index in range(tile_count):
+                        self._batchedTiles.append(self.getTilePaths(outputFile, batch_frame, batch_index))
+
+                self.LogInfo("Rendering the {} tiles of {} frames".format(tile_count, len(batch_frames)))
+                self.formateCommandlineArgs(
+                    tileSuffix="_tile%02d"
+                )
+
+            else:
+                tile_path, output_path_resolved = self.getTilePaths(outputFile, frame, index)
+                outputFile = tile_path
+
+                # post script
+                post_script = '{} --tile {} {} --tile-count {}'.format(
+                    self.MapAndCleanPath(combine_images_path),
+                    self.MapAndCleanPath(tile_path),
+                    self.MapAndCleanPath(output_path_resolved),
+                    tile_count
+                )
+                if delete_tiles:
+                    post_script += ' --delete'
+
+                self.setFrameRange([frame])
+                self.formateCommandlineArgs(
+                    tileIndex=str(index),
+                    postRenderScript=post_script
+                )
+
+        else:
+            self.setFrameRange(self.GetTaskFrames())
+
         self.formateCommandlineArgs(
-            frameStart=str(frame),
             outputFile=outputFile
         )
 
+        self.cmds = self.buildCommandlineArgs()
+        if self._persistent:
+            self.cmds = self.persistentRenderArgs()
         print("Arguments::", self.quoteCommandlineArgs(self.cmds))
 
         return self.quoteCommandlineArgs(self.cmds)
@@ -193,19 +624,90 @@ class USDPlugin(DeadlinePlugin):
             return " ".join(quote(arg) for arg in commandline)
 
     def formateCommandlineArgs(self, **kwargs):
+        """
+        Sets the values of the argument placeholders, the arguments are built once by `buildCommandlineArgs`
+        """
+        self.argValues.update(kwargs)
 
-        for cmd in self._rendererSettings.get("args", {}):
-            try:
-                formatted_option = [c.format(**kwargs) for c in cmd]
+    def buildCommandlineArgs(self, section="args"):
+        """
+        Formats, in the renderer settings order, every argument whose placeholders all have values
+        :param section: The renderer settings section of the argument templates
+        :return: The list of commandline arguments
+        """
+        templates, index = GetCompiledRendererArgs(self._executable, section)
+
+        positions = {position for placeholder in self.argValues for position in index.get(placeholder, ())}
+        positions.update(position for position, (_, placeholders) in enumerate(templates) if not placeholders)
 
-                # one argument
-                if len(formatted_option) == 1:
-                    if formatted_option[0] not in self.cmds:
-                        self.cmds.extend(formatted_option)
-                else:
-                    self.cmds.extend(formatted_option)
-            except KeyError:
-                continue
+        cmds = []
+        for position in sorted(positions):
+            template, placeholders = templates[position]
+            if placeholders.issubset(self.argValues):
+                cmds.extend(option.format(**self.argValues) for option in template)
+
+        return cmds
+
+    def persistentRenderArgs(self):
+        """
+        Wraps the task render arguments into a request to the persistent renderer of this worker.
+        The renderer is started from the `server` arguments and reused while they do not change.
+        :return: The list of commandline arguments of the persistent renderer client
+        """
+        self.formateCommandlineArgs(
+            executable=self._renderExecutable,
+            pluginDirectory=self.GetPluginDirectory()
+        )
+        command = self.buildCommandlineArgs("server")
+
+        return [
+            self.MapAndCleanPath(persistent_render_path),
+            "render",
+            "--name", "{}_{}".format(self.GetSlaveName(), self.GetThreadNumber()),
+            "--idle-timeout", str(self.GetIntegerPluginInfoEntryWithDefault("PersistentIdleTimeout", 600)),
+            "--command", json.dumps(command),
+            "--request", json.dumps({"args": self.cmds}),
+        ]
+
+    def GetTaskFrames(self):
+        """
+        The frames of the current task, looked up in the job frame list
+        :return: the sorted list of the task frames
+        """
+        frames = GetFrameList(self.GetJob().JobFrames)
+        start = bisect.bisect_left(frames, self.GetStartFrame())
+        end = bisect.bisect_right(frames, self.GetEndFrame())
+        return frames[start:end] or [self.GetStartFrame()]
+
+    def setFrameRange(self, frames):
+        """
+        Sets the frame range arguments rendering the given frames
+        :param frames: The sorted list of frames, evenly spaced
+        """
+        step = GetFrameStep(frames)
+        if step is None:
+            self.FailRender("The task frames {} are not evenly spaced and cannot be rendered as one frame range, "
+                            "use 1 frame per task or an evenly stepped frame list".format(frames))
+            return
+
+        self.formateCommandlineArgs(
+            frameStart=str(frames[0]),
+            chunkSize=str(len(frames)),
+            frameIncement=str(step)
+        )
+
+    def getTilePaths(self, outputFile, frame, index):
+        """
+        Resolves the tile image and the final image paths of a frame tile
+        :return: a tuple of `(tile_path, output_path_resolved)`
+        """
+        output_path_resolved = self.substitute_frame_numbers(outputFile, frame)
+        items = output_path_resolved.rsplit('.', 1)
+        items.insert(1, self.substitute_frame_numbers("_tile%02d", index))
+        items.insert(2, '.')
+        tile_path = ''.join(items)
+
+        return tile_path, output_path_resolved
 
     def MapAndCleanPath(self, path):
         path = RepositoryUtils.CheckPathMapping(path)
@@ -239,11 +741,41 @@ class USDPlugin(DeadlinePlugin):
         return re.sub(pattern, replace, path_pattern)
 
     def HandleRenderFinish(self):
+        self._taskTimings["frames"].append(time.time())
+        if not self._persistent:
+            self.SampleProcessMemory()
         self.SetProgress(100.0)
 
+    def HandleStageLoaded(self):
+        if not self._taskTimings["loaded"]:
+            self._taskTimings["loaded"] = time.time()
+            self._taskTimings["loadSource"] = "log"
+
+    def HandleStdoutMemory(self):
+        # the memory patterns capture the size and its unit
+        memory = ParseMemory(self.GetRegexMatch(1), self.GetRegexMatch(2))
+        self._taskTimings["peakMemory"] = max(self._taskTimings["peakMemory"], memory)
+
+    def SampleProcessMemory(self):
+        """
+        Records the peak memory of the processes started by this task, the peak is kept by the system
+        over the life of each process so a sample before its exit covers the whole render
+        """
+        self._taskTimings["sampled"] = time.time()
+        processMemory = self._taskTimings["processMemory"]
+        for pid in GetChildProcesses(os.getpid()):
+            processMemory[pid] = max(processMemory.get(pid, 0), GetProcessPeakMemory(pid))
+
     def HandleStdoutProgress(self):
+        if not self._taskTimings["loaded"]:
+            self._taskTimings["loaded"] = time.time()
+            self._taskTimings["loadSource"] = "progress"
+        # the persistent renderer runs detached, its memory is only known from its logs
+        if not self._persistent and time.time() - self._taskTimings["sampled"] >= 1.0:
+            self.SampleProcessMemory()
         self.SetStatusMessage(self.GetRegexMatch(0))
         self.SetProgress(float(self.GetRegexMatch(1)))
 
     def HandleStdoutError(self):
+        self.ReleaseAutoChunkJob(self.GetRegexMatch(0))
         self.FailRender(self.GetRegexMatch(0))
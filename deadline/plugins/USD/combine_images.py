@@ -1,47 +1,555 @@
 import subprocess
 import argparse
+import concurrent.futures
+import hashlib
+import json
 import os
 import re
+import socket
+import sys
+import time
+
+try:
+    import numpy as np
+    import OpenImageIO as oiio
+except ImportError:
+    np = None
+    oiio = None
 
 OIIO = os.getenv("OIIO", "hoiiotool")
+LEDGER_NAME = "combine_ledger.json"
+# the ledger is saved at most once per interval while combining, and at the end
+LEDGER_SAVE_INTERVAL = 10
+CLAIM_NAME = "assemble.lock"
+# an assembly claim older than this is left by a crashed process
+CLAIM_TIMEOUT = 60 * 60
+
+
+def read_tile(input_image):
+    """
+    Reads a tile image into a float32 array with its placement in the full frame.
+
+    Args:
+        input_image (str): The path to the tile image.
+
+    Returns:
+        tuple: The pixels array (height, width, channels) and the image spec.
+    """
+    image_input = oiio.ImageInput.open(input_image)
+    if not image_input:
+        raise IOError(oiio.geterror())
+
+    try:
+        spec = image_input.spec()
+        pixels = image_input.read_image(oiio.FLOAT)
+    finally:
+        image_input.close()
+
+    if pixels is None:
+        raise IOError("Cannot read pixels of `{}`".format(input_image))
+
+    return pixels.reshape(spec.height, spec.width, spec.nchannels), spec
+
+
+def get_frame_spec(spec):
+    """
+    Returns the spec of the full frame with the tile spec channels and pixel format.
+
+    Args:
+        spec (oiio.ImageSpec): The spec of any tile of the frame.
+
+    Returns:
+        oiio.ImageSpec: The frame spec.
+    """
+    out_spec = oiio.ImageSpec(spec.full_width, spec.full_height, spec.nchannels, spec.format)
+    out_spec.channelnames = spec.channelnames
+    out_spec.x = out_spec.full_x = spec.full_x
+    out_spec.y = out_spec.full_y = spec.full_y
+
+    return out_spec
+
+
+def write_frame(output_file, pixels, spec):
+    """
+    Writes the assembled frame with the tile spec channels and pixel format.
+
+    Args:
+        output_file (str): The path to the output image.
+        pixels (np.ndarray): The assembled frame pixels.
+        spec (oiio.ImageSpec): The spec of any tile of the frame.
+    """
+    out_spec = get_frame_spec(spec)
+
+    image_output = oiio.ImageOutput.create(output_file)
+    if not image_output:
+        raise IOError(oiio.geterror())
+
+    image_output.open(output_file, out_spec)
+    try:
+        image_output.write_image(pixels)
+    finally:
+        image_output.close()
+
+
+def assemble_tiles(output_file, *input_images):
+    """
+    Reads every tile once, accumulates it into a single preallocated frame buffer
+    and writes the frame once.
+
+    Each tile is placed at its data window inside the full (display) window, so
+    both full frame tiles with black surroundings and cropped tiles are supported.
+
+    Args:
+        output_file (str): The path to the output image.
+        input_images (list): A list of the input images.
+
+    Returns:
+        list: The input images that were merged.
+
+    Raises:
+        IOError: If a tile cannot be read, the output is then left untouched.
+    """
+    frame = None
+    frame_spec = None
+    merged = []
+
+    for input_image in input_images:
+        try:
+            pixels, spec = read_tile(input_image)
+        except Exception as e:
+            raise IOError("`{}` for `{}`".format(e, input_image))
+
+        if frame is None:
+            frame_spec = spec
+            frame = np.zeros((spec.full_height, spec.full_width, spec.nchannels), dtype=np.float32)
+
+        x = spec.x - frame_spec.full_x
+        y = spec.y - frame_spec.full_y
+        channels = min(spec.nchannels, frame.shape[2])
+        frame[y:y + spec.height, x:x + spec.width, :channels] += pixels[:, :, :channels]
+        merged.append(input_image)
+
+    if frame is not None:
+        write_frame(output_file, frame, frame_spec)
+
+    return merged
+
+
+def stream_tiles(output_file, *input_images, strip_rows=0):
+    """
+    Stitches the tiles strip by strip, reading only the tile scanlines overlapping
+    the current strip, so the peak memory is one strip instead of the whole frame.
+
+    The frame is written to a temporary file renamed over the output at the end,
+    which also allows the output to be one of the inputs.
+
+    Args:
+        output_file (str): The path to the output image.
+        input_images (list): A list of the input images.
+        strip_rows (int): The scanlines per strip, 0 uses one tile row.
+
+    Returns:
+        list: The input images that were merged.
+
+    Raises:
+        IOError: If a tile cannot be read, the output is then left untouched.
+    """
+    inputs = []
+    for input_image in input_images:
+        image_input = oiio.ImageInput.open(input_image)
+        if not image_input:
+            error = oiio.geterror()
+            for _, opened_input, _ in inputs:
+                opened_input.close()
+            raise IOError("`{}` for `{}`".format(error, input_image))
+        inputs.append((input_image, image_input, image_input.spec()))
+
+    frame_spec = get_frame_spec(inputs[0][2])
+    if strip_rows <= 0:
+        strip_rows = min(spec.height for _, _, spec in inputs)
+
+    root, name = os.path.split(output_file)
+    temp_file = os.path.join(root, ".{}.{}".format(os.getpid(), name))
+    image_output = oiio.ImageOutput.create(temp_file)
+    if not image_output:
+        for _, image_input, _ in inputs:
+            image_input.close()
+        raise IOError(oiio.geterror())
+
+    image_output.open(temp_file, frame_spec)
+    try:
+        frame_end = frame_spec.y + frame_spec.height
+        for y_begin in range(frame_spec.y, frame_end, strip_rows):
+            y_end = min(y_begin + strip_rows, frame_end)
+            strip = np.zeros((y_end - y_begin, frame_spec.width, frame_spec.nchannels), dtype=np.float32)
+
+            for input_image, image_input, spec in inputs:
+                top = max(y_begin, spec.y)
+                bottom = min(y_end, spec.y + spec.height)
+                if top >= bottom:
+                    continue
+
+                channels = min(spec.nchannels, frame_spec.nchannels)
+                pixels = image_input.read_scanlines(0, 0, top, bottom, 0, 0, channels, oiio.FLOAT)
+                if pixels is None:
+                    raise IOError("`{}` for `{}`".format(image_input.geterror(), input_image))
+                pixels = pixels.reshape(bottom - top, spec.width, channels)
+
+                x = spec.x - frame_spec.x
+                strip[top - y_begin:bottom - y_begin, x:x + spec.width, :channels] += pixels
+
+            image_output.write_scanlines(y_begin, y_end, 0, strip)
+    except Exception:
+        image_output.close()
+        os.remove(temp_file)
+        raise
+    else:
+        image_output.close()
+    finally:
+        for _, image_input, _ in inputs:
+            image_input.close()
+
+    os.replace(temp_file, output_file)
+
+    return [input_image for input_image, _, _ in inputs]
+
+
+def run_hoiiotool(output_file, *input_images):
+    """
+    Adds all the input images with a single `hoiiotool` invocation.
 
+    Args:
+        output_file (str): The path to the output image.
+        input_images (list): A list of the input images.
+
+    Returns:
+        list: The input images that were merged.
 
-def merge_images(output_file, *input_images, delete=False):
+    Raises:
+        IOError: If `hoiiotool` fails.
+    """
+    # written to a temporary file renamed over the output, so a failure leaves the output as it was
+    root, name = os.path.split(output_file)
+    temp_file = os.path.join(root, ".{}.{}".format(os.getpid(), name))
+
+    args = [OIIO, '-a', input_images[0]]
+    for input_image in input_images[1:]:
+        args.extend([input_image, '--add'])
+    args.extend(['-o', temp_file])
+
+    print("Merging: {}".format(args))
+    process = subprocess.Popen(args)
+    if process.wait() != 0:
+        if os.path.isfile(temp_file):
+            os.remove(temp_file)
+        raise IOError("`{}` exited with code {}".format(OIIO, process.returncode))
+
+    os.replace(temp_file, output_file)
+
+    return list(input_images)
+
+
+def merge_images(output_file, *input_images, delete=False, overwrite=False, strip_rows=None):
     """
     Merges a list of input images into a single output image.
 
+    The images are read once and the output is written once, in process when
+    the OpenImageIO python module is available, otherwise with one `hoiiotool` call.
+
     Args:
         output_file (str): The path to the output image.
         input_images (list): A list of the input images.
         delete (bool): delete the original images
+        overwrite (bool): replace the output image instead of adding onto it
+        strip_rows (int): stream the output by strips of scanlines, 0 uses one tile
+            row, None assembles the whole frame in memory
+
+    Returns:
+        dict: The merged tiles and their number, bytes read and bytes written.
 
+    Raises:
+        RuntimeError: If an input image is missing or cannot be read, the output
+            image is then not written.
     """
-    # if not OIIO or os.path.exists(OIIO):
-    #     print("ERROR: Cannot file OIIO at {}".format(OIIO))
-    #     return
-    print("os.path.exists(OIIO)", os.path.exists(OIIO), )
+    missing = [x for x in input_images if not os.path.isfile(x)]
+    if missing:
+        raise RuntimeError("Cannot merge `{}`, the images {} are missing".format(output_file, missing))
 
     if not os.path.isdir(os.path.dirname(output_file)):
         os.makedirs(os.path.dirname(output_file))
 
-    for input_image in input_images:
-        try:
-            args = [OIIO]
-            args.append('-a')
-            args.append('--add')  #--deep-copy
-            args.append(input_image)
-            if os.path.isfile(output_file):
-                args.append(output_file)
-            args.extend(['-o', output_file])
-
-            print("Merging: {}".format(args))
-            process = subprocess.Popen(args)
-            process.wait()
-
-            if delete:
+    # accumulate onto the existing frame when adding a single tile
+    sources = list(input_images)
+    if os.path.isfile(output_file) and not overwrite:
+        sources.append(output_file)
+
+    stats = {"tiles": 0, "bytes_read": 0, "bytes_written": 0, "merged": []}
+    if not sources:
+        return stats
+
+    bytes_read = sum(os.path.getsize(x) for x in sources)
+
+    try:
+        if oiio is not None and strip_rows is not None:
+            merged = stream_tiles(output_file, *sources, strip_rows=strip_rows)
+        elif oiio is not None:
+            merged = assemble_tiles(output_file, *sources)
+        else:
+            merged = run_hoiiotool(output_file, *sources)
+    except IOError as e:
+        raise RuntimeError("Cannot merge `{}`: {}".format(output_file, e))
+
+    if not os.path.isfile(output_file):
+        raise RuntimeError("Cannot write `{}`".format(output_file))
+
+    stats["merged"] = [x for x in merged if x != output_file]
+    stats["tiles"] = len(stats["merged"])
+    stats["bytes_read"] = bytes_read
+    stats["bytes_written"] = os.path.getsize(output_file)
+    print("Merged {tiles} tiles into `{output}`: {bytes_read} bytes read, "
+          "{bytes_written} bytes written".format(output=output_file, **stats))
+
+    if delete:
+        for input_image in input_images:
+            if input_image in merged:
                 os.remove(input_image)
-        except Exception as e:
-            print("ERROR: `{}` for `{}`".format(e, input_image))
+
+    return stats
+
+
+def get_manifest_dir(final_image):
+    """
+    Returns the directory holding the tile manifests of a final image.
+
+    Args:
+        final_image (str): The path to the final image.
+
+    Returns:
+        str: The manifest directory path.
+    """
+    root, name = os.path.split(final_image)
+    return os.path.join(root, ".{}.tiles".format(name))
+
+
+def write_tile_manifest(tile_image, final_image):
+    """
+    Drops a sidecar manifest for a finished tile, written atomically with a rename
+    so concurrent tiles never see a partial manifest.
+
+    Args:
+        tile_image (str): The path to the tile image.
+        final_image (str): The path to the final image.
+
+    Returns:
+        str: The manifest path.
+    """
+    manifest_dir = get_manifest_dir(final_image)
+    if not os.path.isdir(manifest_dir):
+        os.makedirs(manifest_dir, exist_ok=True)
+
+    stat = os.stat(tile_image)
+    manifest = {
+        "tile": os.path.abspath(tile_image),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "host": socket.gethostname(),
+    }
+
+    manifest_path = os.path.join(manifest_dir, os.path.basename(tile_image) + ".json")
+    temp_path = "{}.{}.{}.tmp".format(manifest_path, socket.gethostname(), os.getpid())
+    with open(temp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(temp_path, manifest_path)
+
+    return manifest_path
+
+
+def read_tile_manifests(final_image):
+    """
+    Reads the manifests of the finished tiles of a final image.
+
+    Args:
+        final_image (str): The path to the final image.
+
+    Returns:
+        list: The manifests dictionaries.
+    """
+    manifest_dir = get_manifest_dir(final_image)
+    if not os.path.isdir(manifest_dir):
+        return []
+
+    manifests = []
+    for name in sorted(os.listdir(manifest_dir)):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(manifest_dir, name), "r") as f:
+            manifests.append(json.load(f))
+
+    return manifests
+
+
+def read_claim(claim_path):
+    try:
+        with open(claim_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_claim_stale(claim):
+    """
+    Tells if an assembly claim was left by a process which is gone, the owner process is checked
+    on the same host, else the claim age.
+
+    Args:
+        claim (dict): The claim, `{"host", "pid", "time"}`.
+
+    Returns:
+        bool: True if the claim can be taken over.
+    """
+    if claim is None:
+        return True
+
+    if time.time() - claim.get("time", 0) > CLAIM_TIMEOUT:
+        return True
+
+    # os.kill terminates the process on windows, the claim age is the only check there
+    if os.name == "posix" and claim.get("host") == socket.gethostname():
+        try:
+            os.kill(claim["pid"], 0)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            return False
+
+    return False
+
+
+def claim_assembly(final_image):
+    """
+    Atomically claims the assembly of a final image, only one caller can succeed.
+    A stale claim left by a crashed process is taken over.
+
+    Args:
+        final_image (str): The path to the final image.
+
+    Returns:
+        str: The claim file path, or None if the assembly is already claimed.
+    """
+    claim_path = os.path.join(get_manifest_dir(final_image), CLAIM_NAME)
+    claim = {"host": socket.gethostname(), "pid": os.getpid(), "time": time.time()}
+
+    for attempt in range(2):
+        try:
+            fd = os.open(claim_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if attempt or not release_stale_claim(claim_path):
+                return None
+            continue
+
+        with os.fdopen(fd, "w") as f:
+            json.dump(claim, f)
+        return claim_path
+
+    return None
+
+
+def release_stale_claim(claim_path):
+    """
+    Removes a stale claim. The claim is moved aside before it is removed, and put back if another
+    process claimed the assembly meanwhile.
+
+    Args:
+        claim_path (str): The claim file path.
+
+    Returns:
+        bool: True if the claim was stale and is removed.
+    """
+    claim = read_claim(claim_path)
+    if not is_claim_stale(claim):
+        return False
+
+    print("Taking over the stale assembly claim `{}`: {}".format(claim_path, claim))
+    stale_path = "{}.{}.{}.stale".format(claim_path, socket.gethostname(), os.getpid())
+    try:
+        os.replace(claim_path, stale_path)
+    except FileNotFoundError:
+        return True
+
+    if read_claim(stale_path) != claim:
+        # a new claim was taken since the stale one was read
+        try:
+            os.link(stale_path, claim_path)
+        except OSError:
+            pass
+        os.remove(stale_path)
+        return False
+
+    os.remove(stale_path)
+    return True
+
+
+def add_tile(tile_image, final_image, tile_count, delete=False, strip_rows=None):
+    """
+    Registers a finished tile and assembles the final image once all the tiles of
+    the frame are done.
+
+    Tile tasks never touch the final image themselves, the last tile to finish
+    claims the assembly and merges every tile in a single pass, so tiles of the
+    same frame can render concurrently without lost writes. The manifests are only
+    removed once every tile is merged, else the claim is released for a requeued tile.
+
+    Args:
+        tile_image (str): The path to the tile image.
+        final_image (str): The path to the final image.
+        tile_count (int): The number of tiles of the frame.
+        delete (bool): delete the tiles after combining
+        strip_rows (int): stream the output by strips of scanlines, see `merge_images`
+
+    Returns:
+        dict: The merge stats, or None if the frame is still waiting for tiles.
+
+    Raises:
+        RuntimeError: If the tiles cannot be merged into the final image.
+    """
+    write_tile_manifest(tile_image, final_image)
+
+    manifests = read_tile_manifests(final_image)
+    if len(manifests) < tile_count:
+        print("Tile `{}` done, {}/{} tiles of `{}`".format(
+            tile_image, len(manifests), tile_count, final_image))
+        return None
+
+    claim_path = claim_assembly(final_image)
+    if not claim_path:
+        print("Assembly of `{}` is already claimed".format(final_image))
+        return None
+
+    # re-read under the claim so every tile done so far is merged, the tiles are only deleted
+    # once the whole frame is written
+    try:
+        tiles = sorted(set(x["tile"] for x in read_tile_manifests(final_image)))
+        stats = merge_images(final_image, *tiles, overwrite=True, strip_rows=strip_rows)
+    except Exception:
+        # release the claim so a requeued tile can assemble the frame
+        os.remove(claim_path)
+        raise
+
+    if sorted(stats["merged"]) != tiles:
+        os.remove(claim_path)
+        raise RuntimeError("Merged {} of the {} tiles of `{}`, the tile manifests are kept".format(
+            stats["tiles"], len(tiles), final_image))
+
+    if delete:
+        for tile in tiles:
+            os.remove(tile)
+
+    manifest_dir = get_manifest_dir(final_image)
+    for name in os.listdir(manifest_dir):
+        os.remove(os.path.join(manifest_dir, name))
+    os.rmdir(manifest_dir)
+
+    return stats
 
 
 def group_files(file_list):
@@ -68,13 +576,347 @@ def group_files(file_list):
     return file_groups
 
 
-def combin_images(root_dir, delete=False):
+def estimate_frame_memory(input_images, strip_rows=None):
+    """
+    Estimates the peak memory in bytes needed to merge the tiles of one frame.
+
+    Args:
+        input_images (list): A list of the input images of the frame.
+        strip_rows (int): The scanlines per strip when streaming, see `merge_images`
+
+    Returns:
+        int: The estimated memory in bytes.
+    """
+    if oiio is not None:
+        image_input = oiio.ImageInput.open(input_images[0])
+        if image_input:
+            spec = image_input.spec()
+            image_input.close()
+            if strip_rows is not None:
+                # one strip buffer plus the tile scanlines read into it
+                rows = strip_rows or spec.height
+                return rows * (spec.full_width + spec.width) * spec.nchannels * 4
+
+            # the frame buffer plus one decoded tile at a time
+            frame_bytes = spec.full_width * spec.full_height * spec.nchannels * 4
+            tile_bytes = spec.width * spec.height * spec.nchannels * 4
+            return frame_bytes + tile_bytes
+
+    # hoiiotool holds all the inputs, the file sizes are the lower bound
+    return sum(os.path.getsize(x) for x in input_images)
+
+
+def get_workers_count(jobs, workers=1, memory_budget=0, strip_rows=None):
+    """
+    Returns the number of concurrent frame merges fitting in the memory budget.
+
+    Args:
+        jobs (list): A list of `(output_file, input_images)` to merge.
+        workers (int): The maximum number of workers, 0 uses all the cpus.
+        memory_budget (int): The memory budget in bytes, 0 for no limit.
+        strip_rows (int): The scanlines per strip when streaming, see `merge_images`
+
+    Returns:
+        int: The number of workers.
+    """
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+
+    if memory_budget > 0 and jobs:
+        # frames of a job share the same resolution and tiling
+        frame_memory = estimate_frame_memory(jobs[0][1], strip_rows=strip_rows)
+        workers = min(workers, memory_budget // max(frame_memory, 1))
+
+    return max(1, min(workers, len(jobs)))
+
+
+def get_file_hash(path):
+    """
+    Returns the sha1 of a file content.
+
+    Args:
+        path (str): The file path.
+
+    Returns:
+        str: The hex digest.
+    """
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha1.update(chunk)
+
+    return sha1.hexdigest()
+
+
+def get_file_signature(path, hash=False):
+    """
+    Returns the signature of a file recorded in the ledger.
+
+    Args:
+        path (str): The file path.
+        hash (bool): also record the content hash
+
+    Returns:
+        dict: The file size, mtime and optionally its sha1.
+    """
+    stat = os.stat(path)
+    signature = {"size": stat.st_size, "mtime": stat.st_mtime}
+    if hash:
+        signature["sha1"] = get_file_hash(path)
+
+    return signature
+
+
+def is_signature_match(path, signature):
+    """
+    Checks a file against its ledger signature, the content hash is only compared
+    when the size matches but the mtime does not.
+
+    Args:
+        path (str): The file path.
+        signature (dict): The recorded signature.
+
+    Returns:
+        bool: True if the file is unchanged.
+    """
+    if not os.path.isfile(path):
+        return False
+
+    stat = os.stat(path)
+    if stat.st_size != signature["size"]:
+        return False
+    if stat.st_mtime == signature["mtime"]:
+        return True
+
+    return "sha1" in signature and get_file_hash(path) == signature["sha1"]
+
+
+def load_ledger(ledger_path):
+    """
+    Loads the ledger of the merged tiles per frame.
+
+    Args:
+        ledger_path (str): The ledger file path.
+
+    Returns:
+        dict: The frames entries by output name.
+    """
+    if not os.path.isfile(ledger_path):
+        return {}
+
+    try:
+        with open(ledger_path, "r") as f:
+            return json.load(f)
+    except ValueError as e:
+        print("ERROR: `{}` for `{}`, rebuilding all frames".format(e, ledger_path))
+        return {}
+
+
+def save_ledger(ledger_path, ledger):
+    """
+    Saves the ledger atomically so an interrupted run never leaves it partial.
+
+    Args:
+        ledger_path (str): The ledger file path.
+        ledger (dict): The frames entries by output name.
+    """
+    if not os.path.isdir(os.path.dirname(ledger_path)):
+        os.makedirs(os.path.dirname(ledger_path))
+
+    temp_path = "{}.{}.tmp".format(ledger_path, os.getpid())
+    with open(temp_path, "w") as f:
+        json.dump(ledger, f, indent=2)
+    os.replace(temp_path, ledger_path)
+
+
+def flush_ledger(ledger_path, ledger, merged_tiles):
+    """
+    Saves the ledger, then deletes the tiles it records, so a crash never loses merged tiles.
+
+    Args:
+        ledger_path (str): The ledger file path.
+        ledger (dict): The frames entries by output name.
+        merged_tiles (list): The tiles to delete, emptied once deleted.
+    """
+    save_ledger(ledger_path, ledger)
+    for tile_image in merged_tiles:
+        if os.path.isfile(tile_image):
+            os.remove(tile_image)
+    del merged_tiles[:]
+
+
+def is_frame_complete(entry, tile_count):
+    """
+    Checks if all the tiles of a frame are merged, its tiles can then be deleted.
+
+    Args:
+        entry (dict): The ledger entry of the frame, or None.
+        tile_count (int): The number of tiles of each frame.
+
+    Returns:
+        bool: True if the ledger records every tile of the frame.
+    """
+    return bool(entry) and bool(tile_count) and len(entry["tiles"]) >= tile_count
+
+
+def plan_frame(output_file, input_images, entry):
+    """
+    Decides what to merge for a frame from its ledger entry.
+
+    Tiles recorded with the same signature are skipped and missing tiles are added
+    onto the existing frame. The frame is rebuilt when it has no valid entry or when
+    a merged tile was re-rendered, as its old contribution cannot be removed.
+
+    Args:
+        output_file (str): The path to the output image.
+        input_images (list): The tiles of the frame found on disk.
+        entry (dict): The ledger entry of the frame, or None.
+
+    Returns:
+        tuple: The tiles to merge and whether to overwrite the output, or None
+            when there is nothing to merge.
+    """
+    if not entry or not is_signature_match(output_file, entry["output"]):
+        return input_images, True
+
+    merged = entry["tiles"]
+    missing = [x for x in input_images if os.path.basename(x) not in merged]
+    changed = [x for x in input_images
+               if os.path.basename(x) in merged and not is_signature_match(x, merged[os.path.basename(x)])]
+
+    if not changed:
+        return (missing, False) if missing else None
+
+    root_dir = os.path.dirname(input_images[0])
+    lost = [x for x in merged if not os.path.isfile(os.path.join(root_dir, x))]
+    if lost:
+        print("ERROR: Cannot rebuild `{}` for re-rendered tiles {}, merged tiles {} were deleted".format(
+            output_file, changed, lost))
+        return None
+
+    return input_images, True
+
+
+def _merge_group(job):
+    output_file, files, overwrite, strip_rows, hash = job
+    try:
+        signatures = {x: get_file_signature(x, hash=hash) for x in files}
+        stats = merge_images(output_file, *files, overwrite=overwrite, strip_rows=strip_rows)
+    except (OSError, RuntimeError) as e:
+        print("ERROR: {}".format(e))
+        return None, {}
+
+    signatures = {os.path.basename(x): signatures[x] for x in stats["merged"]}
+    return stats, signatures
+
+
+def combin_images(root_dir, delete=False, workers=1, memory_budget=0, strip_rows=None,
+                  hash=False, rebuild=False, tile_count=None):
+    """
+    Combines the tiles of every frame found in a directory.
+
+    The merged tiles are recorded in a ledger in the `Combine` directory, so a rerun
+    skips the completed frames and only merges the missing tiles. The ledger is saved
+    every `LEDGER_SAVE_INTERVAL` seconds and at the end. The tiles are deleted only
+    once the ledger records all the tiles of their frame, so a frame can always be
+    rebuilt while it is incomplete.
+
+    Args:
+        root_dir (str): The root path where the tiles are located.
+        delete (bool): delete the tiles of the complete frames, needs the tile count
+        workers (int): The number of frames merged concurrently, 0 uses all the cpus.
+        memory_budget (int): The memory budget in bytes bounding the workers, 0 for no limit.
+        strip_rows (int): stream the output by strips of scanlines, see `merge_images`
+        hash (bool): record the tiles content hash in the ledger
+        rebuild (bool): ignore the ledger and rebuild all the frames
+        tile_count (int): The number of tiles of each frame.
+
+    Raises:
+        RuntimeError: If a frame cannot be merged, once the other frames are merged.
+    """
+    if delete and not tile_count:
+        raise ValueError("Deleting the tiles needs the number of tiles of each frame")
+
+    ledger_path = os.path.join(root_dir, "Combine", LEDGER_NAME)
+    ledger = {} if rebuild else load_ledger(ledger_path)
+
+    # the tiles recorded in the ledger, deleted once it is saved
+    merged_tiles = []
+
     grps = group_files(os.listdir(root_dir))
+    jobs = []
     for grp in grps:
         files = grps[grp]
-        output_file = os.path.join(root_dir, "Combine", grp + "." + files[0].rsplit('.', 1)[-1])
-        files = [os.path.join(root_dir, x) for x in files]
-        merge_images(output_file, *files, delete=delete)
+        output_name = grp + "." + files[0].rsplit('.', 1)[-1]
+        output_file = os.path.join(root_dir, "Combine", output_name)
+        files = [os.path.join(root_dir, x) for x in sorted(files)]
+
+        plan = plan_frame(output_file, files, ledger.get(output_name))
+        if plan is None:
+            print("Skipping `{}`, all the tiles are merged".format(output_file))
+            if delete and is_frame_complete(ledger.get(output_name), tile_count):
+                merged_tiles.extend(files)
+            continue
+
+        files, overwrite = plan
+        jobs.append((output_file, files, overwrite))
+
+    workers = get_workers_count(jobs, workers=workers, memory_budget=memory_budget,
+                                strip_rows=strip_rows)
+    jobs = [(output_file, files, overwrite, strip_rows, hash) for output_file, files, overwrite in jobs]
+
+    if workers > 1:
+        print("Combining {} frames with {} workers".format(len(jobs), workers))
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        futures = {executor.submit(_merge_group, job): job for job in jobs}
+        results = ((futures[x], x.result()) for x in concurrent.futures.as_completed(futures))
+    else:
+        executor = None
+        results = ((job, _merge_group(job)) for job in jobs)
+
+    bytes_read = bytes_written = 0
+    saved = time.time()
+    changed = False
+    failed = []
+    try:
+        for job, (stats, signatures) in results:
+            output_file, _, overwrite = job[:3]
+            if stats is None:
+                failed.append(output_file)
+                continue
+            if not stats["tiles"]:
+                continue
+
+            output_name = os.path.basename(output_file)
+            entry = ledger.get(output_name) if not overwrite else None
+            entry = entry or {"tiles": {}}
+            entry["tiles"].update(signatures)
+            entry["output"] = get_file_signature(output_file)
+            ledger[output_name] = entry
+            changed = True
+
+            # the tiles merged by the previous runs are deleted with the last ones
+            if delete and is_frame_complete(entry, tile_count):
+                merged_tiles.extend(os.path.join(root_dir, x) for x in entry["tiles"])
+
+            if time.time() - saved >= LEDGER_SAVE_INTERVAL:
+                flush_ledger(ledger_path, ledger, merged_tiles)
+                saved = time.time()
+                changed = False
+
+            bytes_read += stats["bytes_read"]
+            bytes_written += stats["bytes_written"]
+    finally:
+        if executor:
+            executor.shutdown()
+        # the frames merged before an error are recorded too
+        if changed or merged_tiles:
+            flush_ledger(ledger_path, ledger, merged_tiles)
+
+    print("Combined {} of {} frames: {} bytes read, {} bytes written".format(
+        len(jobs) - len(failed), len(grps), bytes_read, bytes_written))
+    if failed:
+        raise RuntimeError("Cannot combine the frames {}, their outputs are left as they were".format(failed))
 
 
 def main():
@@ -82,16 +924,49 @@ def main():
 
     parser.add_argument("-r", "--root", type=str, help="The root path where images are located")
     parser.add_argument("-a", "--add", nargs=2, type=str, help="Add 2 images together")
-    parser.add_argument("-d", "--delete", action="store_true", help="delete tile after combining")
+    parser.add_argument("-t", "--tile", nargs=2, type=str,
+                        help="Register a finished tile of the final image, the last tile assembles the frame")
+    parser.add_argument("-c", "--tile-count", type=int, default=None,
+                        help="The number of tiles of each frame, used with --tile, and with --root to delete "
+                             "the tiles of the complete frames")
+    parser.add_argument("-d", "--delete", action="store_true",
+                        help="delete tile after combining, with --root once all the tiles of the frame are combined")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="The number of frames combined in parallel with --root, 0 uses all the cpus")
+    parser.add_argument("-m", "--memory-budget", type=int, default=0,
+                        help="The memory budget in MB bounding the parallel workers, 0 for no limit")
+    parser.add_argument("--hash", action="store_true",
+                        help="Record the tiles content hash in the --root ledger")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Ignore the --root ledger and rebuild all the frames")
+    parser.add_argument("-s", "--stream", action="store_true",
+                        help="Write the output by strips of scanlines instead of a whole frame in memory")
+    parser.add_argument("--strip-rows", type=int, default=0,
+                        help="The scanlines per strip with --stream, 0 uses one tile row")
 
     args = parser.parse_args()
+    strip_rows = args.strip_rows if args.stream else None
+    if args.root and args.delete and not args.tile_count:
+        parser.error("--delete with --root needs the --tile-count of the frames")
+
+    try:
+        if args.root:
+            combin_images(args.root, delete=args.delete, workers=args.workers,
+                          memory_budget=args.memory_budget * 1024 * 1024, strip_rows=strip_rows,
+                          hash=args.hash, rebuild=args.rebuild, tile_count=args.tile_count)
 
-    if args.root:
-        combin_images(args.root, delete=args.delete)
+        if args.add:
+            tile_image, final_image = args.add
+            merge_images(final_image, tile_image, delete=args.delete, strip_rows=strip_rows)
 
-    if args.add:
-        tile_image, final_image = args.add
-        merge_images(final_image, tile_image, delete=args.delete)
+        if args.tile:
+            tile_image, final_image = args.tile
+            add_tile(tile_image, final_image, args.tile_count or 1, delete=args.delete,
+                     strip_rows=strip_rows)
+    except RuntimeError as e:
+        print("ERROR: {}".format(e))
+        sys.exit(1)
 
 
-main()
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+"""
+Keeps a long-lived renderer process per worker and feeds it the frame ranges of the tasks.
+
+The renderer process is started from the `server` arguments of `renderer.json`. It reads one
+JSON request per line on stdin, `{"args": [...]}` with the task render arguments, prints its
+logs on stdout and ends every request with a `RENDER_DONE <returncode>` line.
+
+`serve` hosts the renderer behind a local socket, `render` is the task side client which starts
+the server when needed, restarts it when the server command (usd file, render settings...) changes,
+and relays the renderer logs to stdout for the plugin stdout handlers.
+"""
+import argparse
+import hashlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+DONE_TOKEN = "RENDER_DONE"
+
+
+def get_state_path(name):
+    """
+    Returns the state file of the server of a worker.
+
+    Args:
+        name (str): The worker name.
+
+    Returns:
+        str: The state file path.
+    """
+    name = "".join(x if x.isalnum() else "_" for x in name)
+    return os.path.join(tempfile.gettempdir(), "usd_render_server_{}.json".format(name))
+
+
+def get_command_key(command):
+    """
+    Returns the key of a server command, a server is reused only for the same key.
+
+    Args:
+        command (list): The renderer server command.
+
+    Returns:
+        str: The key.
+    """
+    return hashlib.sha1(json.dumps(command).encode("utf-8")).hexdigest()
+
+
+def read_state(state_path):
+    if not os.path.isfile(state_path):
+        return None
+
+    try:
+        with open(state_path, "r") as f:
+            return json.load(f)
+    except ValueError:
+        return None
+
+
+def write_state(state_path, state):
+    temp_path = "{}.{}.tmp".format(state_path, os.getpid())
+    with open(temp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(temp_path, state_path)
+
+
+def relay_request(conn, renderer):
+    """
+    Feeds one request to the renderer and relays its logs until the request is done.
+
+    Args:
+        conn (socket.socket): The client connection.
+        renderer (subprocess.Popen): The renderer process.
+
+    Returns:
+        bool: False when the server has to stop.
+    """
+    reader = conn.makefile("r", encoding="utf-8")
+    line = reader.readline()
+    if not line:
+        return True
+
+    request = json.loads(line)
+    if request.get("shutdown"):
+        return False
+
+    renderer.stdin.write(json.dumps(request) + "\n")
+    renderer.stdin.flush()
+
+    for output in renderer.stdout:
+        conn.sendall(output.encode("utf-8"))
+        if output.startswith(DONE_TOKEN):
+            return True
+
+    # the renderer died during the request
+    conn.sendall("{} {}\n".format(DONE_TOKEN, renderer.wait() or 1).encode("utf-8"))
+    return False
+
+
+def serve(command, name, idle_timeout=600):
+    """
+    Starts the renderer and serves the render requests until it is idle for `idle_timeout` seconds,
+    shut down or dead.
+
+    Args:
+        command (list): The renderer server command.
+        name (str): The worker name.
+        idle_timeout (int): The seconds without request before exiting.
+    """
+    state_path = get_state_path(name)
+    renderer = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, universal_newlines=True, bufsize=1)
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    listener.settimeout(idle_timeout)
+
+    write_state(state_path, {
+        "key": get_command_key(command),
+        "port": listener.getsockname()[1],
+        "pid": os.getpid(),
+    })
+
+    try:
+        while renderer.poll() is None:
+            try:
+                conn, _ = listener.accept()
+            except socket.timeout:
+                break
+
+            with conn:
+                if not relay_request(conn, renderer):
+                    break
+    finally:
+        listener.close()
+        state = read_state(state_path)
+        if state and state["pid"] == os.getpid():
+            os.remove(state_path)
+        if renderer.poll() is None:
+            renderer.terminate()
+            renderer.wait()
+
+
+def connect(state, timeout=10):
+    try:
+        return socket.create_connection(("127.0.0.1", state["port"]), timeout=timeout)
+    except OSError:
+        return None
+
+
+def start_server(command, name, idle_timeout, timeout=60):
+    """
+    Starts a detached server, which outlives the task, and waits for it to listen.
+
+    Args:
+        command (list): The renderer server command.
+        name (str): The worker name.
+        idle_timeout (int): The seconds without request before the server exits.
+        timeout (int): The seconds to wait for the server.
+
+    Returns:
+        dict: The server state, or None if it did not start.
+    """
+    args = [sys.executable, os.path.abspath(__file__), "serve", "--name", name,
+            "--idle-timeout", str(idle_timeout), "--command", json.dumps(command)]
+
+    kwargs = {}
+    if os.name == "nt":
+        # DETACHED_PROCESS | CREATE_NEW_PROCESS_GROUP
+        kwargs["creationflags"] = 0x00000008 | 0x00000200
+    else:
+        kwargs["start_new_session"] = True
+
+    print("Starting persistent renderer: {}".format(command))
+    subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                     stderr=subprocess.DEVNULL, **kwargs)
+
+    key = get_command_key(command)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        state = read_state(get_state_path(name))
+        if state and state["key"] == key:
+            return state
+        time.sleep(0.1)
+
+    return None
+
+
+def get_server(command, name, idle_timeout):
+    """
+    Connects to the worker server, started or restarted as needed.
+
+    Args:
+        command (list): The renderer server command.
+        name (str): The worker name.
+        idle_timeout (int): The seconds without request before the server exits.
+
+    Returns:
+        tuple: The server state and connection, None if the server cannot be started.
+    """
+    state = read_state(get_state_path(name))
+    conn = connect(state) if state else None
+
+    if conn and state["key"] != get_command_key(command):
+        print("Stopping persistent renderer, the usd file or render settings changed")
+        with conn:
+            conn.sendall((json.dumps({"shutdown": True}) + "\n").encode("utf-8"))
+        conn = None
+
+    if not conn:
+        state = start_server(command, name, idle_timeout)
+        conn = connect(state) if state else None
+        if not conn:
+            return None
+    else:
+        print("Reusing persistent renderer {}".format(state["pid"]))
+
+    return state, conn
+
+
+def send_request(conn, request):
+    """
+    Sends a render request and relays the renderer logs to stdout until the request is done.
+
+    Args:
+        conn (socket.socket): The server connection.
+        request (dict): The render request.
+
+    Returns:
+        int: The render return code, None if the server closed the connection before relaying any log.
+    """
+    relayed = False
+    try:
+        with conn:
+            conn.settimeout(None)
+            conn.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            for line in conn.makefile("r", encoding="utf-8"):
+                if line.startswith(DONE_TOKEN):
+                    return int(line.split()[1])
+                relayed = True
+                sys.stdout.write(line)
+                sys.stdout.flush()
+    except OSError as e:
+        if relayed:
+            print("ERROR: The persistent renderer connection failed: {}".format(e))
+
+    if relayed:
+        print("ERROR: The persistent renderer stopped during the render")
+        return 1
+    return None
+
+
+def render(command, request, name, idle_timeout=600):
+    """
+    Sends a render request to the worker server, started or restarted as needed, and relays
+    the renderer logs to stdout.
+
+    Args:
+        command (list): The renderer server command.
+        request (dict): The render request.
+        name (str): The worker name.
+        idle_timeout (int): The seconds without request before the server exits.
+
+    Returns:
+        int: The render return code.
+    """
+    for attempt in range(2):
+        server = get_server(command, name, idle_timeout)
+        if server is None:
+            print("ERROR: Cannot start the persistent renderer")
+            return 1
+
+        state, conn = server
+        returncode = send_request(conn, request)
+        if returncode is not None:
+            return returncode
+
+        # the server was exiting, after its renderer died, when it accepted the connection. Its state
+        # is forgotten so a new server is started
+        state_path = get_state_path(name)
+        current = read_state(state_path)
+        if current and current["pid"] == state["pid"]:
+            try:
+                os.remove(state_path)
+            except OSError:
+                pass
+
+    print("ERROR: The persistent renderer closed the connection before rendering")
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="To render tasks with a persistent renderer.")
+
+    parser.add_argument("mode", choices=("render", "serve"), help="Render a task or serve the renderer")
+    parser.add_argument("-c", "--command", type=str, required=True, help="The renderer server command as json list")
+    parser.add_argument("-r", "--request", type=str, default="{}", help="The render request as json")
+    parser.add_argument("-n", "--name", type=str, default=socket.gethostname(), help="The worker name")
+    parser.add_argument("-i", "--idle-timeout", type=int, default=600,
+                        help="The seconds without request before the server exits")
+
+    args = parser.parse_args()
+    command = json.loads(args.command)
+
+    if args.mode == "serve":
+        serve(command, args.name, idle_timeout=args.idle_timeout)
+    else:
+        sys.exit(render(command, json.loads(args.request), args.name, idle_timeout=args.idle_timeout))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+A stub persistent renderer to test the persistent render mode without a real renderer.
+
+It "loads" the usd file once at startup, then renders the frame ranges requested on stdin by
+printing husk like progress, see `persistent_render.py` for the protocol.
+"""
+import argparse
+import json
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from persistent_render import DONE_TOKEN
+
+
+def get_peak_memory():
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def parse_request(args):
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--frame", type=int, default=1)
+    parser.add_argument("--frame-count", type=int, default=1)
+    parser.add_argument("--frame-inc", type=int, default=1)
+    parser.add_argument("--output", type=str, default="")
+    parser.add_argument("--crash", type=int, default=0, help="Exits with this code during the request")
+
+    request, _ = parser.parse_known_args(args)
+    return request
+
+
+def main():
+    parser = argparse.ArgumentParser(description="A stub persistent renderer.")
+
+    parser.add_argument("--usd-input", type=str, required=True, help="The usd file to load")
+    parser.add_argument("--load-time", type=float, default=5, help="The seconds to load the stage")
+    parser.add_argument("--frame-time", type=float, default=1, help="The seconds to render a frame")
+
+    args, _ = parser.parse_known_args()
+
+    print("Loading stage {}".format(args.usd_input), flush=True)
+    time.sleep(args.load_time)
+    print("Stage loaded", flush=True)
+
+    for line in sys.stdin:
+        request = parse_request(json.loads(line).get("args", []))
+
+        for index in range(request.frame_count):
+            frame = request.frame + index * request.frame_inc
+            print("Rendering frame {} to {}".format(frame, request.output), flush=True)
+            if request.crash:
+                sys.exit(request.crash)
+            for progress in (0, 50, 100):
+                time.sleep(args.frame_time / 2 if progress else 0)
+                print("ALF_PROGRESS {}%".format(progress), flush=True)
+
+        print("Peak memory {:.1f} MB".format(get_peak_memory() / 1024.0 ** 2), flush=True)
+        print("{} 0".format(DONE_TOKEN), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+"""
+Publishes a usd file and its dependency closure into a content addressed bundle store.
+
+Every dependency is stored once, flat in the store, as `<key><extension>`. The key of an asset is
+the sha256 of its content, the key of a layer also covers the names of its dependencies, so a
+layer key changes when any file below it changes. The layers are rewritten with `./<key>` asset
+paths relative to the store, so the bundle renders from the store alone, without the original
+shared storage.
+
+The dependencies are published before the layers using them, so an existing object implies that
+all its dependencies exist, and a resubmit only uploads the files that changed.
+
+Clip templates and udims are published as `<pattern key>_<file name>`, so their patterns keep
+matching in the store. Their files are only published flat when a layer also uses them directly.
+"""
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+
+try:
+    from pxr import Sdf, UsdUtils
+except ImportError:
+    Sdf = UsdUtils = None
+
+import usd_dependencies
+
+USD_EXTENSIONS = (".usd", ".usda", ".usdc")
+HASH_CACHE_NAME = "usd_bundle_hashes.json"
+
+
+def get_file_hash(path, block_size=1024 * 1024):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def get_hash_cache_path():
+    return os.path.join(os.path.dirname(usd_dependencies.get_cache_path()), HASH_CACHE_NAME)
+
+
+def get_file_hashes(paths, workers=8, cache_path=None):
+    """
+    Hashes files in parallel, with the hashes cached by the file mtime and size.
+
+    Args:
+        paths (list): The file paths.
+        workers (int): The number of files hashed at the same time.
+        cache_path (str): The hashes cache file, None to disable the cache.
+
+    Returns:
+        dict: The sha256 of every path.
+    """
+    cache = usd_dependencies.load_cache(cache_path)
+    signatures = {path: usd_dependencies.get_signature(path) for path in paths}
+
+    hashes = {}
+    for path in paths:
+        entry = cache.get(path)
+        if entry and entry["signature"] == signatures[path]:
+            hashes[path] = entry["hash"]
+
+    changed = [path for path in paths if path not in hashes]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        hashes.update(zip(changed, executor.map(get_file_hash, changed)))
+
+    if cache_path and changed:
+        cache.update({path: {"signature": signatures[path], "hash": hashes[path]} for path in changed})
+        usd_dependencies.save_cache(cache_path, cache)
+
+    return hashes
+
+
+def get_pattern_regex(pattern):
+    regex = re.escape(pattern).replace(re.escape("<UDIM>"), r"\d{4}")
+    return re.compile(re.sub(r"(?:\\?[#@])+", lambda match: r"\d+", regex) + "$")
+
+
+def get_dependency_order(root, layers):
+    """
+    Returns the dependencies of the root, every file after its dependencies. The layers of a cycle,
+    like two layers referencing each other, are ordered as they are found.
+
+    Args:
+        root (str): The root layer path.
+        layers (dict): The dependencies of every layer, from the manifest.
+
+    Returns:
+        list: The file paths.
+    """
+    order = []
+    state = {}
+    stack = [(root, False)]
+    while stack:
+        path, expanded = stack.pop()
+        if expanded:
+            state[path] = "done"
+            order.append(path)
+            continue
+
+        if state.get(path) in ("done", "visiting"):
+            continue
+
+        state[path] = "visiting"
+        stack.append((path, True))
+        for dependency in layers.get(path, []):
+            if state.get(dependency["path"]) != "done":
+                stack.append((dependency["path"], False))
+
+    return order
+
+
+class Bundle(object):
+    """
+    The objects of one usd file in the bundle store.
+    """
+    def __init__(self, store, manifest, workers=8, cache_path=None):
+        self.store = store
+        self.layers = manifest["layers"]
+        self.order = get_dependency_order(manifest["root"], self.layers)
+        # the files only used through a pattern are published with the pattern names
+        self.direct = {manifest["root"]}
+        self.direct.update(dependency["path"] for dependencies in self.layers.values()
+                           for dependency in dependencies if "pattern" not in dependency)
+        self.names = {}
+        self.uploaded = []
+        self.skipped = []
+
+        hashes = get_file_hashes(self.order, workers=workers, cache_path=cache_path)
+
+        for path in self.order:
+            key = hashes[path]
+            if path in self.layers:
+                # a dependency later in a cycle is covered by its content only
+                dependencies = sorted(self.names.get(dependency["path"], hashes.get(dependency["path"], ""))
+                                      for dependency in self.layers[path])
+                key = hashlib.sha256("\n".join([key] + dependencies).encode("utf-8")).hexdigest()
+            self.names[path] = key + os.path.splitext(path)[1]
+
+    def get_object_path(self, name):
+        return os.path.join(self.store, name)
+
+    def publish(self, path, name):
+        """
+        Writes a file to the store, with its asset paths rewritten for the layers, unless the object
+        already exists.
+
+        Args:
+            path (str): The file path.
+            name (str): The object name.
+        """
+        object_path = self.get_object_path(name)
+        size = os.path.getsize(path)
+        if os.path.isfile(object_path):
+            self.skipped.append(size)
+            return
+
+        temp_path = self.get_object_path(".{}.{}".format(os.getpid(), name))
+        try:
+            if path in self.layers and os.path.splitext(path)[1].lower() in USD_EXTENSIONS:
+                self.write_layer(path, temp_path)
+            else:
+                shutil.copyfile(path, temp_path)
+            os.replace(temp_path, object_path)
+        finally:
+            if os.path.isfile(temp_path):
+                os.remove(temp_path)
+
+        self.uploaded.append(size)
+
+    def write_layer(self, path, temp_path):
+        layer = Sdf.Layer.FindOrOpen(path)
+        layer.Export(temp_path)
+
+        copy = Sdf.Layer.FindOrOpen(temp_path)
+        UsdUtils.ModifyAssetPaths(copy, lambda asset_path: self.get_asset_path(layer, asset_path))
+        copy.Save()
+
+    def get_asset_path(self, layer, asset_path):
+        """
+        Returns the store path of an asset path authored in a layer, publishing the files of the
+        patterns.
+
+        Args:
+            layer (Sdf.Layer): The original layer.
+            asset_path (str): The authored asset path.
+
+        Returns:
+            str: The asset path relative to the store, or the authored path if it is not bundled.
+        """
+        if not asset_path:
+            return asset_path
+
+        path = os.path.normpath(Sdf.ComputeAssetPathRelativeToLayer(layer, asset_path))
+        files = usd_dependencies.expand_pattern(path)
+        if files == [path]:
+            return "./" + self.names[path] if path in self.names else asset_path
+
+        regex = get_pattern_regex(os.path.basename(path))
+        files = [x for x in files if x in self.names and regex.match(os.path.basename(x))]
+        if not files:
+            return asset_path
+
+        key = hashlib.sha256("\n".join(self.names[x] for x in files).encode("utf-8")).hexdigest()
+        for x in files:
+            self.publish(x, "{}_{}".format(key, os.path.basename(x)))
+
+        return "./{}_{}".format(key, os.path.basename(path))
+
+    def publish_all(self, workers=8):
+        """
+        Publishes the assets in parallel, then the layers after their dependencies.
+
+        Args:
+            workers (int): The number of assets copied at the same time.
+
+        Returns:
+            str: The path of the root layer in the store.
+        """
+        os.makedirs(self.store, exist_ok=True)
+
+        assets = [path for path in self.order if path not in self.layers and path in self.direct]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            list(executor.map(lambda path: self.publish(path, self.names[path]), assets))
+
+        for path in self.order:
+            if path in self.layers and path in self.direct:
+                self.publish(path, self.names[path])
+
+        return self.get_object_path(self.names[self.order[-1]])
+
+
+def bundle(usd_file, store, workers=8, cache_path=None, hash_cache_path=None):
+    """
+    Publishes a usd file and its dependencies into the bundle store.
+
+    Args:
+        usd_file (str): The root usd file.
+        store (str): The bundle store directory.
+        workers (int): The number of files hashed or copied at the same time.
+        cache_path (str): The dependencies cache file, None to disable the cache.
+        hash_cache_path (str): The hashes cache file, None to disable the cache.
+
+    Returns:
+        dict: The bundle result, with the `usdFile` to render.
+    """
+    if Sdf is None:
+        raise RuntimeError("The pxr module is not available")
+
+    manifest = usd_dependencies.scan_dependencies(usd_file, workers=workers, cache_path=cache_path)
+    if manifest["missing"] or manifest["errors"]:
+        problems = ["missing `{}` in `{}`".format(x["path"], x["layer"]) for x in manifest["missing"]]
+        problems += ["cannot read `{}`: {}".format(x["path"], x["error"]) for x in manifest["errors"]]
+        raise RuntimeError("Cannot bundle `{}`: {}".format(usd_file, ", ".join(problems)))
+
+    result = Bundle(store, manifest, workers=workers, cache_path=hash_cache_path)
+    usd_path = result.publish_all(workers=workers)
+
+    return {
+        "root": manifest["root"],
+        "usdFile": usd_path,
+        "uploaded": len(result.uploaded),
+        "uploadedSize": sum(result.uploaded),
+        "skipped": len(result.skipped),
+        "skippedSize": sum(result.skipped),
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Publish a usd file and its dependencies into a bundle store.")
+
+    parser.add_argument("usd_file", type=str, help="The root usd file")
+    parser.add_argument("-s", "--store", type=str, required=True, help="The bundle store directory")
+    parser.add_argument("-o", "--output", type=str, default="", help="The result json file, stdout if empty")
+    parser.add_argument("-w", "--workers", type=int, default=8, help="The number of files hashed or copied in parallel")
+    parser.add_argument("-c", "--cache", type=str, default=usd_dependencies.get_cache_path(), help="The dependencies cache file")
+    parser.add_argument("--hash-cache", type=str, default=get_hash_cache_path(), help="The file hashes cache file")
+
+    args = parser.parse_args(args)
+
+    result = bundle(args.usd_file, args.store, workers=args.workers, cache_path=args.cache,
+                    hash_cache_path=args.hash_cache)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=4)
+    else:
+        json.dump(result, sys.stdout, indent=4)
+
+    print("Bundled `{}`: uploaded {} files, {:.1f} MB, skipped {} files, {:.1f} MB".format(
+        result["root"], result["uploaded"], result["uploadedSize"] / 1024.0 ** 2,
+        result["skipped"], result["skippedSize"] / 1024.0 ** 2), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,317 @@
+"""
+Scans the dependencies of a usd file without composing the stage.
+
+Every layer is opened alone with `Sdf.Layer`, and its sublayers, references, payloads, value clips
+and asset attributes are collected. The layers are scanned in parallel, and the dependencies of a
+layer are cached by the layer mtime and size, so a resubmit only rescans the changed layers. The
+clip templates and udims are cached as authored, and expanded to the existing files on every scan.
+
+The manifest lists every dependency with its size, the dependencies of every layer, the missing
+dependencies, once per path, and the layers that cannot be read. The files matching a clip template or
+a udim have the `pattern` they were expanded from:
+
+    {
+        "root": "/shots/sh010.usd",
+        "assets": [{"path": "/shots/sh010.usd", "type": "root", "size": 1024}, ...],
+        "layers": {"/shots/sh010.usd": [{"path": "/assets/tree.usd", "type": "reference"}, ...], ...},
+        "missing": [{"path": "/assets/tree.usd", "type": "reference", "layer": "/shots/sh010.usd"}],
+        "errors": [{"path": "/assets/rock.usd", "error": "..."}],
+        "size": 1024
+    }
+"""
+import argparse
+import concurrent.futures
+import glob
+import json
+import os
+import re
+import sys
+import tempfile
+
+try:
+    from pxr import Sdf
+except ImportError:
+    Sdf = None
+
+CACHE_NAME = "usd_dependencies_cache.json"
+
+# the dependency types which are layers, and are scanned in turn
+LAYER_TYPES = ("root", "sublayer", "reference", "payload", "clip")
+
+
+def get_cache_path():
+    return os.path.join(tempfile.gettempdir(), CACHE_NAME)
+
+
+def load_cache(cache_path):
+    if not cache_path or not os.path.isfile(cache_path):
+        return {}
+
+    try:
+        with open(cache_path, "r") as f:
+            return json.load(f)
+    except ValueError:
+        return {}
+
+
+def save_cache(cache_path, cache):
+    temp_path = "{}.{}.tmp".format(cache_path, os.getpid())
+    with open(temp_path, "w") as f:
+        json.dump(cache, f)
+    os.replace(temp_path, cache_path)
+
+
+def get_signature(path):
+    stat = os.stat(path)
+    return [stat.st_mtime, stat.st_size]
+
+
+def expand_pattern(path):
+    """
+    Expands the clip template (`###`, `@@@`) and udim (`<UDIM>`) patterns to the existing files.
+
+    Args:
+        path (str): The asset path.
+
+    Returns:
+        list: The matching file paths, or the path itself when it is not a pattern.
+    """
+    if "<UDIM>" not in path and "#" not in path and "@" not in path:
+        return [path]
+
+    pattern = glob.escape(path).replace("<UDIM>", "[0-9]" * 4)
+    pattern = re.sub(r"[#@]+", lambda match: "[0-9]" * len(match.group(0)), pattern)
+    return sorted(glob.glob(pattern)) or [path]
+
+
+def get_list_op_items(list_op):
+    items = []
+    for name in ("explicitItems", "prependedItems", "appendedItems", "addedItems"):
+        items.extend(getattr(list_op, name, []))
+    return items
+
+
+def get_asset_values(value):
+    if isinstance(value, Sdf.AssetPath):
+        return [value.path]
+    if value is not None and hasattr(value, "__iter__") and not isinstance(value, str):
+        return [item.path for item in value if isinstance(item, Sdf.AssetPath)]
+    return []
+
+
+def get_clip_paths(prim_spec):
+    paths = []
+    if not prim_spec.HasInfo("clips"):
+        return paths
+
+    for clip_set in prim_spec.GetInfo("clips").values():
+        paths.extend(get_asset_values(clip_set.get("assetPaths")))
+        paths.extend(get_asset_values(clip_set.get("manifestAssetPath")))
+        if clip_set.get("templateAssetPath"):
+            paths.append(clip_set["templateAssetPath"])
+
+    return paths
+
+
+def get_authored_paths(layer):
+    """
+    Collects the asset paths authored in a layer.
+
+    Args:
+        layer (Sdf.Layer): The layer.
+
+    Returns:
+        list: The (dependency type, authored asset path) pairs.
+    """
+    paths = [("sublayer", path) for path in layer.subLayerPaths]
+
+    def visit(spec_path):
+        spec = layer.GetObjectAtPath(spec_path)
+
+        if isinstance(spec, Sdf.PrimSpec):
+            paths.extend(("reference", item.assetPath) for item in get_list_op_items(spec.referenceList))
+            paths.extend(("payload", item.assetPath) for item in get_list_op_items(spec.payloadList))
+            paths.extend(("clip", path) for path in get_clip_paths(spec))
+
+        elif isinstance(spec, Sdf.AttributeSpec) and spec.typeName in (Sdf.ValueTypeNames.Asset,
+                                                                        Sdf.ValueTypeNames.AssetArray):
+            values = [spec.default] if spec.HasDefaultValue() else []
+            values.extend(layer.QueryTimeSample(spec_path, time) for time in layer.ListTimeSamplesForPath(spec_path))
+            for value in values:
+                paths.extend(("asset", path) for path in get_asset_values(value))
+
+    layer.Traverse(layer.pseudoRoot.path, visit)
+
+    # internal references and payloads have no asset path
+    return [(kind, path) for kind, path in paths if path]
+
+
+def get_layer_dependencies(layer_path):
+    """
+    Opens a layer alone, without composing it, and returns its dependencies, with the patterns as
+    authored.
+
+    Args:
+        layer_path (str): The layer file path.
+
+    Returns:
+        list: The dependencies, `{"path", "type"}` dictionaries with absolute paths.
+    """
+    layer = Sdf.Layer.FindOrOpen(layer_path)
+    if layer is None:
+        raise RuntimeError("Cannot open the layer")
+
+    dependencies = []
+    seen = set()
+    for kind, authored_path in get_authored_paths(layer):
+        path = os.path.normpath(Sdf.ComputeAssetPathRelativeToLayer(layer, authored_path))
+        if (kind, path) not in seen:
+            seen.add((kind, path))
+            dependencies.append({"path": path, "type": kind})
+
+    return dependencies
+
+
+def expand_dependencies(dependencies):
+    """
+    Expands the pattern dependencies of a layer to the existing files, the files can be added or removed
+    without the layer changing.
+
+    Args:
+        dependencies (list): The dependencies of the layer, with the patterns as authored.
+
+    Returns:
+        list: The dependencies, the files matching a pattern have its `pattern` path.
+    """
+    expanded = []
+    seen = set()
+    for dependency in dependencies:
+        files = expand_pattern(dependency["path"])
+        for path in files:
+            path = os.path.normpath(path)
+            if (dependency["type"], path) in seen:
+                continue
+            seen.add((dependency["type"], path))
+
+            if files == [dependency["path"]]:
+                expanded.append({"path": path, "type": dependency["type"]})
+            else:
+                expanded.append({"path": path, "type": dependency["type"], "pattern": dependency["path"]})
+
+    return expanded
+
+
+def scan_dependencies(usd_file, workers=8, cache_path=None):
+    """
+    Walks the layer dependency graph of a usd file, scanning the layers in parallel.
+
+    Args:
+        usd_file (str): The root usd file.
+        workers (int): The number of layers scanned at the same time.
+        cache_path (str): The dependencies cache file, None to disable the cache.
+
+    Returns:
+        dict: The manifest.
+    """
+    if Sdf is None:
+        raise RuntimeError("The pxr module is not available")
+
+    cache = load_cache(cache_path)
+    cache_modified = False
+
+    root = os.path.normpath(os.path.abspath(usd_file))
+    assets = {}
+    layers = {}
+    missing = {}
+    errors = []
+
+    def add_dependency(dependency, layer_path):
+        path = dependency["path"]
+        if path in assets:
+            return False
+
+        if not os.path.isfile(path):
+            # reported once, for the first layer using it
+            if path not in missing:
+                missing[path] = {"path": path, "type": dependency["type"], "layer": layer_path}
+            return False
+
+        assets[path] = {"path": path, "type": dependency["type"], "size": os.path.getsize(path)}
+        return dependency["type"] in LAYER_TYPES
+
+    def submit(executor, layer_path):
+        signature = get_signature(layer_path)
+        entry = cache.get(layer_path)
+        # the entries of older caches hold the expanded patterns, and are rescanned
+        if entry and entry["signature"] == signature and "authored" in entry:
+            future = concurrent.futures.Future()
+            future.set_result(entry["authored"])
+        else:
+            future = executor.submit(get_layer_dependencies, layer_path)
+        futures[future] = (layer_path, signature)
+
+    futures = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        if add_dependency({"path": root, "type": "root"}, None):
+            submit(executor, root)
+
+        while futures:
+            done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                layer_path, signature = futures.pop(future)
+                try:
+                    dependencies = future.result()
+                except Exception as e:
+                    errors.append({"path": layer_path, "error": str(e).strip()})
+                    continue
+
+                entry = cache.get(layer_path)
+                if not entry or entry["signature"] != signature or "authored" not in entry:
+                    cache[layer_path] = {"signature": signature, "authored": dependencies}
+                    cache_modified = True
+
+                layers[layer_path] = expand_dependencies(dependencies)
+                for dependency in layers[layer_path]:
+                    if add_dependency(dependency, layer_path):
+                        submit(executor, dependency["path"])
+
+    if cache_path and cache_modified:
+        save_cache(cache_path, cache)
+
+    return {
+        "root": root,
+        "assets": sorted(assets.values(), key=lambda asset: asset["path"]),
+        "layers": layers,
+        "missing": list(missing.values()),
+        "errors": errors,
+        "size": sum(asset["size"] for asset in assets.values()),
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Scan the dependencies of a usd file.")
+
+    parser.add_argument("usd_file", type=str, help="The root usd file")
+    parser.add_argument("-o", "--output", type=str, default="", help="The manifest json file, stdout if empty")
+    parser.add_argument("-w", "--workers", type=int, default=8, help="The number of layers scanned in parallel")
+    parser.add_argument("-c", "--cache", type=str, default=get_cache_path(), help="The dependencies cache file")
+    parser.add_argument("--no-cache", action="store_true", help="Rescan all the layers")
+
+    args = parser.parse_args(args)
+
+    manifest = scan_dependencies(args.usd_file, workers=args.workers,
+                                 cache_path=None if args.no_cache else args.cache)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(manifest, f, indent=4)
+    else:
+        json.dump(manifest, sys.stdout, indent=4)
+
+    print("Scanned {} dependencies, {} missing, {} unreadable, {:.1f} MB".format(
+        len(manifest["assets"]), len(manifest["missing"]), len(manifest["errors"]), manifest["size"] / 1024.0 ** 2),
+        file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
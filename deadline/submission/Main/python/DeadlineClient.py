@@ -0,0 +1,153 @@
+"""
+Runs the deadlinecommand requests on a background thread, so the Houdini UI does not wait for them.
+
+The requests go to the Deadline Web Service when the `DEADLINE_WEBSERVICE` environment variable
+is set, like `http://deadline:8082`, over one kept alive connection, else to deadlinecommand.
+The requests run one at a time, in order, and return futures.
+"""
+import concurrent.futures
+import http.client
+import os
+import urllib.parse
+
+from CallDeadlineCommand import CallDeadlineCommand
+
+# the web service arguments are passed in the url, longer urls are refused by common http servers
+MAX_URL_LENGTH = 8000
+
+
+class WebServiceConnection:
+    """
+    Runs deadlinecommand commands through the Deadline Web Service, `/<command>?<arg>&<arg>`.
+    """
+    def __init__(self, url, timeout=300):
+        parts = urllib.parse.urlsplit(url)
+        self.secure = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.timeout = timeout
+        self.connection = None
+
+    def connect(self):
+        if self.secure:
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def get_url(self, arguments):
+        url = "/" + urllib.parse.quote(arguments[0].strip().lstrip("-"))
+        if len(arguments) > 1:
+            url += "?" + "&".join(urllib.parse.quote(str(argument), safe="") for argument in arguments[1:])
+        return url
+
+    def call(self, arguments):
+        url = self.get_url(arguments)
+
+        reused = self.connection is not None
+        if not reused:
+            self.connection = self.connect()
+
+        try:
+            self.connection.request("GET", url)
+            response = self.connection.getresponse()
+            output = response.read().decode("utf-8", "replace")
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            self.close()
+            if not reused:
+                raise
+            # the server closed the kept alive connection, retry once on a new one
+            return self.call(arguments)
+        except Exception:
+            self.close()
+            raise
+
+        if response.status != 200:
+            raise RuntimeError("The Deadline Web Service returned {} {}: {}".format(
+                response.status, response.reason, output.strip()))
+
+        return output.strip()
+
+
+class DeadlineClient:
+    """
+    Runs deadlinecommand requests on one background thread.
+    """
+    def __init__(self, web_service=None):
+        if web_service is None:
+            web_service = os.getenv("DEADLINE_WEBSERVICE", "")
+
+        self.connection = WebServiceConnection(web_service) if web_service else None
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="DeadlineClient")
+        self.cache = {}
+
+    def run(self, arguments):
+        """
+        Runs a request on the current thread, use it from the functions given to `submit`.
+
+        :param arguments: The deadlinecommand arguments
+        :return: the command output
+        """
+        if self.connection is not None:
+            return self.connection.call(list(arguments))
+        return CallDeadlineCommand(list(arguments), False)
+
+    def run_cached(self, arguments):
+        """
+        Runs a request once, like the repository paths queries, later calls return the same output.
+        Only call it from the client thread.
+        """
+        key = tuple(arguments)
+        if key not in self.cache:
+            self.cache[key] = self.run(arguments)
+        return self.cache[key]
+
+    def call(self, arguments):
+        """
+        Runs a request on the client thread.
+
+        :param arguments: The deadlinecommand arguments
+        :return: a future of the command output
+        """
+        return self.executor.submit(self.run, arguments)
+
+    def submit(self, function, *args, **kwargs):
+        """
+        Runs a function chaining several requests with `run`, on the client thread.
+
+        :return: a future of the function result
+        """
+        return self.executor.submit(function, *args, **kwargs)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        if self.connection is not None:
+            self.connection.close()
+
+
+_client = None
+
+
+def get_client():
+    """
+    Returns the client shared by the Houdini session.
+    """
+    global _client
+
+    if _client is None:
+        _client = DeadlineClient()
+    return _client
+
+
+def get_repository_path(subdirectory):
+    """
+    Returns a Deadline Repository directory path, queried on the first call only.
+
+    :param subdirectory: The directory relative to the repository root
+    :return: the directory path, empty if it cannot be found
+    """
+    client = get_client()
+    return client.submit(client.run_cached, ["-GetRepositoryPath", subdirectory]).result().strip()
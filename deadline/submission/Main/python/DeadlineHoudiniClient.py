@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import absolute_import
+import sys
+import traceback
+
+import hou
+
+ERROR_MESSAGE = "The SubmitHoudiniToDeadline.py script could not be found in the Deadline Repository. Please make sure that the Deadline Client has been installed on this machine, that the Deadline Client bin folder is set in the DEADLINE_PATH environment variable, and that the Deadline Client has been configured to point to a valid Repository."
+
+
+def main():
+    # the repository is only queried when the submitter is opened, not when Houdini starts
+    try:
+        from DeadlineClient import get_repository_path
+    except ImportError:
+        print( "The CallDeadlineCommand.py script could not be found in the Houdini installation. Please make sure that the Deadline Client has been installed on this machine.\n" )
+        hou.ui.displayMessage( "The CallDeadlineCommand.py script could not be found in the Houdini installation. Please make sure that the Deadline Client has been installed on this machine.", title="Submit Houdini To Deadline" )
+        return
+
+    path = get_repository_path( "submission/Houdini/Main" )
+    if not path:
+        print( ERROR_MESSAGE )
+        return
+
+    path = path.replace( "\\", "/" )
+
+    # Add the path to the system path
+    if path not in sys.path:
+        print("Appending \"" + path + "\" to system path to import SubmitHoudiniToDeadline module")
+        sys.path.append( path )
+    else:
+        print( "\"%s\" is already in the system path" % path )
+
+    # Import the script and call the main() function
+    try:
+        import SubmitHoudiniToDeadline
+        SubmitHoudiniToDeadline.SubmitToDeadline()
+    except:
+        print( traceback.format_exc() )
+        print( ERROR_MESSAGE )
+
+
+# the shelf tools and menu entries open the submitter by importing this module, like the earlier
+# versions, scripts can call `main()` again to reopen it
+main()
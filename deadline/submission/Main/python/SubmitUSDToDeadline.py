@@ -0,0 +1,349 @@
+import os
+import json
+import re
+import tempfile
+import urllib.parse
+import hou
+
+from DeadlineClient import MAX_URL_LENGTH, get_client
+
+# the work item attributes of the settings which vary between the jobs of a bulk submission
+WORK_ITEM_ATTRIBUTES = {
+    "usdFileBox": "usdfile",
+    "FramesBox": "frames",
+    "OutputFileBox": "outputfile",
+    "CameraBox": "camera",
+}
+
+
+def call_in_main_thread(function, *args):
+    """
+    Calls a function from the Houdini main thread, where the UI can be updated.
+    """
+    try:
+        import hdefereval
+    except ImportError:
+        function(*args)
+    else:
+        hdefereval.executeDeferred(lambda: function(*args))
+
+
+class UsdSubmit:
+    def __init__(self):
+        self.settings = {}
+
+    def get_submission_script(self):
+        # runs on the client thread, the path is queried once per session
+        client = get_client()
+        script_path = client.run_cached(["-GetRepositoryFilePath", "scripts/Submission"
+                                                                   "/USDSubmission.py"]).strip()
+
+        # through the web service, the path is on the web service machine
+        if client.connection is None and not os.path.isfile(script_path):
+            raise RuntimeError("The USDSubmission.py script could not be found in the Deadline Repository. "
+                               "Please make sure that the Deadline Client has been installed on this machine, "
+                               "that the Deadline Client bin folder is set in the DEADLINE_PATH environment "
+                               "variable, and that the Deadline Client has been configured to point to a "
+                               "valid Repository.")
+
+        return script_path
+
+    def submit(self, callback=None):
+        """
+        Submits the job on the deadline client thread and returns without waiting for it.
+
+        :param callback: Called from the main thread with the job id, None if the submission failed,
+            and the submission output
+        :return: a future of the submission output
+        """
+        client = get_client()
+        settings = json.dumps(self.settings)
+        print(self.settings)
+
+        def run():
+            return client.run(["-ExecuteScript", self.get_submission_script(), settings])
+
+        future = client.submit(run)
+        if callback is not None:
+            future.add_done_callback(lambda done: call_in_main_thread(callback, *self.get_submit_result(done)))
+        return future
+
+    @staticmethod
+    def get_submit_result(future):
+        try:
+            output = future.result()
+        except Exception as e:
+            return None, str(e)
+
+        job_ids = re.findall(r"JobID=(\S+)", output)
+        return (job_ids[0] if job_ids else None), output
+
+
+class HouUsdSubmit(UsdSubmit):
+    def __init__(self, node):
+        super().__init__()
+        self.node = node
+        self.settings = {}
+        self.update_settings()
+
+    def get_settings(self, parm_name):
+        return self.node.parm(parm_name).eval()
+
+    def get_settings_str(self, parm_name):
+        return self.node.parm(parm_name).evalAsString()
+
+    def get_frame_range(self):
+        if self.get_settings("trange") == 0:
+            return int(hou.frame())
+        else:
+            start, end, step = self.node.parmTuple("f").eval()
+            return "{}-{}:{}".format(int(start), int(end), int(step))
+
+    def get_output(self):
+        output = self.get_settings("output_render")
+        output = output.replace(".{}.".format(int(hou.frame())), ".$F.")
+        return output
+
+    def set_rendersettings_overrides(self):
+        option = self.get_settings("override_res")
+        if option == "specific":
+
+            res = self.node.parmTuple("res_user").eval()
+            self.settings.update({
+                "OverrideSizeCB": True,
+                "WidthSizeRange": res[0],
+                "HeightSizeRange": res[1],
+                "ScaleSizeRange": 100,
+            })
+        elif option == "scale":
+            self.settings.update({
+                "ScaleSizeRange": self.get_settings("res_scale"),
+            })
+        else:
+            self.settings.update({
+                "OverrideSizeCB": False,
+                "ScaleSizeRange": 100,
+            })
+
+    def update_settings(self):
+        self.settings.update(
+            {
+                "NameBox": self.get_settings("job_name"),
+                "BatchNameBox": self.get_settings("batch_name"),
+                "CommentBox": self.get_settings("comment"),
+                "DepartmentBox": self.get_settings("department"),
+                "PoolBox": self.get_settings("pool"),
+                "SecondaryPoolBox": self.get_settings("secondary_pool"),
+                "GroupBox": self.get_settings("group"),
+                "PriorityBox": self.get_settings("priority"),
+                "TaskTimeoutBox": self.get_settings("task_timeout"),
+                "AutoTimeoutBox": self.get_settings("auto_task_timeout"),
+                "ConcurrentTasksBox": self.get_settings("concurrent_tasks"),
+                "LimitConcurrentTasksBox": self.get_settings("slave_task_limit"),
+                "MachineLimitBox": self.get_settings("machine_limit"),
+                "IsBlacklistBox": self.get_settings("blacklist"),
+                "MachineListBox": self.get_settings("machine_list"),
+                "LimitGroupBox": self.get_settings("limits"),
+                "DependencyBox": self.get_settings("dependencies"),
+                "OnJobCompleteBox": self.get_settings("on_complete"),
+                "SubmitSuspendedBox": self.get_settings("submit_suspended"),
+                "VerboseBox": self.get_settings_str("verbose"),
+                "ThreadsBox": self.get_settings("threads"),
+                "ChunkSizeBox": self.get_settings("chunk_size"),
+                "SubmitUSDFileBox": self.get_settings("submit_usd_files"),
+
+                # USD
+                "usdFileBox": self.get_settings("usd_file"),
+                "RenderSettingBox": self.get_settings("render_settings"),
+                "overrideCameraCB": bool(self.get_settings("camera")),
+                "CameraBox": self.get_settings("camera"),
+                "ExecutableBox": self.get_settings_str("executable"),
+                "VersionBox": self.get_settings_str("version"),
+                "RendererBox": self.get_settings_str("renderer"),
+
+                # Tiles
+                "TileCB": self.get_settings("tiles_enabled"),
+                "XTileRange": self.get_settings("x_tiles"),
+                "YTileRange": self.get_settings("y_tiles"),
+                "DeleteTilesCB": self.get_settings("cleanup_tiles"),
+
+            }
+        )
+
+        self.settings["FramesBox"] = self.get_frame_range()
+        self.settings["OutputFileBox"] = self.get_output()
+
+        self.set_rendersettings_overrides()
+
+
+class BatchUsdSubmit(UsdSubmit):
+    """
+    Submits jobs sharing the same settings with one deadlinecommand call, every job only holds the
+    settings differing from the shared ones.
+    """
+    def __init__(self, settings):
+        super().__init__()
+        self.settings = dict(settings)
+        self.jobs = []
+
+    def add_job(self, settings):
+        settings = dict(settings)
+        if "CameraBox" in settings:
+            settings["overrideCameraCB"] = bool(settings["CameraBox"])
+        self.jobs.append(settings)
+
+    def get_job_chunks(self, connection, script_path):
+        """
+        Splits the jobs so the web service url of every chunk, which holds its settings, stays under
+        `MAX_URL_LENGTH`.
+
+        :param connection: The web service connection
+        :param script_path: The submission script path
+        :return: the lists of the job indices
+        """
+        # the quoted json of the chunk is the quoted json without jobs, plus the quoted jobs and separators
+        empty_length = len(connection.get_url(
+            ["-ExecuteScript", script_path, json.dumps({"shared": self.settings, "jobs": []})]))
+        separator_length = len(urllib.parse.quote(", ", safe=""))
+
+        chunks = []
+        length = 0
+        for index, job in enumerate(self.jobs):
+            job_length = len(urllib.parse.quote(json.dumps(job), safe=""))
+            if chunks and length + separator_length + job_length <= MAX_URL_LENGTH:
+                chunks[-1].append(index)
+                length += separator_length + job_length
+            else:
+                # a job too long alone is still sent, and reported by the web service
+                chunks.append([index])
+                length = empty_length + job_length
+        return chunks
+
+    def submit_chunks(self, client, script_path):
+        """
+        Submits the jobs through the web service, one request per chunk of jobs.
+
+        :return: the outputs of the requests, followed by the json list of all the job ids
+        """
+        outputs = []
+        job_ids = [None] * len(self.jobs)
+        for chunk in self.get_job_chunks(client.connection, script_path):
+            data = {"shared": self.settings, "jobs": [self.jobs[index] for index in chunk]}
+            try:
+                output = client.run(["-ExecuteScript", script_path, json.dumps(data)])
+            except Exception as e:
+                outputs.append("Could not submit {} jobs: {}".format(len(chunk), e))
+                continue
+
+            outputs.append(output)
+            for line in reversed(output.splitlines()):
+                if line.startswith("["):
+                    for index, job_id in zip(chunk, json.loads(line)):
+                        job_ids[index] = job_id
+                    break
+
+        outputs.append(json.dumps(job_ids))
+        return "\n".join(outputs)
+
+    def submit(self, callback=None):
+        """
+        Submits the jobs on the deadline client thread and returns without waiting for them.
+
+        :param callback: Called from the main thread with the list of job ids, None for the jobs
+            not submitted, and the submission output
+        :return: a future of the submission output
+        """
+        client = get_client()
+        data = {"shared": self.settings, "jobs": self.jobs}
+
+        def run():
+            script_path = self.get_submission_script()
+            if client.connection is not None:
+                return self.submit_chunks(client, script_path)
+
+            # hundreds of jobs do not fit a command line, the settings are passed as a file
+            with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+                json.dump(data, f)
+            try:
+                return client.run(["-ExecuteScript", script_path, f.name])
+            finally:
+                os.remove(f.name)
+
+        future = client.submit(run)
+        if callback is not None:
+            future.add_done_callback(lambda done: call_in_main_thread(callback, *self.get_submit_result(done)))
+        return future
+
+    def get_submit_result(self, future):
+        try:
+            output = future.result()
+        except Exception as e:
+            return [None] * len(self.jobs), str(e)
+
+        # the submission script prints the job ids as a json list last
+        for line in reversed(output.splitlines()):
+            if line.startswith("["):
+                return json.loads(line), output
+        return [None] * len(self.jobs), output
+
+
+def get_work_item_value(work_item, name):
+    if work_item.attrib(name) is None:
+        return None
+    return work_item.attribValue(name)
+
+
+def get_work_item_settings(work_item):
+    """
+    Returns the settings of a TOPs work item varying between the jobs, from its attributes.
+
+    :param work_item: The pdg work item, or a dictionary of already evaluated settings
+    :return: the settings dictionary
+    """
+    if isinstance(work_item, dict):
+        return dict(work_item)
+
+    settings = {}
+    for setting, attribute in WORK_ITEM_ATTRIBUTES.items():
+        value = get_work_item_value(work_item, attribute)
+        if value is not None:
+            settings[setting] = value
+
+    if "FramesBox" not in settings:
+        if work_item.attrib("range") is not None:
+            start, end, step = (int(work_item.attribValue("range", index)) for index in range(3))
+            settings["FramesBox"] = "{}-{}:{}".format(start, end, step)
+        elif work_item.hasFrame:
+            settings["FramesBox"] = int(work_item.frame)
+
+    if "usdFileBox" not in settings:
+        for output_file in work_item.outputFiles:
+            if output_file.tag.startswith("file/geo/usd"):
+                settings["usdFileBox"] = output_file.path
+                break
+
+    return settings
+
+
+def submit_work_items(node, work_items, callback=None):
+    """
+    Submits one job per TOPs work item in one batch. The node settings are evaluated once, only the
+    usd file, frames, output and camera come from the work items.
+
+    :param node: The deadline node
+    :param work_items: The pdg work items, or dictionaries of their settings
+    :param callback: Called from the main thread with the list of job ids and the submission output
+    :return: a future of the submission output
+    """
+    submitter = BatchUsdSubmit(HouUsdSubmit(node).settings)
+    job_name = submitter.settings["NameBox"]
+    if not submitter.settings["BatchNameBox"]:
+        submitter.settings["BatchNameBox"] = job_name
+
+    for work_item in work_items:
+        settings = get_work_item_settings(work_item)
+        if not isinstance(work_item, dict):
+            settings.setdefault("NameBox", "{} - {}".format(job_name, work_item.name))
+        submitter.add_job(settings)
+
+    return submitter.submit(callback)
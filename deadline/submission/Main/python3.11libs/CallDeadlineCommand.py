@@ -1,57 +0,0 @@
-
-#!/usr/bin/env python
-# -*- coding: utf-8 -*-
-import os
-import subprocess
-import sys
-
-def GetDeadlineCommand():
-    deadlineBin = ""
-    try:
-        deadlineBin = os.environ['DEADLINE_PATH']
-    except KeyError:
-        #if the error is a key error it means that DEADLINE_PATH is not set. however Deadline command may be in the PATH or on OSX it could be in the file /Users/Shared/Thinkbox/DEADLINE_PATH
-        pass
-
-    # On OSX, we look for the DEADLINE_PATH file if the environment variable does not exist.
-    if deadlineBin == "" and  os.path.exists( "/Users/Shared/Thinkbox/DEADLINE_PATH" ):
-        with open( "/Users/Shared/Thinkbox/DEADLINE_PATH" ) as f:
-            deadlineBin = f.read().strip()
-
-    deadlineCommand = os.path.join(deadlineBin, "deadlinecommand")
-
-    return deadlineCommand
-
-def CallDeadlineCommand( arguments, hideWindow=True, readStdout=True ):
-    deadlineCommand = GetDeadlineCommand()
-    startupinfo = None
-    creationflags = 0
-    if os.name == 'nt':
-        if hideWindow:
-            # Python 2.6 has subprocess.STARTF_USESHOWWINDOW, and Python 2.7 has subprocess._subprocess.STARTF_USESHOWWINDOW, so check for both.
-            if hasattr( subprocess, '_subprocess' ) and hasattr( subprocess._subprocess, 'STARTF_USESHOWWINDOW' ):
-                startupinfo = subprocess.STARTUPINFO()
-                startupinfo.dwFlags |= subprocess._subprocess.STARTF_USESHOWWINDOW
-            elif hasattr( subprocess, 'STARTF_USESHOWWINDOW' ):
-                startupinfo = subprocess.STARTUPINFO()
-                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-        else:
-            # still show top-level windows, but don't show a console window
-            CREATE_NO_WINDOW = 0x08000000   #MSDN process creation flag
-            creationflags = CREATE_NO_WINDOW
-
-    arguments.insert( 0, deadlineCommand )
-
-    # Specifying PIPE for all handles to workaround a Python bug on Windows. The unused handles are then closed immediately afterwards.
-    proc = subprocess.Popen(arguments, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, startupinfo=startupinfo, creationflags=creationflags)
-
-    output = ""
-    if readStdout:
-        output, errors = proc.communicate()
-
-    output = output.strip()
-
-    if sys.version_info[0] > 2 and type(output) == bytes:
-        output = output.decode()
-
-    return output
\ No newline at end of file
@@ -0,0 +1,135 @@
+import json
+import os
+import shutil
+import sys
+
+import pytest
+
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "plugins", "USD")
+sys.path.insert(0, PLUGIN_DIR)
+
+import combine_images
+
+
+def merge_images(output_file, *input_images, delete=False, overwrite=False, strip_rows=None):
+    """
+    Merges the tiles as lines of text, like `combine_images.merge_images` adds their pixels.
+    """
+    if not os.path.isdir(os.path.dirname(output_file)):
+        os.makedirs(os.path.dirname(output_file))
+
+    lines = []
+    for input_image in input_images:
+        with open(input_image) as f:
+            if f.read() == "broken":
+                raise RuntimeError("Cannot merge `{}`: cannot read `{}`".format(output_file, input_image))
+    if os.path.isfile(output_file) and not overwrite:
+        with open(output_file) as f:
+            lines = f.read().splitlines()
+    for input_image in input_images:
+        with open(input_image) as f:
+            lines.append(f.read())
+    with open(output_file, "w") as f:
+        f.write("\n".join(lines))
+
+    return {"tiles": len(input_images), "bytes_read": 0, "bytes_written": 0, "merged": list(input_images)}
+
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    monkeypatch.setattr(combine_images, "merge_images", merge_images)
+    return tmp_path
+
+
+def write_tile(root, frame, tile, content=None):
+    path = root / "shot.{:04d}_tile{}.exr".format(frame, tile)
+    path.write_text(content or "tile{}".format(tile))
+    return path
+
+
+def read_frame(root, frame):
+    return (root / "Combine" / "shot.{:04d}.exr".format(frame)).read_text().splitlines()
+
+
+def read_ledger(root):
+    with open(str(root / "Combine" / combine_images.LEDGER_NAME)) as f:
+        return json.load(f)
+
+
+def test_combine_saves_ledger_once(root, monkeypatch):
+    saves = []
+    monkeypatch.setattr(combine_images, "save_ledger", lambda path, ledger: saves.append(json.dumps(ledger)))
+    for frame in range(1, 6):
+        write_tile(root, frame, 1)
+        write_tile(root, frame, 2)
+
+    combine_images.combin_images(str(root))
+
+    # the frames are recorded in one write at the end
+    assert len(saves) == 1
+    assert len(json.loads(saves[0])) == 5
+
+
+def test_combine_keeps_tiles_of_incomplete_frames(root):
+    tiles = [write_tile(root, 1, 1), write_tile(root, 1, 2)]
+    combine_images.combin_images(str(root), delete=True, tile_count=3)
+    assert all(x.is_file() for x in tiles)
+    assert sorted(read_ledger(root)["shot.0001.exr"]["tiles"]) == ["shot.0001_tile1.exr", "shot.0001_tile2.exr"]
+
+    # a re-rendered tile, its size changes, rebuilds the frame from the kept tiles
+    write_tile(root, 1, 1, content="tile1 rerendered")
+    combine_images.combin_images(str(root), delete=True, tile_count=3)
+    assert read_frame(root, 1) == ["tile1 rerendered", "tile2"]
+
+    # the last tile completes the frame, all its tiles are deleted once recorded
+    tiles.append(write_tile(root, 1, 3))
+    combine_images.combin_images(str(root), delete=True, tile_count=3)
+    assert read_frame(root, 1) == ["tile1 rerendered", "tile2", "tile3"]
+    assert not any(x.is_file() for x in tiles)
+    assert len(read_ledger(root)["shot.0001.exr"]["tiles"]) == 3
+
+
+def test_combine_delete_needs_tile_count(root):
+    write_tile(root, 1, 1)
+    with pytest.raises(ValueError):
+        combine_images.combin_images(str(root), delete=True)
+
+
+def test_combine_fails_on_unreadable_tile(root):
+    write_tile(root, 1, 1)
+    write_tile(root, 2, 1)
+    write_tile(root, 2, 2, content="broken")
+
+    with pytest.raises(RuntimeError, match="shot.0002.exr"):
+        combine_images.combin_images(str(root))
+
+    # the other frames are merged and recorded, the failed frame is not
+    assert read_frame(root, 1) == ["tile1"]
+    assert not (root / "Combine" / "shot.0002.exr").exists()
+    assert list(read_ledger(root)) == ["shot.0001.exr"]
+
+
+def test_merge_images_missing_tile(tmp_path):
+    output = tmp_path / "Combine" / "shot.0001.exr"
+    output.parent.mkdir()
+    output.write_text("frame")
+    tile = write_tile(tmp_path, 1, 1)
+
+    with pytest.raises(RuntimeError, match="missing"):
+        combine_images.merge_images(str(output), str(tile), str(tmp_path / "shot.0001_tile2.exr"), overwrite=True)
+    assert output.read_text() == "frame"
+
+
+@pytest.mark.skipif(not shutil.which("false"), reason="runs `false` as the failing hoiiotool")
+def test_merge_images_failed_tool(tmp_path, monkeypatch):
+    monkeypatch.setattr(combine_images, "oiio", None)
+    monkeypatch.setattr(combine_images, "OIIO", shutil.which("false"))
+    output = tmp_path / "Combine" / "shot.0001.exr"
+    output.parent.mkdir()
+    output.write_text("frame")
+    tiles = [str(write_tile(tmp_path, 1, 1)), str(write_tile(tmp_path, 1, 2))]
+
+    with pytest.raises(RuntimeError, match="exited with code 1"):
+        combine_images.merge_images(str(output), *tiles, overwrite=True)
+    assert output.read_text() == "frame"
+    assert os.listdir(str(output.parent)) == ["shot.0001.exr"]
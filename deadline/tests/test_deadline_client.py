@@ -0,0 +1,188 @@
+import http.server
+import json
+import os
+import sys
+import threading
+import types
+import urllib.parse
+
+import pytest
+
+SUBMISSION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              "submission", "Main", "python")
+sys.path.insert(0, SUBMISSION_DIR)
+
+import DeadlineClient
+
+SCRIPT_PATH = "/repository/scripts/Submission/USDSubmission.py"
+
+
+class WebServiceHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Answers the deadlinecommand commands like the Deadline Web Service, `/<command>?<arg>&<arg>`.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        command = urllib.parse.unquote(path.lstrip("/"))
+        arguments = [urllib.parse.unquote(argument) for argument in query.split("&")] if query else []
+        self.server.requests.append((command, arguments, self.path))
+
+        if command == "GetRepositoryFilePath":
+            self.reply(200, SCRIPT_PATH)
+        elif command == "ExecuteScript" and self.server.script_error:
+            self.reply(500, self.server.script_error)
+        elif command == "ExecuteScript" and arguments[0] == SCRIPT_PATH:
+            self.reply(200, self.server.execute_script(json.loads(arguments[1])))
+        else:
+            self.reply(500, "Unknown command {}".format(command))
+
+    def reply(self, status, output):
+        body = output.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def execute_script(data):
+    if "jobs" in data:
+        names = [job["NameBox"] for job in data["jobs"]]
+        return "\n".join("JobID={}".format(name) for name in names) + "\n" + json.dumps(names)
+    return "Submitting {}\nJobID={}".format(data["NameBox"], data["NameBox"])
+
+
+@pytest.fixture
+def web_service():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), WebServiceHandler)
+    server.requests = []
+    server.execute_script = execute_script
+    server.script_error = None
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(web_service, monkeypatch):
+    client = DeadlineClient.DeadlineClient("http://127.0.0.1:{}".format(web_service.server_address[1]))
+    monkeypatch.setattr(DeadlineClient, "_client", client)
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def houdini(monkeypatch):
+    """
+    The hou and hdefereval stand-ins, the deferred functions run when `run_deferred` is called.
+    """
+    deferred = []
+    hdefereval = types.ModuleType("hdefereval")
+    hdefereval.executeDeferred = deferred.append
+    monkeypatch.setitem(sys.modules, "hou", types.ModuleType("hou"))
+    monkeypatch.setitem(sys.modules, "hdefereval", hdefereval)
+
+    import SubmitUSDToDeadline
+
+    def run_deferred():
+        while deferred:
+            deferred.pop(0)()
+
+    return types.SimpleNamespace(module=SubmitUSDToDeadline, deferred=deferred, run_deferred=run_deferred)
+
+
+def test_web_service_call(web_service, client):
+    assert client.call(["-GetRepositoryFilePath", "scripts/Submission/USDSubmission.py"]).result() == SCRIPT_PATH
+    assert web_service.requests[-1][:2] == ("GetRepositoryFilePath", ["scripts/Submission/USDSubmission.py"])
+
+    # the arguments are quoted, the json settings keep their spaces and separators
+    settings = json.dumps({"NameBox": "shot 010 & co"})
+    assert client.call(["-ExecuteScript", SCRIPT_PATH, settings]).result() == "Submitting shot 010 & co\nJobID=shot 010 & co"
+    assert web_service.requests[-1][1] == [SCRIPT_PATH, settings]
+
+
+def test_web_service_error(web_service, client):
+    with pytest.raises(RuntimeError, match="returned 500"):
+        client.call(["-Unknown"]).result()
+
+    # the connection is opened again after the error
+    assert client.call(["-GetRepositoryFilePath", "scripts"]).result() == SCRIPT_PATH
+
+
+def test_submit_callback(web_service, client, houdini):
+    submit = houdini.module.UsdSubmit()
+    submit.settings = {"NameBox": "shot010"}
+
+    results = []
+    thread_names = []
+
+    def callback(job_id, output):
+        thread_names.append(threading.current_thread().name)
+        results.append((job_id, output))
+
+    future = submit.submit(callback)
+    assert future.result() == "Submitting shot010\nJobID=shot010"
+
+    # the callback is deferred to the main thread by hdefereval, the done callbacks run on the client
+    # thread before its next request
+    client.submit(lambda: None).result()
+    assert results == []
+    houdini.run_deferred()
+    assert results == [("shot010", "Submitting shot010\nJobID=shot010")]
+    assert thread_names == [threading.current_thread().name]
+
+
+def test_submit_callback_error(web_service, client, houdini):
+    web_service.script_error = "The submission script failed"
+    submit = houdini.module.UsdSubmit()
+    submit.settings = {"NameBox": "shot010"}
+
+    results = []
+    future = submit.submit(lambda job_id, output: results.append((job_id, output)))
+    with pytest.raises(RuntimeError):
+        future.result()
+
+    # the done callbacks run on the client thread before its next request
+    client.submit(lambda: None).result()
+    houdini.run_deferred()
+    [(job_id, output)] = results
+    assert job_id is None
+    assert output == "The Deadline Web Service returned 500 Internal Server Error: The submission script failed"
+
+
+def test_batch_submit_chunks(web_service, client, houdini):
+    batch = houdini.module.BatchUsdSubmit({"usdFileBox": "/shots/shot010.usd", "OutputFileBox": "/renders/shot010.$F4.exr"})
+    for index in range(300):
+        batch.add_job({"NameBox": "shot010_{:03d}".format(index), "FramesBox": "1-100", "CameraBox": "/cameras/cam{}".format(index)})
+
+    results = []
+    batch.submit(lambda job_ids, output: results.append(job_ids)).result()
+    client.submit(lambda: None).result()
+    houdini.run_deferred()
+
+    # the batch is split in requests under the url limit, the job ids are in the submission order
+    requests = [request for request in web_service.requests if request[0] == "ExecuteScript"]
+    assert len(requests) > 1
+    assert all(len(path) <= DeadlineClient.MAX_URL_LENGTH for _, _, path in requests)
+    assert results == [["shot010_{:03d}".format(index) for index in range(300)]]
+
+    # every request holds the shared settings
+    for _, arguments, _ in requests:
+        assert json.loads(arguments[1])["shared"]["usdFileBox"] == "/shots/shot010.usd"
+
+
+def test_batch_submit_failed_chunk(web_service, client, houdini):
+    batch = houdini.module.BatchUsdSubmit({})
+    batch.add_job({"NameBox": "shot010"})
+    web_service.script_error = "The submission script failed"
+
+    job_ids, output = batch.get_submit_result(batch.submit())
+    assert job_ids == [None]
+    assert "The submission script failed" in output
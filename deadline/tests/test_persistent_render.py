@@ -0,0 +1,97 @@
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import uuid
+
+import pytest
+
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "plugins", "USD")
+sys.path.insert(0, PLUGIN_DIR)
+
+import persistent_render
+
+
+@pytest.fixture
+def name():
+    """
+    A worker name of its own, the server is shut down after the test.
+    """
+    name = "test_{}".format(uuid.uuid4().hex)
+    yield name
+
+    state_path = persistent_render.get_state_path(name)
+    state = persistent_render.read_state(state_path)
+    conn = persistent_render.connect(state) if state else None
+    if conn:
+        with conn:
+            conn.sendall((json.dumps({"shutdown": True}) + "\n").encode("utf-8"))
+    elif state:
+        # the state of a killed server
+        os.remove(state_path)
+
+
+def get_command(frame_time=0.0):
+    return [sys.executable, os.path.join(PLUGIN_DIR, "stub_renderer.py"), "--usd-input", "/shots/shot.usd",
+            "--load-time", "0", "--frame-time", str(frame_time)]
+
+
+def get_request(frame, count, *args):
+    return {"args": ["--frame", str(frame), "--frame-count", str(count), "--output", "/renders/shot.exr"] + list(args)}
+
+
+def test_render_two_tasks(name, capsys):
+    command = get_command()
+
+    assert persistent_render.render(command, get_request(1, 2), name) == 0
+    output = capsys.readouterr().out
+    assert "Stage loaded" in output
+    assert "Rendering frame 2 to /renders/shot.exr" in output
+    assert "ALF_PROGRESS 100%" in output
+    # the done handshake ends the request, it is not relayed to the plugin
+    assert persistent_render.DONE_TOKEN not in output
+    pid = persistent_render.read_state(persistent_render.get_state_path(name))["pid"]
+
+    # the second task reuses the loaded stage
+    assert persistent_render.render(command, get_request(3, 1), name) == 0
+    output = capsys.readouterr().out
+    assert "Reusing persistent renderer {}".format(pid) in output
+    assert "Stage loaded" not in output
+    assert "Rendering frame 3 to /renders/shot.exr" in output
+
+
+def test_render_crashed_renderer(name, capsys):
+    command = get_command()
+
+    # the renderer exit code is reported, and the next task starts a new server
+    assert persistent_render.render(command, get_request(1, 1, "--crash", "3"), name) == 3
+    capsys.readouterr()
+
+    assert persistent_render.render(command, get_request(2, 1), name) == 0
+    output = capsys.readouterr().out
+    assert "Starting persistent renderer" in output
+    assert "Rendering frame 2 to /renders/shot.exr" in output
+
+
+@pytest.mark.skipif(os.name != "posix", reason="kills the server with a signal")
+def test_render_killed_server(name, capsys):
+    command = get_command(frame_time=30)
+
+    # a request without frames starts the server
+    assert persistent_render.render(command, get_request(1, 0), name) == 0
+    state = persistent_render.read_state(persistent_render.get_state_path(name))
+
+    # the server dies during a long frame, the task fails instead of waiting for it
+    timer = threading.Timer(1.0, os.kill, (state["pid"], signal.SIGKILL))
+    timer.start()
+    start = time.time()
+    try:
+        returncode = persistent_render.render(command, get_request(1, 1), name)
+    finally:
+        timer.cancel()
+
+    assert returncode != 0
+    assert time.time() - start < 20
+    assert "Rendering frame 1 to /renders/shot.exr" in capsys.readouterr().out
@@ -0,0 +1,227 @@
+import datetime
+import importlib.util
+import io
+import os
+import re
+import sys
+import types
+
+import pytest
+
+DEADLINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StringCollection(list):
+    def Add(self, item):
+        self.append(item)
+
+
+class PluginConfig(object):
+    def GetConfigKeys(self):
+        return ["husk_renderExecutable_20.5"]
+
+    def GetConfigEntry(self, key):
+        return "/opt/hfs20.5/bin/husk"
+
+    def GetConfigEntryWithDefault(self, key, default):
+        return default
+
+
+def parse_frames(frames):
+    """
+    Parses a frame list like `1-100x2,150`, like the Deadline FrameUtils.
+    """
+    result = []
+    for item in frames.split(","):
+        match = re.match(r"^\s*(-?\d+)(?:-(-?\d+)(?:x(\d+))?)?\s*$", item)
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else start
+        result.extend(range(start, end + 1, int(match.group(3) or 1)))
+    return result
+
+
+class Deadline(object):
+    """
+    The Deadline scripting stand-ins, recording the deadlinecommand calls.
+    """
+    def __init__(self, temp_path):
+        self.temp_path = temp_path
+        self.commands = []
+
+        self.ClientUtils = types.SimpleNamespace(
+            GetDeadlineTempPath=lambda: temp_path,
+            GetUsersSettingsDirectory=lambda: temp_path,
+            ExecuteCommandAndGetOutput=self.execute,
+        )
+        self.RepositoryUtils = types.SimpleNamespace(
+            GetMaximumPriority=lambda: 100,
+            GetPluginConfig=lambda name: PluginConfig(),
+        )
+        self.FrameUtils = types.SimpleNamespace(
+            Parse=parse_frames,
+            ToFrameString=lambda frames: ",".join(str(frame) for frame in frames),
+            FrameRangeValid=lambda frames: bool(re.match(r"^[\d\-x, ]+$", frames or "")),
+        )
+        self.PathUtils = types.SimpleNamespace(IsPathLocal=lambda path: False)
+        self.SystemUtils = types.SimpleNamespace(IsRunningOnWindows=lambda: False)
+
+    def execute(self, arguments):
+        arguments = list(arguments)
+        self.commands.append(arguments)
+        count = arguments.count("-job") if arguments[0] == "-SubmitMultipleJobs" else 1
+        return "\n".join("JobID=job{}_{}".format(len(self.commands), index) for index in range(count))
+
+    def read_info(self, filename):
+        with io.open(filename, "r", encoding="utf-16") as f:
+            return dict(line.rstrip("\n").split("=", 1) for line in f)
+
+    def jobs(self, command):
+        """
+        Returns the job and plugin info of the jobs of a deadlinecommand call.
+        """
+        if command[0] == "-SubmitMultipleJobs":
+            indices = [index + 1 for index, argument in enumerate(command) if argument == "-job"]
+        else:
+            indices = [0]
+        return [(self.read_info(command[index]), self.read_info(command[index + 1])) for index in indices]
+
+
+@pytest.fixture
+def deadline(tmp_path, monkeypatch):
+    stand_ins = Deadline(str(tmp_path))
+
+    scripting = types.ModuleType("Deadline.Scripting")
+    for name in ("ClientUtils", "RepositoryUtils", "FrameUtils", "PathUtils", "SystemUtils"):
+        setattr(scripting, name, getattr(stand_ins, name))
+    specialized = types.ModuleType("System.Collections.Specialized")
+    specialized.StringCollection = StringCollection
+
+    monkeypatch.setitem(sys.modules, "Deadline", types.ModuleType("Deadline"))
+    monkeypatch.setitem(sys.modules, "Deadline.Scripting", scripting)
+    monkeypatch.setitem(sys.modules, "System", types.ModuleType("System"))
+    monkeypatch.setitem(sys.modules, "System.Collections", types.ModuleType("System.Collections"))
+    monkeypatch.setitem(sys.modules, "System.Collections.Specialized", specialized)
+
+    spec = importlib.util.spec_from_file_location("USDSubmission", os.path.join(DEADLINE_DIR, "USDSubmission.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    stand_ins.module = module
+    return stand_ins
+
+
+@pytest.fixture
+def usd_file(tmp_path):
+    path = tmp_path / "shot.usda"
+    path.write_text("#usda 1.0\n")
+    return str(path)
+
+
+def get_settings(usd_file, **settings):
+    values = {"usdFileBox": usd_file, "OutputFileBox": "/renders/shot.$F4.exr", "FramesBox": "1-20"}
+    values.update(settings)
+    return values
+
+
+def test_default_settings(deadline):
+    defaults = deadline.module.GetDefaultSettings()
+    assert defaults["PriorityBox"] == 50
+    assert defaults["ExecutableBox"] == "husk"
+    assert defaults["VersionBox"] == "20.5"
+    assert set(deadline.module.DEFAULT_SETTINGS) < set(defaults)
+
+
+def test_submit_settings(deadline, usd_file):
+    results = deadline.module.SubmitSettings(get_settings(usd_file, NameBox="shot", ChunkSizeBox=5))
+
+    assert deadline.module.GetJobIds(results) == ["job1_0"]
+    [(jobInfo, pluginInfo)] = deadline.jobs(deadline.commands[0])
+    assert jobInfo["Name"] == "shot"
+    assert jobInfo["Frames"] == "1-20"
+    assert jobInfo["ChunkSize"] == "5"
+    assert pluginInfo["usdFile"] == usd_file
+
+
+@pytest.mark.parametrize("settings", [
+    {"FramesBox": "one"},
+    {"usdFileBox": "/missing/shot.usd"},
+    {"OutputFileBox": ""},
+    {"UnknownBox": True},
+    {"FramesBox": "1-4,6-7", "ChunkSizeBox": 3},
+])
+def test_submit_settings_invalid(deadline, usd_file, settings):
+    assert deadline.module.SubmitSettings(get_settings(usd_file, **settings)) is None
+    assert deadline.commands == []
+
+
+def test_submit_progressive(deadline, usd_file):
+    deadline.module.SubmitSettings(get_settings(usd_file, ProgressiveCB=True, PreviewStepRange=5, PreviewScaleRange=50))
+
+    assert len(deadline.commands) == 2
+    [(previewJobInfo, previewPluginInfo)] = deadline.jobs(deadline.commands[0])
+    [(fullJobInfo, fullPluginInfo)] = deadline.jobs(deadline.commands[1])
+    assert previewJobInfo["Frames"] == "1,6,11,16"
+    assert previewJobInfo["Priority"] == "60"
+    assert previewPluginInfo["ScaleSize"] == "50"
+    assert previewPluginInfo["OutputFile"] == os.path.join("/renders", "preview", "shot.$F4.exr")
+    assert fullJobInfo["JobDependencies"] == "job1_0"
+    assert fullJobInfo["Frames"] == "1-20"
+
+
+def test_submit_auto_chunk(deadline, usd_file):
+    start = datetime.datetime.now()
+    deadline.module.SubmitSettings(get_settings(usd_file, AutoChunkSizeBox=True, ChunkSizeBox=2, MaxLoadOverheadRange=20,
+                                                AutoChunkTimeoutRange=30))
+
+    assert len(deadline.commands) == 2
+    [(mainJobInfo, mainPluginInfo)] = deadline.jobs(deadline.commands[0])
+    [(calibrationJobInfo, calibrationPluginInfo)] = deadline.jobs(deadline.commands[1])
+    assert mainJobInfo["Frames"] == ",".join(str(frame) for frame in range(3, 21))
+    assert calibrationJobInfo["Frames"] == "1,2"
+    assert calibrationPluginInfo["AutoChunkJobId"] == "job1_0"
+    assert calibrationPluginInfo["AutoChunkResume"] == "True"
+    assert calibrationPluginInfo["MaxLoadOverhead"] == "0.2"
+
+    # the job is pending until the calibration releases it, or until the timeout
+    assert "InitialStatus" not in mainJobInfo
+    assert mainJobInfo["ScheduledType"] == "Once"
+    scheduled = datetime.datetime.strptime(mainJobInfo["ScheduledStartDateTime"], "%d/%m/%Y %H:%M")
+    assert datetime.timedelta(minutes=29) < scheduled - start <= datetime.timedelta(minutes=31)
+
+
+def test_submit_auto_chunk_suspended(deadline, usd_file):
+    deadline.module.SubmitSettings(get_settings(usd_file, AutoChunkSizeBox=True, ChunkSizeBox=2, SubmitSuspendedBox=True))
+
+    [(mainJobInfo, _)] = deadline.jobs(deadline.commands[0])
+    [(_, calibrationPluginInfo)] = deadline.jobs(deadline.commands[1])
+    # the calibration sets the frames per task of the suspended job and leaves it suspended
+    assert mainJobInfo["InitialStatus"] == "Suspended"
+    assert "ScheduledType" not in mainJobInfo
+    assert calibrationPluginInfo["AutoChunkResume"] == "False"
+
+
+def test_submit_batch(deadline, usd_file):
+    jobIds = deadline.module.SubmitBatch([
+        get_settings(usd_file, NameBox="first"),
+        get_settings(usd_file, NameBox="invalid", usdFileBox="/missing/shot.usd"),
+        get_settings(usd_file, NameBox="progressive", ProgressiveCB=True),
+        get_settings(usd_file, NameBox="auto", AutoChunkSizeBox=True),
+        get_settings(usd_file, NameBox="tiles", TileCB=True, TileBatchCB=True, XTileRange=2, YTileRange=2,
+                     ChunkSizeBox=2, AutoChunkSizeBox=True, ProgressiveCB=True),
+    ])
+
+    # one deadlinecommand call, the tile jobs ignore the progressive and auto chunk options
+    assert jobIds == ["job1_0", None, None, None, "job1_1"]
+    assert len(deadline.commands) == 1
+    [(firstJobInfo, _), (tilesJobInfo, tilesPluginInfo)] = deadline.jobs(deadline.commands[0])
+    assert firstJobInfo["Name"] == "first"
+    assert tilesJobInfo["Name"] == "tiles"
+    assert tilesJobInfo["Frames"] == "0-79"
+    assert tilesJobInfo["ChunkSize"] == "8"
+    assert tilesPluginInfo["TileBatchEnable"] == "True"
+
+
+def test_submit_batch_nothing_valid(deadline, usd_file):
+    jobIds = deadline.module.SubmitBatch([get_settings(usd_file, FramesBox="")])
+
+    assert jobIds == [None]
+    assert deadline.commands == []
@@ -1,119 +1,751 @@
-import random
+from __future__ import annotations
+
+import concurrent.futures
+import itertools
+import os
+import tempfile
+from typing import Tuple
+
 import numpy as np
 
-from pxr import Usd, Sdf, UsdGeom
+try:
+    from pxr import Usd, Sdf, UsdGeom, Vt
+except ImportError:
+    # the sampling of the numpy mesh arrays does not need USD
+    Usd = Sdf = UsdGeom = Vt = None
 
+MESH_ARRAYS = ("points", "counts", "indices")
 
-def random_groups_vectors(num_values: int, num_groups: int, seed=101) -> np.ndarray:
+
+def get_mesh_arrays(mesh: UsdGeom.Mesh, time=None):
     """
-    Generate random vectors and distribute them into groups.
+    Returns the points, face vertex counts and face vertex indices of a mesh as numpy arrays, at
+    the default time when no time is given.
     """
-    np.random.seed(seed)
-    random_pairs = np.random.rand(num_values, 2)
-    np.random.shuffle(random_pairs)
+    time = Usd.TimeCode.Default() if time is None else time
+    points = np.asarray(mesh.GetPointsAttr().Get(time), dtype=np.float32)
+    counts = np.asarray(mesh.GetFaceVertexCountsAttr().Get(time), dtype=np.int64)
+    indices = np.asarray(mesh.GetFaceVertexIndicesAttr().Get(time), dtype=np.int64)
+    return points, counts, indices
 
-    group_indices = np.random.randint(0, num_groups, num_values)
 
-    groups = [random_pairs[group_indices == i] for i in range(num_groups)]
+def triangulate(counts: np.ndarray):
+    """
+    Fan triangulates faces of any vertex count.
 
-    return np.array(groups)
+    Returns the face vertex index of the 3 corners of every triangle, `(n, 3)`, and the face of
+    every triangle. The faces with less than 3 vertices have no triangles.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    triangle_counts = np.maximum(counts - 2, 0)
+    face_starts = np.cumsum(counts) - counts
 
+    triangle_faces = np.repeat(np.arange(len(counts)), triangle_counts)
+    # the index of every triangle in its face fan
+    fan = np.arange(len(triangle_faces)) - np.repeat(np.cumsum(triangle_counts) - triangle_counts, triangle_counts)
 
-def scatter_points(prim: Usd.Prim, num_points: int, seed=101):
-    mesh = UsdGeom.Mesh(prim)
+    corners = np.empty((len(triangle_faces), 3), dtype=np.int64)
+    corners[:, 0] = face_starts[triangle_faces]
+    corners[:, 1] = corners[:, 0] + fan + 1
+    corners[:, 2] = corners[:, 0] + fan + 2
+
+    return corners, triangle_faces
+
+
+def get_triangle_areas(points: np.ndarray, triangles: np.ndarray) -> np.ndarray:
+    """
+    Returns the area of every triangle, given by its 3 point indices.
+    """
+    p0 = points[triangles[:, 0]]
+    edges = np.cross(points[triangles[:, 1]] - p0, points[triangles[:, 2]] - p0)
+    return 0.5 * np.linalg.norm(edges, axis=1)
+
+
+def get_uniform_barycentrics(rng: np.random.Generator, count: int) -> np.ndarray:
+    """
+    Returns barycentric coordinates uniformly distributed over a triangle area, `(n, 3)`.
+    """
+    # the square root keeps the samples uniform over the triangle area
+    r1 = np.sqrt(rng.random(count, dtype=np.float32))
+    r2 = rng.random(count, dtype=np.float32)
+    barycentrics = np.empty((count, 3), dtype=np.float32)
+    barycentrics[:, 0] = 1 - r1
+    barycentrics[:, 1] = r1 * (1 - r2)
+    barycentrics[:, 2] = r1 * r2
+    return barycentrics
+
+
+def sample_triangles(weights: np.ndarray, num_points: int, seed=101, corner_densities=None):
+    """
+    Picks triangles with a probability proportional to their weights, like their areas, and
+    barycentric coordinates inside them, uniform or following the density at the triangle corners.
+
+    Returns the triangle of every sample and the barycentric coordinates, `(n, 3)`. The same seed
+    gives the same samples.
+    """
+    rng = np.random.default_rng(seed)
+
+    weights = np.asarray(weights, dtype=np.float64)
+    total = weights.sum()
+    if len(weights) == 0 or total <= 0:
+        raise ValueError("Cannot scatter points on a mesh without area")
+
+    # the samples count of every triangle, the samples are grouped by triangle so the gathers
+    # read the mesh in order
+    triangle_ids = np.repeat(np.arange(len(weights)), rng.multinomial(num_points, weights / total))
+    barycentrics = get_uniform_barycentrics(rng, num_points)
+
+    if corner_densities is not None:
+        # the density is linear over a triangle, the samples are thrown again until they pass it
+        densities = corner_densities[triangle_ids]
+        peaks = densities.max(axis=1)
+        pending = np.arange(num_points)
+        while len(pending):
+            local_densities = (barycentrics[pending] * densities[pending]).sum(axis=1)
+            pending = pending[rng.random(len(pending)) * peaks[pending] > local_densities]
+            barycentrics[pending] = get_uniform_barycentrics(rng, len(pending))
+
+    return triangle_ids, barycentrics
+
+
+def interpolate(values: np.ndarray, triangles: np.ndarray, triangle_ids: np.ndarray,
+                barycentrics: np.ndarray) -> np.ndarray:
+    """
+    Interpolates per point values, like the positions, at the samples with one gather per corner.
+    """
+    # the weights broadcast over the components of the values
+    shape = (-1,) + (1,) * (np.ndim(values) - 1)
+    result = values[triangles[triangle_ids, 0]] * barycentrics[:, 0].reshape(shape)
+    result += values[triangles[triangle_ids, 1]] * barycentrics[:, 1].reshape(shape)
+    result += values[triangles[triangle_ids, 2]] * barycentrics[:, 2].reshape(shape)
+    return result
+
+
+def get_primvar_array(mesh: UsdGeom.Mesh, name: str, time=None):
+    """
+    Returns the flattened values of a mesh primvar as a numpy array, its interpolation and its
+    value type name.
+    """
+    time = Usd.TimeCode.Default() if time is None else time
+    primvar = UsdGeom.PrimvarsAPI(mesh).GetPrimvar(name)
+    if not primvar or not primvar.HasValue():
+        raise ValueError("The mesh `{}` has no `{}` primvar".format(mesh.GetPath(), name))
+
+    values = np.asarray(primvar.ComputeFlattened(time))
+    type_name = primvar.GetTypeName()
+    if not type_name.isArray:
+        values = values[np.newaxis]
+
+    return values, primvar.GetInterpolation(), type_name
+
+
+class TriangleMesh:
+    """
+    The triangles of a mesh, to sample it and interpolate its primvars at the samples.
+    """
+    def __init__(self, points: np.ndarray, counts: np.ndarray, indices: np.ndarray):
+        self.points = points
+        self.indices = indices
+        self.corners, self.faces = triangulate(counts)
+        self.triangles = indices[self.corners]
+
+    def get_areas(self) -> np.ndarray:
+        return get_triangle_areas(self.points, self.triangles)
+
+    def get_corner_indices(self, interpolation: str) -> np.ndarray:
+        """
+        Returns the index of the primvar value at the 3 corners of every triangle, by the primvar
+        interpolation, one of the UsdGeom interpolation tokens.
+        """
+        if interpolation in ("vertex", "varying"):
+            return self.triangles
+        if interpolation == "faceVarying":
+            return self.corners
+        if interpolation == "uniform":
+            return np.repeat(self.faces[:, np.newaxis], 3, axis=1)
+
+        # constant
+        return np.zeros_like(self.triangles)
+
+    def get_corner_values(self, values: np.ndarray, interpolation: str) -> np.ndarray:
+        return np.asarray(values)[self.get_corner_indices(interpolation)]
+
+    def interpolate(self, values: np.ndarray, interpolation: str, triangle_ids: np.ndarray,
+                    barycentrics: np.ndarray) -> np.ndarray:
+        """
+        Interpolates primvar values at the samples, by their interpolation. The integer values are
+        not blended, they are taken from the closest corner.
+        """
+        values = np.asarray(values)
+        indices = self.get_corner_indices(interpolation)
+
+        if values.dtype.kind in "biu":
+            closest = np.argmax(barycentrics, axis=1)
+            return values[indices[triangle_ids, closest]]
+
+        return interpolate(values, indices, triangle_ids, barycentrics).astype(values.dtype, copy=False)
+
+    def interpolate_centers(self, values: np.ndarray, interpolation: str) -> np.ndarray:
+        """
+        Interpolates primvar values at the center of every triangle.
+        """
+        barycentrics = np.full((len(self.triangles), 3), 1 / 3, dtype=np.float32)
+        return self.interpolate(values, interpolation, np.arange(len(self.triangles)), barycentrics)
+
+    def get_normals(self, triangle_ids: np.ndarray) -> np.ndarray:
+        """
+        Returns the unit geometric normals of triangles.
+        """
+        triangles = self.triangles[triangle_ids]
+        p0 = self.points[triangles[:, 0]]
+        normals = np.cross(self.points[triangles[:, 1]] - p0, self.points[triangles[:, 2]] - p0)
+        return normalize(normals)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    lengths = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(lengths > 0, lengths, 1)
+
+
+def scatter_mesh(points: np.ndarray, counts: np.ndarray, indices: np.ndarray, num_points: int,
+                 seed=101) -> np.ndarray:
+    """
+    Scatters points uniformly over the area of a mesh given as numpy arrays.
+    """
+    mesh = TriangleMesh(points, counts, indices)
+
+    triangle_ids, barycentrics = sample_triangles(mesh.get_areas(), num_points, seed=seed)
+    return interpolate(points, mesh.triangles, triangle_ids, barycentrics)
+
+
+def scatter_points(prim: Usd.Prim, num_points: int, seed=101) -> np.ndarray:
+    """
+    Scatters points uniformly over the area of a mesh, the same seed gives the same points.
+    """
+    points, counts, indices = get_mesh_arrays(UsdGeom.Mesh(prim))
+    return scatter_mesh(points, counts, indices, num_points, seed=seed)
+
+
+def get_neighbor_offsets(reach: int, cell_size: float, max_radius: float,
+                         dims: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the key offsets of the grid cells which may hold a point closer than the max radius,
+    the touching cells first, then the farther ones.
+    """
+    steps = np.arange(-reach, reach + 1)
+    offsets = np.stack(np.meshgrid(steps, steps, steps, indexing="ij"), axis=-1).reshape(-1, 3)
+
+    # the closest distance between the points of two cells
+    gaps = (np.maximum(np.abs(offsets) - 1, 0) ** 2).sum(axis=1) * cell_size ** 2
+    keys = (offsets[:, 0] * dims[1] + offsets[:, 1]) * dims[2] + offsets[:, 2]
+
+    return keys[gaps == 0], keys[(gaps > 0) & (gaps < max_radius ** 2)]
+
+
+class CellHash:
+    """
+    An open addressing hash table of grid cell keys, looked up for many keys at once.
+    """
+    def __init__(self, keys: np.ndarray):
+        self.bits = max(4, int(np.ceil(np.log2(2 * max(len(keys), 1)))))
+        self.mask = (1 << self.bits) - 1
+        self.keys = np.full(1 << self.bits, -1, dtype=np.int64)
+        self.values = np.full(1 << self.bits, -1, dtype=np.int64)
+
+        pending = np.arange(len(keys))
+        slots = self.get_slots(keys)
+        while len(pending):
+            free = self.keys[slots] < 0
+            # of the keys falling in the same free slot, the first one takes it
+            taken, first = np.unique(slots[free], return_index=True)
+            winners = pending[free][first]
+            self.keys[taken] = keys[winners]
+            self.values[taken] = winners
+
+            placed = np.zeros(len(pending), dtype=bool)
+            placed[np.flatnonzero(free)[first]] = True
+            slots = np.where(free, slots, (slots + 1) & self.mask)[~placed]
+            pending = pending[~placed]
+
+    def get_slots(self, keys: np.ndarray) -> np.ndarray:
+        hashes = keys.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+        return (hashes >> np.uint64(64 - self.bits)).astype(np.int64)
+
+    def lookup(self, keys: np.ndarray) -> np.ndarray:
+        """
+        Returns the index of every key in the keys of the table, -1 for the missing keys.
+        """
+        keys = keys.reshape(-1)
+        result = np.full(len(keys), -1, dtype=np.int64)
+
+        pending = np.arange(len(keys))
+        slots = self.get_slots(keys)
+        while len(pending):
+            found = self.keys[slots]
+            hits = found == keys[pending]
+            result[pending[hits]] = self.values[slots[hits]]
+
+            probing = ~hits & (found >= 0)
+            pending = pending[probing]
+            slots = (slots[probing] + 1) & self.mask
+
+        return result
+
+
+def poisson_disk_sample(positions: np.ndarray, radii, seed=101, chunk_size=1 << 22) -> np.ndarray:
+    """
+    Keeps the candidate positions which are not closer to each other than their radius, two points
+    are kept when their distance is at least the larger of their radii.
 
-    points_attr = mesh.GetPointsAttr()
-    fvCount_attr = mesh.GetFaceVertexCountsAttr()
-    fvIndices_attr = mesh.GetFaceVertexIndicesAttr()
+    The candidates are thrown in a random order, like Bridson dart throwing, on a uniform grid whose
+    cell diagonal is the smallest radius, so a cell holds at most one kept point and the neighbors
+    of a candidate are found by their cell keys. The cells are split in phases, the cells of a phase
+    being farther apart than the largest radius, so the next candidate of every cell of a phase is
+    tested at once. The cells are found in a hash table, so the cost grows with the number of
+    candidates, not with the grid size.
 
-    points_values = np.array(points_attr.Get())
-    fvIndices_values = np.array(fvIndices_attr.Get())
+    Returns the indices of the kept candidates, in the throwing order.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    radii = np.broadcast_to(np.asarray(radii, dtype=np.float64), (len(positions),))
+    if not len(positions):
+        return np.empty(0, dtype=np.int64)
+    if radii.min() <= 0:
+        raise ValueError("The poisson disk radii must be positive")
+
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(positions))
+    positions = positions[order]
+    radii = radii[order]
+
+    cell_size = radii.min() / np.sqrt(3)
+    reach = int(np.ceil(radii.max() / cell_size))
+    period = reach + 1
+
+    cells = np.floor((positions - positions.min(axis=0)) / cell_size).astype(np.int64) + reach
+    dims = cells.max(axis=0) + reach + 1
+    if np.prod(dims.astype(np.float64)) >= 2 ** 62:
+        raise ValueError("The poisson disk radius is too small for the mesh size")
+
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    cell_keys, cell_ids = np.unique(keys, return_inverse=True)
+    cell_ids = cell_ids.reshape(-1)
+
+    # the rank of every candidate in its cell, in the throwing order
+    counts = np.bincount(cell_ids)
+    ranks = np.empty(len(positions), dtype=np.int64)
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    ranks[np.argsort(cell_ids, kind="stable")] = np.arange(len(positions)) - starts
+
+    phases = ((cells % period) * np.array([period * period, period, 1])).sum(axis=1)
+    rounds = ranks * period ** 3 + phases
+    # the candidates of a round are tested in the cell keys order, so the lookups read the grid in order
+    schedule = np.lexsort((keys, rounds))
+    bounds = np.flatnonzero(np.diff(rounds[schedule])) + 1
+
+    offsets = get_neighbor_offsets(reach, cell_size, radii.max(), dims)
+    rows = max(1, chunk_size // sum(len(x) for x in offsets))
+
+    cell_hash = CellHash(cell_keys)
+    occupants = np.full(len(cell_keys), -1, dtype=np.int64)
+    for batch in np.split(schedule, bounds):
+        batch = batch[occupants[cell_ids[batch]] < 0]
+
+        # the candidates of a round are far enough apart to be tested independently
+        for start in range(0, len(batch), rows):
+            candidates = batch[start:start + rows]
+
+            # the closest cells reject most candidates, the farther cells are only read for the others
+            conflicts = np.zeros(len(candidates), dtype=bool)
+            for stage_offsets in offsets:
+                tested = np.flatnonzero(~conflicts)
+                neighbor_cells = cell_hash.lookup(keys[candidates[tested], np.newaxis] + stage_offsets)
+                neighbors = np.where(neighbor_cells >= 0, occupants[neighbor_cells], -1)
+                neighbors = neighbors.reshape(len(tested), len(stage_offsets))
+
+                found = neighbors >= 0
+                neighbors = neighbors[found]
+                rows_ids = tested[np.nonzero(found)[0]]
+
+                distances = ((positions[neighbors] - positions[candidates[rows_ids]]) ** 2).sum(axis=1)
+                limits = np.maximum(radii[neighbors], radii[candidates[rows_ids]]) ** 2
+                conflicts[rows_ids[distances < limits]] = True
+
+            kept = candidates[~conflicts]
+            occupants[cell_ids[kept]] = kept
+
+    kept = np.sort(occupants[occupants >= 0])
+    return order[kept]
+
+
+def get_density_weights(triangle_mesh: TriangleMesh, densities=None, interpolation="vertex"):
+    """
+    Returns the sampling weight of every triangle, and the density at its corners, None without
+    densities. The negative densities are clamped to 0.
+    """
+    areas = triangle_mesh.get_areas()
+    if densities is None:
+        return areas, None
 
-    faces_values = fvIndices_values.reshape(-1, 4)
+    densities = np.asarray(densities, dtype=np.float32)
+    corner_densities = np.maximum(triangle_mesh.get_corner_values(densities, interpolation), 0)
 
-    random_values_list = random_groups_vectors(num_points, faces_values.shape[0], seed=seed)
+    # the integral of a linear density over a triangle is its area by the mean of its corners
+    return areas * corner_densities.mean(axis=1), corner_densities
 
-    new_points = []
-    for i, face in enumerate(faces_values):
 
-        p0 = points_values[face[0]]
-        p1 = points_values[face[1]]
-        p2 = points_values[face[2]]
-        p3 = points_values[face[3]]
+def get_mesh_density_weights(mesh: UsdGeom.Mesh, triangle_mesh: TriangleMesh, density_primvar=None):
+    """
+    Returns the sampling weights of the triangles and their corner densities, from a density
+    primvar, see `get_density_weights`.
+    """
+    if not density_primvar:
+        return get_density_weights(triangle_mesh)
 
-        v1 = p1 - p0
-        v2 = p3 - p0
+    values, interpolation, _ = get_primvar_array(mesh, density_primvar)
+    return get_density_weights(triangle_mesh, values, interpolation)
 
-        for r1, r2 in random_values_list[i]:
-            # barycentric coordinates
-            newp = p0 + (r1 * v1) + (r2 * v2)
-            new_points.append(newp)
 
-    return np.array(new_points)
+def get_poisson_samples(mesh: UsdGeom.Mesh, triangle_mesh: TriangleMesh, min_distance: float, seed=101,
+                        radius_primvar=None, density_primvar=None, tries=8):
+    """
+    Returns the triangle and the barycentric coordinates of blue noise samples, see
+    `scatter_points_poisson`.
+    """
+    weights, corner_densities = get_mesh_density_weights(mesh, triangle_mesh, density_primvar)
+    if radius_primvar:
+        values, interpolation, _ = get_primvar_array(mesh, radius_primvar)
+        values = np.maximum(values.astype(np.float32), min_distance)
+        # the candidates are denser where the radius is smaller
+        weights = weights / triangle_mesh.interpolate_centers(values, interpolation) ** 2
+    else:
+        weights = weights / min_distance ** 2
+
+    num_candidates = int(np.ceil(tries * weights.sum()))
+    triangle_ids, barycentrics = sample_triangles(weights, num_candidates, seed=seed,
+                                                  corner_densities=corner_densities)
+    candidates = interpolate(triangle_mesh.points, triangle_mesh.triangles, triangle_ids, barycentrics)
+
+    radii = min_distance
+    if radius_primvar:
+        radii = triangle_mesh.interpolate(values, interpolation, triangle_ids, barycentrics)
+
+    kept = poisson_disk_sample(candidates, radii, seed=seed)
+    return triangle_ids[kept], barycentrics[kept]
+
+
+def scatter_points_poisson(prim: Usd.Prim, min_distance: float, seed=101, radius_primvar=None,
+                           tries=8) -> np.ndarray:
+    """
+    Scatters blue noise points over a mesh, no point being closer to another than the min distance.
 
-def scatter_points_with_dis(prim, num_points, min_distance= 0.1, seed=101):
+    The candidates are scattered over the mesh area, then thinned by `poisson_disk_sample`, in
+    near linear time.
 
+    :param prim: The mesh prim
+    :param min_distance: The distance between the points, the lower bound of the radius primvar
+    :param seed: The random seed, the same seed gives the same points
+    :param radius_primvar: The name of a mesh primvar giving the distance around every point
+    :param tries: The number of candidates thrown per min distance squared of area
+    :return: the points positions
+    """
     mesh = UsdGeom.Mesh(prim)
+    triangle_mesh = TriangleMesh(*get_mesh_arrays(mesh))
+
+    triangle_ids, barycentrics = get_poisson_samples(mesh, triangle_mesh, min_distance, seed=seed,
+                                                     radius_primvar=radius_primvar, tries=tries)
+    return interpolate(triangle_mesh.points, triangle_mesh.triangles, triangle_ids, barycentrics)
+
+
+def get_normals(mesh: UsdGeom.Mesh, triangle_mesh: TriangleMesh, triangle_ids: np.ndarray,
+                barycentrics: np.ndarray) -> np.ndarray:
+    """
+    Returns the unit normals at the samples, from the mesh normals, else from its triangles.
+    """
+    primvar = UsdGeom.PrimvarsAPI(mesh).GetPrimvar("normals")
+    if primvar and primvar.HasValue():
+        values, interpolation, _ = get_primvar_array(mesh, "normals")
+    elif mesh.GetNormalsAttr().HasValue():
+        values, interpolation = np.asarray(mesh.GetNormalsAttr().Get()), mesh.GetNormalsInterpolation()
+    else:
+        normals = triangle_mesh.get_normals(triangle_ids)
+        if mesh.GetOrientationAttr().Get() == UsdGeom.Tokens.leftHanded:
+            normals = -normals
+        return normals
+
+    return normalize(triangle_mesh.interpolate(values.astype(np.float32), interpolation, triangle_ids, barycentrics))
+
+
+def transfer_primvars(mesh: UsdGeom.Mesh, triangle_mesh: TriangleMesh, triangle_ids: np.ndarray,
+                      barycentrics: np.ndarray, names) -> dict:
+    """
+    Interpolates mesh primvars at the samples.
+
+    :return: the `{name: (values, value type name)}` of the primvars, one value per sample
+    """
+    primvars = {}
+    for name in names:
+        values, interpolation, type_name = get_primvar_array(mesh, name)
+        if values.dtype.kind not in "biuf":
+            raise ValueError("The `{}` primvar is not numeric and cannot be transferred".format(name))
+
+        primvars[name] = (triangle_mesh.interpolate(values, interpolation, triangle_ids, barycentrics), type_name)
+
+    return primvars
+
+
+def scatter_points_primvars(prim: Usd.Prim, num_points: int, seed=101, density_primvar=None, primvars=(),
+                            min_distance=None, radius_primvar=None):
+    """
+    Scatters points over a mesh, and interpolates its normals and primvars at the points, in one
+    batch of numpy operations.
+
+    :param prim: The mesh prim
+    :param num_points: The number of points, ignored with a min distance
+    :param seed: The random seed, the same seed gives the same points
+    :param density_primvar: The name of a mesh primvar giving the relative points density, like a mask
+    :param primvars: The names of the mesh primvars to transfer to the points, like `st`
+    :param min_distance: The distance between the points, to scatter blue noise points
+    :param radius_primvar: The name of a mesh primvar giving the distance around every point
+    :return: the positions, the normals and the `{name: (values, value type name)}` primvars
+    """
+    mesh = UsdGeom.Mesh(prim)
+    triangle_mesh = TriangleMesh(*get_mesh_arrays(mesh))
+
+    if min_distance:
+        triangle_ids, barycentrics = get_poisson_samples(mesh, triangle_mesh, min_distance, seed=seed,
+                                                         radius_primvar=radius_primvar,
+                                                         density_primvar=density_primvar)
+    else:
+        weights, corner_densities = get_mesh_density_weights(mesh, triangle_mesh, density_primvar)
+        triangle_ids, barycentrics = sample_triangles(weights, num_points, seed=seed,
+                                                      corner_densities=corner_densities)
 
-    points_attr = mesh.GetPointsAttr()
-    fvCount_attr = mesh.GetFaceVertexCountsAttr()
-    fvIndices_attr = mesh.GetFaceVertexIndicesAttr()
+    positions = interpolate(triangle_mesh.points, triangle_mesh.triangles, triangle_ids, barycentrics)
+    normals = get_normals(mesh, triangle_mesh, triangle_ids, barycentrics)
+    return positions, normals, transfer_primvars(mesh, triangle_mesh, triangle_ids, barycentrics, primvars)
 
-    points_values = np.array(points_attr.Get())
-    fvIndices_values = np.array(fvIndices_attr.Get())
 
-    faces_values = fvIndices_values.reshape(-1, 4)
+def create_points(stage: Usd.Stage, path: Sdf.Path, positions: np.ndarray, normals=None,
+                  primvars=None) -> UsdGeom.Points:
+    """
+    Defines a points prim from numpy arrays, the arrays are converted by `Vt.*Array.FromNumpy`
+    without going through python values.
+
+    :param stage: The stage
+    :param path: The points prim path
+    :param positions: The positions, `(n, 3)`
+    :param normals: The normals, `(n, 3)`
+    :param primvars: The `{name: (values, value type name)}` vertex primvars
+    :return: the points prim
+    """
+    points = UsdGeom.Points.Define(stage, path)
+    points.CreatePointsAttr(Vt.Vec3fArray.FromNumpy(np.ascontiguousarray(positions, dtype=np.float32)))
+
+    if normals is not None:
+        points.CreateNormalsAttr(Vt.Vec3fArray.FromNumpy(np.ascontiguousarray(normals, dtype=np.float32)))
+
+    primvars_api = UsdGeom.PrimvarsAPI(points)
+    for name, (values, type_name) in (primvars or {}).items():
+        array_type = type_name if type_name.isArray else type_name.arrayType
+        primvar = primvars_api.CreatePrimvar(name, array_type, UsdGeom.Tokens.vertex)
+        primvar.Set(array_type.type.pythonClass.FromNumpy(np.ascontiguousarray(values)))
 
-    random_values_list = random_groups_vectors(num_points, faces_values.shape[0], seed=seed)
+    return points
+
+
+def save_mesh_arrays(mesh: UsdGeom.Mesh, directory: str, time=None) -> dict:
+    """
+    Writes the points, face vertex counts and face vertex indices of a mesh to `.npy` files, so
+    the chunks of a chunked scatter read them by memory mapping.
 
-    new_points = np.empty((0, 3), dtype=np.float32)
-    for i, face in enumerate(faces_values):
+    :return: the `{name: path}` of the arrays
+    """
+    paths = {}
+    for name, array in zip(MESH_ARRAYS, get_mesh_arrays(mesh, time)):
+        paths[name] = os.path.join(directory, "{}.npy".format(name))
+        np.save(paths[name], array)
+    return paths
 
-        p0 = points_values[face[0]]
-        p1 = points_values[face[1]]
-        p2 = points_values[face[2]]
-        p3 = points_values[face[3]]
 
-        v1 = p1 - p0
-        v2 = p3 - p0
+def load_mesh_arrays(paths: dict):
+    return tuple(np.load(paths[name], mmap_mode="r") for name in MESH_ARRAYS)
 
-        
-        # newp = p0 + (r1 * v1) + (r2 * v2)
-        
-        # for r1, r2 in random_values_list[i]:
-        #     # barycentric coordinates
-        #     newp = p0 + (r1 * v1) + (r2 * v2)
-            
-        #     if all(np.linalg.norm(newp-existing_point) >= min_distance for existing_point in new_points):
-        #         new_points.append(newp)
-        
-        
-        candidate_points = p0 + (random_values_list[i][:, 0, np.newaxis] * v1) + (random_values_list[i][:, 1, np.newaxis] * v2)
-        # Check the distance to existing points
-        distances = np.linalg.norm(candidate_points[:, np.newaxis] - new_points, axis=2)
-        if np.all(distances >= min_distance):
-            new_points = np.vstack((new_points, candidate_points))
 
+def get_face_chunks(counts: np.ndarray, chunk_faces: int) -> list:
+    """
+    Splits the faces in ranges of `chunk_faces` faces.
 
+    :return: the `(start face, end face, start face vertex, end face vertex)` of every chunk
+    """
+    chunks = []
+    vertex_start = 0
+    for start in range(0, len(counts), chunk_faces):
+        end = min(start + chunk_faces, len(counts))
+        vertex_end = vertex_start + int(counts[start:end].sum())
+        chunks.append((start, end, vertex_start, vertex_end))
+        vertex_start = vertex_end
+    return chunks
 
-node = hou.pwd()
-stage = node.editableStage()
 
-prim = stage.GetPrimAtPath("/grid1/mesh_0")
-scatter = hou.ch("scatter_points")
+def get_chunk_triangles(paths: dict, chunk: tuple):
+    points, counts, indices = load_mesh_arrays(paths)
+    start, end, vertex_start, vertex_end = chunk
 
-particle_set = UsdGeom.Points.Define(stage, '/grid1/points')
-particle_set.CreatePointsAttr(scatter_points(prim, scatter))
+    corners, _ = triangulate(counts[start:end])
+    return points, np.asarray(indices[vertex_start:vertex_end])[corners]
 
 
+def get_chunk_area(paths: dict, chunk: tuple) -> float:
+    points, triangles = get_chunk_triangles(paths, chunk)
+    return float(get_triangle_areas(points, triangles).sum())
 
 
+def scatter_chunk(paths: dict, chunk: tuple, num_points: int, seed: np.random.SeedSequence, output: str,
+                  offset: int):
+    """
+    Scatters the points of a faces chunk, and writes them at their offset in the output file.
+    """
+    if not num_points:
+        return
 
+    points, triangles = get_chunk_triangles(paths, chunk)
+    triangle_ids, barycentrics = sample_triangles(get_triangle_areas(points, triangles), num_points, seed=seed)
 
+    result = np.load(output, mmap_mode="r+")
+    result[offset:offset + num_points] = interpolate(points, triangles, triangle_ids, barycentrics)
+    result.flush()
 
 
+def scatter_mesh_files(paths: dict, num_points: int, output: str, seed=101, chunk_faces=1 << 20,
+                       workers=None) -> np.ndarray:
+    """
+    Scatters points uniformly over the area of a mesh saved by `save_mesh_arrays`, by chunks of
+    faces in a process pool, so the memory is bounded by the chunk size.
+
+    The points count of every chunk is drawn from the chunks areas first, so every chunk writes its
+    points in its own range of the output file. The seed of every chunk is spawned from the seed, the
+    same seed and chunk size give the same points, whatever the number of workers.
+
+    :param paths: The `{name: path}` of the mesh arrays
+    :param num_points: The number of points
+    :param output: The `.npy` file of the positions, `(n, 3)` float32
+    :param seed: The random seed
+    :param chunk_faces: The number of faces of a chunk
+    :param workers: The number of processes, the cpu count by default
+    :return: the positions, memory mapped from the output file
+    """
+    counts = np.load(paths["counts"], mmap_mode="r")
+    chunks = get_face_chunks(counts, chunk_faces)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks) + 1)
 
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        areas = np.array(list(executor.map(get_chunk_area, itertools.repeat(paths), chunks)), dtype=np.float64)
+        if areas.sum() <= 0:
+            raise ValueError("Cannot scatter points on a mesh without area")
 
+        chunk_points = np.random.default_rng(seeds[0]).multinomial(num_points, areas / areas.sum())
+        offsets = np.cumsum(chunk_points) - chunk_points
 
+        result = np.lib.format.open_memmap(output, mode="w+", dtype=np.float32, shape=(num_points, 3))
+        del result
 
+        list(executor.map(scatter_chunk, itertools.repeat(paths), chunks, chunk_points.tolist(), seeds[1:],
+                          itertools.repeat(output), offsets.tolist()))
 
+    return np.load(output, mmap_mode="r+")
+
+
+def scatter_points_chunked(prim: Usd.Prim, num_points: int, output: str, seed=101, chunk_faces=1 << 20,
+                           workers=None) -> np.ndarray:
+    """
+    Scatters points uniformly over the area of a mesh too large to be scattered at once, see
+    `scatter_mesh_files`. The mesh arrays are read from the stage once, to temporary files.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        paths = save_mesh_arrays(UsdGeom.Mesh(prim), directory)
+        return scatter_mesh_files(paths, num_points, output, seed=seed, chunk_faces=chunk_faces,
+                                  workers=workers)
+
+
+def save_samples(path: str, triangle_ids: np.ndarray, barycentrics: np.ndarray):
+    # written through a file, so numpy does not add an extension to the path
+    with open(path, "wb") as f:
+        np.savez(f, triangle_ids=triangle_ids, barycentrics=barycentrics)
+
+
+def load_samples(path: str):
+    with np.load(path) as samples:
+        return samples["triangle_ids"], samples["barycentrics"]
+
+
+def scatter_points_animated(prim: Usd.Prim, path: Sdf.Path, num_points: int, seed=101, min_distance=None,
+                            cache_path=None, reference_time=None) -> UsdGeom.Points:
+    """
+    Scatters points over a deforming mesh, the points sticking to the surface at every time sample.
+
+    The samples, a triangle and barycentric coordinates per point, are drawn once at the reference
+    time, then the positions of every time sample of the mesh points are evaluated from them, so a
+    frame costs one gather per corner and no resampling. The points get stable `ids`, the index of
+    their sample.
+
+    :param prim: The mesh prim, its topology must not change over time
+    :param path: The points prim path
+    :param num_points: The number of points, ignored with a min distance
+    :param seed: The random seed
+    :param min_distance: The distance between the points at the reference time, to scatter blue noise points
+    :param cache_path: The `.npz` file of the samples, reused when it exists
+    :param reference_time: The time of the mesh points the samples are drawn on, the earliest time by default
+    :return: the points prim
+    """
+    reference_time = Usd.TimeCode.EarliestTime() if reference_time is None else reference_time
+    mesh = UsdGeom.Mesh(prim)
+    triangle_mesh = TriangleMesh(*get_mesh_arrays(mesh, reference_time))
+
+    if cache_path and os.path.isfile(cache_path):
+        triangle_ids, barycentrics = load_samples(cache_path)
+        if len(triangle_ids) and triangle_ids.max() >= len(triangle_mesh.triangles):
+            raise ValueError("The samples of `{}` do not match the mesh `{}`".format(cache_path, mesh.GetPath()))
+    else:
+        if min_distance:
+            triangle_ids, barycentrics = get_poisson_samples(mesh, triangle_mesh, min_distance, seed=seed)
+        else:
+            triangle_ids, barycentrics = sample_triangles(triangle_mesh.get_areas(), num_points, seed=seed)
+        if cache_path:
+            save_samples(cache_path, triangle_ids, barycentrics)
+
+    points = UsdGeom.Points.Define(prim.GetStage(), path)
+    points.CreateIdsAttr(Vt.Int64Array.FromNumpy(np.arange(len(triangle_ids), dtype=np.int64)))
+    positions_attr = points.CreatePointsAttr()
+    extent_attr = points.CreateExtentAttr()
+
+    mesh_points_attr = mesh.GetPointsAttr()
+    times = mesh_points_attr.GetTimeSamples() or [Usd.TimeCode.Default()]
+    for time in times:
+        mesh_points = np.asarray(mesh_points_attr.Get(time), dtype=np.float32)
+        if len(mesh_points) != len(triangle_mesh.points):
+            raise ValueError("The points count of the mesh `{}` changes at the time {}".format(mesh.GetPath(), time))
+
+        positions = interpolate(mesh_points, triangle_mesh.triangles, triangle_ids, barycentrics)
+        positions_attr.Set(Vt.Vec3fArray.FromNumpy(positions), time)
+        if len(positions):
+            extent_attr.Set(Vt.Vec3fArray.FromNumpy(np.stack([positions.min(axis=0), positions.max(axis=0)])), time)
+
+    return points
+
+
+if __name__ == "__main__":
+    import hou
+
+    # in a python node this file runs as `__main__`, the scatter functions are used from the
+    # `scatter_points` module so the chunked scatter workers can import them
+    import scatter_points
+
+    node = hou.pwd()
+    stage = node.editableStage()
+
+    prim = stage.GetPrimAtPath("/grid1/mesh_0")
+    scatter = hou.ch("scatter_points")
+
+    positions, normals, primvars = scatter_points.scatter_points_primvars(prim, scatter)
+    scatter_points.create_points(stage, '/grid1/points', positions, normals, primvars)
@@ -0,0 +1,230 @@
+import os
+import runpy
+import sys
+import types
+
+import numpy as np
+import pytest
+
+try:
+    from pxr import Usd, UsdGeom
+except ImportError:
+    Usd = UsdGeom = None
+
+MISC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MISC_DIR)
+
+import scatter_points
+
+requires_pxr = pytest.mark.skipif(Usd is None, reason="reads and writes USD stages")
+
+
+def get_grid_arrays(size):
+    """
+    Returns the points, face vertex counts and face vertex indices of a grid of size x size unit
+    quads on the xz plane.
+    """
+    xs, zs = np.meshgrid(np.arange(size + 1), np.arange(size + 1))
+    points = np.stack([xs.ravel(), np.zeros(xs.size), zs.ravel()], axis=1).astype(np.float32)
+
+    faces = np.arange(size * size)
+    corners = faces // size * (size + 1) + faces % size
+    indices = np.stack([corners, corners + 1, corners + size + 2, corners + size + 1], axis=1)
+    return points, np.full(size * size, 4, dtype=np.int64), indices.ravel().astype(np.int64)
+
+
+def create_grid(stage, path, size):
+    points, counts, indices = get_grid_arrays(size)
+
+    mesh = UsdGeom.Mesh.Define(stage, path)
+    mesh.CreatePointsAttr(points.tolist())
+    mesh.CreateFaceVertexCountsAttr(counts.tolist())
+    mesh.CreateFaceVertexIndicesAttr(indices.tolist())
+    return mesh
+
+
+def test_triangulate():
+    corners, faces = scatter_points.triangulate([4, 3, 2, 5])
+
+    # the faces are fanned from their first vertex, the 2 vertices face has no triangle
+    np.testing.assert_array_equal(corners, [[0, 1, 2], [0, 2, 3], [4, 5, 6], [9, 10, 11], [9, 11, 12], [9, 12, 13]])
+    np.testing.assert_array_equal(faces, [0, 0, 1, 3, 3, 3])
+
+
+def test_sample_triangles():
+    triangle_mesh = scatter_points.TriangleMesh(*get_grid_arrays(4))
+    areas = triangle_mesh.get_areas()
+    np.testing.assert_allclose(areas, 0.5)
+
+    triangle_ids, barycentrics = scatter_points.sample_triangles(areas, 1000, seed=7)
+    assert triangle_ids.shape == (1000,)
+    assert barycentrics.shape == (1000, 3)
+    assert triangle_ids.min() >= 0 and triangle_ids.max() < len(areas)
+    assert barycentrics.min() >= 0
+    np.testing.assert_allclose(barycentrics.sum(axis=1), 1, rtol=1e-6)
+
+    # the same seed gives the same samples
+    same_ids, same_barycentrics = scatter_points.sample_triangles(areas, 1000, seed=7)
+    np.testing.assert_array_equal(triangle_ids, same_ids)
+    np.testing.assert_array_equal(barycentrics, same_barycentrics)
+    other_ids, _ = scatter_points.sample_triangles(areas, 1000, seed=8)
+    assert not np.array_equal(triangle_ids, other_ids)
+
+    # the triangles without weight get no samples
+    weights = areas.copy()
+    weights[::2] = 0
+    triangle_ids, _ = scatter_points.sample_triangles(weights, 1000, seed=7)
+    assert np.all(triangle_ids % 2 == 1)
+
+
+def test_sample_triangles_without_area():
+    with pytest.raises(ValueError):
+        scatter_points.sample_triangles(np.zeros(4), 10)
+
+
+def test_scatter_mesh():
+    points, counts, indices = get_grid_arrays(10)
+    positions = scatter_points.scatter_mesh(points, counts, indices, 5000, seed=3)
+
+    assert positions.shape == (5000, 3)
+    assert positions.min() >= 0 and positions.max() <= 10
+    np.testing.assert_array_equal(positions[:, 1], 0)
+    np.testing.assert_array_equal(positions, scatter_points.scatter_mesh(points, counts, indices, 5000, seed=3))
+
+
+def get_distances(positions):
+    return np.linalg.norm(positions[:, np.newaxis] - positions[np.newaxis], axis=-1)
+
+
+@pytest.mark.parametrize("radius", [0.05, 0.2])
+def test_poisson_disk_sample(radius):
+    rng = np.random.default_rng(0)
+    positions = rng.random((5000, 3)) * [1, 0, 1]
+
+    kept = scatter_points.poisson_disk_sample(positions, radius, seed=5)
+    distances = get_distances(positions[kept])
+    np.fill_diagonal(distances, np.inf)
+    assert distances.min() >= radius
+
+    # every rejected candidate is closer than the radius to a kept point
+    rejected = np.setdiff1d(np.arange(len(positions)), kept)
+    closest = np.linalg.norm(positions[rejected, np.newaxis] - positions[kept], axis=-1).min(axis=1)
+    assert closest.max() < radius
+
+    np.testing.assert_array_equal(kept, scatter_points.poisson_disk_sample(positions, radius, seed=5))
+
+
+def test_poisson_disk_sample_radii():
+    rng = np.random.default_rng(0)
+    positions = rng.random((5000, 3)) * [1, 0, 1]
+    # the points are sparser on the right side
+    radii = np.where(positions[:, 0] < 0.5, 0.03, 0.1)
+
+    kept = scatter_points.poisson_disk_sample(positions, radii, seed=5)
+    distances = get_distances(positions[kept])
+    np.fill_diagonal(distances, np.inf)
+    assert np.all(distances >= np.maximum(radii[kept, np.newaxis], radii[kept]))
+    assert (positions[kept, 0] < 0.5).sum() > 3 * (positions[kept, 0] >= 0.5).sum()
+
+
+def test_poisson_disk_sample_invalid():
+    assert len(scatter_points.poisson_disk_sample(np.empty((0, 3)), 0.1)) == 0
+    with pytest.raises(ValueError):
+        scatter_points.poisson_disk_sample(np.zeros((2, 3)), 0)
+
+
+def test_get_density_weights():
+    triangle_mesh = scatter_points.TriangleMesh(*get_grid_arrays(10))
+    areas, corner_densities = scatter_points.get_density_weights(triangle_mesh)
+    np.testing.assert_array_equal(areas, triangle_mesh.get_areas())
+    assert corner_densities is None
+
+    # a mask on the left half of the grid, the negative densities are clamped
+    densities = np.where(triangle_mesh.points[:, 0] <= 5, 1, -1)
+    weights, corner_densities = scatter_points.get_density_weights(triangle_mesh, densities, "vertex")
+    assert corner_densities.shape == (len(triangle_mesh.triangles), 3)
+    assert corner_densities.min() == 0
+    centers = triangle_mesh.points[triangle_mesh.triangles].mean(axis=1)
+    assert np.all(weights[centers[:, 0] > 6] == 0)
+    assert np.all(weights[centers[:, 0] < 5] > 0)
+
+    triangle_ids, barycentrics = scatter_points.sample_triangles(weights, 2000, seed=3,
+                                                                 corner_densities=corner_densities)
+    positions = scatter_points.interpolate(triangle_mesh.points, triangle_mesh.triangles, triangle_ids,
+                                           barycentrics)
+    # the density fades to 0 over the column of quads right of the mask
+    assert positions[:, 0].max() < 6
+    assert (positions[:, 0] <= 5).mean() > 0.9
+
+
+def test_get_density_weights_uniform():
+    triangle_mesh = scatter_points.TriangleMesh(*get_grid_arrays(2))
+    weights, corner_densities = scatter_points.get_density_weights(triangle_mesh, [1, 0, 0, 3], "uniform")
+
+    # the 2 triangles of a face have its density
+    np.testing.assert_array_equal(corner_densities[:, 0], [1, 1, 0, 0, 0, 0, 3, 3])
+    np.testing.assert_allclose(weights, [0.5, 0.5, 0, 0, 0, 0, 1.5, 1.5])
+
+
+def save_grid_arrays(directory, size):
+    paths = {}
+    for name, array in zip(scatter_points.MESH_ARRAYS, get_grid_arrays(size)):
+        paths[name] = str(directory / "{}.npy".format(name))
+        np.save(paths[name], array)
+    return paths
+
+
+def test_get_face_chunks():
+    chunks = scatter_points.get_face_chunks(np.array([4, 3, 5, 4, 3]), 2)
+    assert chunks == [(0, 2, 0, 7), (2, 4, 7, 16), (4, 5, 16, 19)]
+
+
+def test_scatter_mesh_files_workers(tmp_path):
+    (tmp_path / "grid").mkdir()
+    paths = save_grid_arrays(tmp_path / "grid", 20)
+
+    positions = scatter_points.scatter_mesh_files(paths, 10000, str(tmp_path / "points.npy"), seed=3, chunk_faces=50,
+                                                  workers=2)
+    single = scatter_points.scatter_mesh_files(paths, 10000, str(tmp_path / "single.npy"), seed=3, chunk_faces=50,
+                                               workers=1)
+
+    # the chunks write their own ranges, the output does not depend on the number of workers
+    assert positions.shape == (10000, 3)
+    assert positions.dtype == np.float32
+    assert positions.min() >= 0 and positions.max() <= 20
+    np.testing.assert_array_equal(positions, single)
+    np.testing.assert_array_equal(np.load(str(tmp_path / "points.npy")), single)
+
+    # the points are spread over both halves of the grid
+    counts = np.bincount((np.minimum(positions[:, 0], 19.999) // 10).astype(np.int64), minlength=2)
+    assert abs(counts[0] - counts[1]) < 500
+
+
+@requires_pxr
+def test_scatter_points_chunked_workers(tmp_path):
+    stage = Usd.Stage.CreateInMemory()
+    mesh = create_grid(stage, "/grid", 20)
+
+    positions = scatter_points.scatter_points_chunked(mesh.GetPrim(), 10000, str(tmp_path / "points.npy"), seed=3,
+                                                      chunk_faces=50, workers=2)
+    single = scatter_points.scatter_points_chunked(mesh.GetPrim(), 10000, str(tmp_path / "single.npy"), seed=3,
+                                                   chunk_faces=50, workers=1)
+
+    assert positions.shape == (10000, 3)
+    assert positions.min() >= 0 and positions.max() <= 20
+    np.testing.assert_array_equal(positions, single)
+
+
+@requires_pxr
+def test_python_node_snippet(monkeypatch):
+    stage = Usd.Stage.CreateInMemory()
+    create_grid(stage, "/grid1/mesh_0", 4)
+
+    node = types.SimpleNamespace(editableStage=lambda: stage)
+    hou = types.SimpleNamespace(pwd=lambda: node, ch=lambda name: 100)
+    monkeypatch.setitem(sys.modules, "hou", hou)
+
+    runpy.run_path(os.path.join(MISC_DIR, "scatter_points.py"), run_name="__main__")
+
+    points = UsdGeom.Points(stage.GetPrimAtPath("/grid1/points"))
+    assert len(points.GetPointsAttr().Get()) == 100